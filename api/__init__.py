@@ -1,6 +1,19 @@
 from flask import Flask
 from .models import db, flask_bcrypt, login_manager
+from .hashing import password_hasher
+from .cache import account_cache, account_etag_cache
+from .sessions import session_store
+from .throttling import login_throttle
+from .metrics import request_metrics
+from .error_logging import error_logger
+from .request_schemas import request_validator
+from .tokens import token_manager
+from .password_policy import password_policy
+from .pool import dispose_engines_after_fork, init_pool_instrumentation
+from .replicas import replica_router
+from .purge import tombstone_purger
 from .routes import authentication
+from .commands import accounts
 
 
 def create_app(config_class):
@@ -8,13 +21,29 @@ def create_app(config_class):
     app = Flask(__name__)
     app.config.from_object(config_class)
     
+    init_pool_instrumentation(app)
+    replica_router.init_app(app)
     db.init_app(app)
+    password_hasher.init_app(app)
     flask_bcrypt.init_app(app)
     login_manager.init_app(app)
+    account_cache.init_app(app)
+    account_etag_cache.init_app(app)
+    session_store.init_app(app)
+    login_throttle.init_app(app)
+    request_metrics.init_app(app)
+    error_logger.init_app(app)
+    request_validator.init_app(app)
+    token_manager.init_app(app)
+    password_policy.init_app(app)
+    tombstone_purger.init_app(app)
 
-    with app.app_context():
-        db.create_all()
+    if app.config.get("DB_CREATE_ALL", True):
+        with app.app_context():
+            db.create_all(bind_key=None)
+    dispose_engines_after_fork(app)
 
     app.register_blueprint(authentication)
+    app.cli.add_command(accounts)
 
     return app
\ No newline at end of file
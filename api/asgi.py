@@ -0,0 +1,615 @@
+import asyncio
+import time
+from functools import wraps
+from typing import Any, AsyncIterator, Awaitable, Callable
+from quart import Blueprint, Quart, Response, abort, current_app, g, request, session
+from sqlalchemy import Row, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from .models import Account, account_schema, db
+from .hashing import HashingQueueFull, password_hasher
+from .cache import account_cache, account_etag_cache
+from .sessions import SESSION_TOKEN_KEY, session_store
+from .throttling import login_throttle
+from .tokens import InvalidToken, token_manager
+from .password_policy import password_policy
+from .request_schemas import request_validator
+from .error_logging import error_logger
+from .metrics import render_process_metrics
+from .responses import (failure_response, hashing_busy_response, login_throttled_response, not_modified_response,
+                        precondition_failed_response, success_response, unknown_field_response)
+from .routes import cache_etag, end_account_sessions, end_session, invalidate_account, serialize_accounts
+from .serializers import dumps, make_json_response
+from . import services
+
+
+ASYNC_DRIVERS: dict[str, str] = {"postgresql": "postgresql+asyncpg", "postgres": "postgresql+asyncpg",
+                                 "postgresql+psycopg2": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def get_async_database_uri(config: dict[str, Any]) -> str:
+    if config.get("ASYNC_SQLALCHEMY_DATABASE_URI"):
+        return config["ASYNC_SQLALCHEMY_DATABASE_URI"]
+    scheme, separator, rest = config["SQLALCHEMY_DATABASE_URI"].partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + separator + rest
+
+
+def get_async_engine_options(config: dict[str, Any], database_uri: str) -> dict[str, Any]:
+    engine_options: dict[str, Any] = {key: value for key, value in config.get("SQLALCHEMY_ENGINE_OPTIONS", {}).items()
+                                      if key != "connect_args"}
+    if config.get("DB_STATEMENT_TIMEOUT_MS", 0) > 0 and database_uri.startswith("postgresql+asyncpg"):
+        engine_options["connect_args"] = {"server_settings": {"statement_timeout": str(config["DB_STATEMENT_TIMEOUT_MS"])}}
+    return engine_options
+
+
+def get_db_session() -> AsyncSession:
+    return current_app.extensions["async_sessionmaker"]()
+
+
+# The session store, the caches, the login throttle and the token denylist are synchronous (SQLite waits up to its
+# busy timeout, Redis on the network): the routes call them through asyncio.to_thread to keep the event loop free.
+
+
+async def get_current_session() -> tuple[int, str] | None:
+    # Same rules as the Flask-Login loaders of the WSGI app: the cookie is only valid while its token is in the store,
+    # then a bearer access token is accepted while it verifies. Returns the account id and the session token.
+    token: str | None = session.get(SESSION_TOKEN_KEY)
+    if token is not None:
+        account_id: int | None = await asyncio.to_thread(session_store.get_account_id, token)
+        if account_id is not None and str(account_id) == session.get("_user_id"):
+            return account_id, token
+
+    authorization: str = request.headers.get("Authorization", "")
+    if token_manager.enabled and authorization.startswith("Bearer "):
+        token_user = await asyncio.to_thread(token_manager.load_user, authorization[len("Bearer "):])
+        if token_user is not None:
+            return token_user.id, token_user.session_id
+    return None
+
+
+def login_required(route: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    @wraps(route)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if await get_current_session() is None:
+            abort(401)
+        return await route(*args, **kwargs)
+    return wrapper
+
+
+async def start_session(account_id: int) -> str:
+    await asyncio.to_thread(invalidate_account, account_id)
+    session_token: str = await asyncio.to_thread(session_store.create, account_id)
+    session[SESSION_TOKEN_KEY] = session_token
+    session["_user_id"] = str(account_id)
+    session["_fresh"] = True
+    return session_token
+
+
+def logout_user() -> None:
+    session.pop(SESSION_TOKEN_KEY, None)
+    session.pop("_user_id", None)
+    session.pop("_fresh", None)
+
+
+def log_exception(error: BaseException) -> None:
+    # Same record as the WSGI routes, built from Quart's request globals which the error logger cannot see.
+    start: float | None = g.get("error_log_start")
+    error_logger.log_exception(error, request_context={
+        "route": request.endpoint, "method": request.method, "path": request.path,
+        "account_id": (request.view_args or {}).get("id") or session.get("_user_id"),
+        "duration_ms": round((time.perf_counter() - start) * 1000, 3) if start is not None else None})
+
+
+async def get_account_by_id(db_session: AsyncSession, id: int) -> Account | None:
+    return (await db_session.execute(services.build_live_account_query(id, Account))).scalar()
+
+
+async def validate_request_body() -> Response | None:
+    # The schemas of the WSGI app (api.request_schemas), the body being read asynchronously and at most one byte
+    # past the limit, whatever the Content-Length claims.
+    max_body_size: int | None = request_validator.get_max_body_size(request.endpoint)
+    if max_body_size is None:
+        return None
+
+    response: Response | None = request_validator.check_content_length(request.endpoint, request.content_length)
+    if response is not None:
+        return response
+    raw_body: bytearray = bytearray()
+    async for chunk in request.body:
+        raw_body += chunk
+        if len(raw_body) > max_body_size:
+            break
+
+    body, response = request_validator.validate_body(request.endpoint, bytes(raw_body))
+    if response is not None:
+        return response
+    g.request_body = body
+    return None
+
+
+async_authentication: Blueprint = Blueprint("authentication", __name__)
+
+
+@async_authentication.route("/")
+async def base() -> str:
+    return "The server is ready to be used"
+
+
+@async_authentication.route("/db-content", methods=["GET"])
+async def show_db_content() -> Response:
+    try:
+        columns: list[str] | None = services.get_requested_columns(request.args.get("fields"))
+        if columns is None:
+            return unknown_field_response()
+
+        try:
+            after_id: int | None = int(request.args["after_id"]) if "after_id" in request.args else None
+            limit: int | None = int(request.args["limit"]) if "limit" in request.args else None
+        except ValueError:
+            return failure_response("'after_id' and 'limit' must be integers", 400)
+
+        is_json_lines: bool = request.args.get("format") == "jsonl"
+        if not is_json_lines and (limit is not None or after_id is not None):
+            max_limit: int = current_app.config.get("DB_CONTENT_MAX_LIMIT", 1000)
+            limit = max(1, min(limit if limit is not None else max_limit, max_limit))
+            async with get_db_session() as db_session:
+                rows: list[Row] = (await db_session.execute(services.build_db_content_query(columns, after_id, limit))).all()
+            next_after_id: int | None = rows[-1].id if len(rows) == limit else None
+            return success_response(await asyncio.to_thread(serialize_accounts, rows, columns), next_after_id=next_after_id)
+
+        yield_per: int = current_app.config.get("DB_CONTENT_YIELD_PER", 1000)
+        session_factory: async_sessionmaker = current_app.extensions["async_sessionmaker"]
+
+        async def generate_rows() -> AsyncIterator[bytes]:
+            separator: bytes = b"" if is_json_lines else b"["
+            async with session_factory() as db_session:
+                result = await db_session.stream(services.build_db_content_query(columns, after_id, limit)
+                                                 .execution_options(yield_per=yield_per))
+                async for partition in result.partitions():
+                    for account in await asyncio.to_thread(serialize_accounts, partition, columns):
+                        if is_json_lines:
+                            yield dumps(account) + b"\n"
+                        else:
+                            yield separator + dumps(account)
+                            separator = b","
+            if not is_json_lines:
+                yield b"[]" if separator == b"[" else b"]"
+
+        return Response(generate_rows(), mimetype="application/x-ndjson" if is_json_lines else "application/json")
+
+    except Exception as e:
+        log_exception(e)
+        return failure_response("get request failed", 500)
+
+
+@async_authentication.route("/metrics", methods=["GET"])
+async def show_metrics() -> Response:
+    engine: AsyncEngine = current_app.extensions["async_engine"]
+    return Response("\n".join(render_process_metrics({None: engine.sync_engine})) + "\n", mimetype="text/plain; version=0.0.4")
+
+
+@async_authentication.route("/accounts/<int:id>", methods=["GET"])
+async def get_account(id: int) -> Response:
+    try:
+        columns: list[str] | None = services.get_requested_columns(request.args.get("fields"))
+        if columns is None:
+            return unknown_field_response()
+
+        fields_key: str = ",".join(columns)
+        if_none_match: str | None = request.headers.get("If-None-Match")
+        cached_etags: dict[str, str] | None = (await asyncio.to_thread(account_etag_cache.get, id)
+                                               if if_none_match is not None else None)
+        if cached_etags is not None and fields_key in cached_etags and services.etag_matches(if_none_match, cached_etags[fields_key]):
+            return not_modified_response(cached_etags[fields_key])
+
+        async with get_db_session() as db_session:
+            account_info: Account | None = await get_account_by_id(db_session, id)
+        if account_info is None:
+            return failure_response("the account does not exist", 404)
+
+        account_data: dict[str, str | int | bool | None] = (await asyncio.to_thread(serialize_accounts, [account_info], columns))[0]
+        etag: str = services.format_etag(account_info.version, account_data.get("is_logged_in"))
+        await asyncio.to_thread(cache_etag, id, fields_key, etag)
+        if services.etag_matches(if_none_match, etag):
+            return not_modified_response(etag)
+
+        response: Response = success_response(account_data)
+        response.headers["ETag"] = etag
+        return response
+
+    except Exception as e:
+        log_exception(e)
+        return failure_response("account request failed", 500)
+
+
+@async_authentication.route("/accounts", methods=["GET"])
+async def get_accounts() -> Response:
+    try:
+        max_batch_size: int = current_app.config.get("ACCOUNT_BATCH_MAX_SIZE", 1000)
+        ids: list[int] | None = services.parse_id_list(request.args.get("ids"))
+        if not ids or len(ids) > max_batch_size:
+            return failure_response(f"'ids' must be a comma separated list of 1 to {max_batch_size} account ids", 400)
+
+        columns: list[str] | None = services.get_requested_columns(request.args.get("fields"))
+        if columns is None:
+            return unknown_field_response()
+
+        async with get_db_session() as db_session:
+            rows: list[Row] = (await db_session.execute(services.build_accounts_query(columns, ids))).all()
+        missing_ids: list[int] = sorted(set(ids) - {row.id for row in rows})
+        return success_response(await asyncio.to_thread(serialize_accounts, rows, columns), missing_ids=missing_ids)
+
+    except Exception as e:
+        log_exception(e)
+        return failure_response("accounts request failed", 500)
+
+
+@async_authentication.route("/accounts/batch", methods=["POST"])
+async def batch_signup() -> Response:
+    try:
+        max_batch_size: int = current_app.config.get("ACCOUNT_BATCH_MAX_SIZE", 1000)
+        batch: list[dict[str, str]] = g.request_body
+        if not 0 < len(batch) <= max_batch_size:
+            return failure_response(f"the body must be a list of 1 to {max_batch_size} accounts", 400)
+
+        errors: list[str | list[str] | None] = services.check_signup_batch_fields(batch)
+        candidates: list[dict[str, str]] = services.get_signup_batch_candidates(batch, errors)
+        async with get_db_session() as db_session:
+            taken_rows: list[Row] = (await db_session.execute(services.build_taken_emails_and_usernames_query(
+                [data["email"] for data in candidates], [data["username"] for data in candidates]))).all()
+            errors = services.check_signup_batch_unicity(batch, errors, {row.email for row in taken_rows},
+                                                         {row.username for row in taken_rows})
+            valid_accounts: list[dict[str, str]] = services.get_signup_batch_candidates(batch, errors)
+            password_hashes: list[str] = await password_hasher.async_generate_password_hashes([data["password"]
+                                                                                               for data in valid_accounts])
+            new_rows: list[dict[str, str | bool | None]] = services.build_signup_batch_rows(valid_accounts, password_hashes)
+            new_ids: list[int] = []
+            if len(new_rows) != 0:
+                try:
+                    new_ids = (await db_session.execute(insert(Account).returning(Account.id, sort_by_parameter_order=True),
+                                                        new_rows)).scalars().all()
+                    await db_session.commit()
+                except IntegrityError as e:
+                    await db_session.rollback()
+                    message: str | None = services.get_unicity_error_message(e)
+                    if message is None:
+                        raise
+                    return failure_response("batch rejected: " + message, 400)
+
+        return success_response(services.get_signup_batch_results(errors, new_ids))
+
+    except HashingQueueFull:
+        return hashing_busy_response()
+
+    except Exception as e:
+        log_exception(e)
+        return failure_response("batch signup request failed", 500)
+
+
+@async_authentication.route("/accounts/batch", methods=["DELETE"])
+async def batch_delete() -> Response:
+    try:
+        max_batch_size: int = current_app.config.get("ACCOUNT_BATCH_MAX_SIZE", 1000)
+        data: dict[str, list[int]] = g.request_body
+        ids: list[int] | None = services.parse_id_list(data.get("ids"))
+        if not ids or len(ids) > max_batch_size:
+            return failure_response(f"'ids' must be a list of 1 to {max_batch_size} account ids", 400)
+
+        async with get_db_session() as db_session:
+            deleted_ids: list[int] = (await db_session.execute(services.build_soft_delete(ids))).scalars().all()
+            await db_session.commit()
+        for deleted_id in deleted_ids:
+            await asyncio.to_thread(invalidate_account, deleted_id)
+            await asyncio.to_thread(end_account_sessions, deleted_id)
+
+        return success_response({"deleted_ids": sorted(deleted_ids), "missing_ids": sorted(set(ids) - set(deleted_ids))})
+
+    except Exception as e:
+        log_exception(e)
+        return failure_response("batch delete request failed", 500)
+
+
+@async_authentication.route("/signup", methods=["POST"])
+async def signup() -> Response:
+    try:
+        data: dict[str, str] = g.request_body
+        missing_fields: list[str] = services.get_missing_field(data)
+        optional_fields_dict: dict[str, str | None] = services.handle_optional_field_for_signup(data)
+
+        if len(missing_fields) != 0:
+            return failure_response("missing field: " + ", ".join(missing_fields), 400)
+
+        password_validity_check: dict[str, bool | list[str]] = services.check_password_validity(data["password"])
+        if not password_validity_check["validity"]:
+            return failure_response(password_validity_check["message"], 400)
+
+        new_account: Account = Account(email=data["email"], username=data["username"],
+                                       password=await password_hasher.async_generate_password_hash(data["password"]),
+                                       gender=optional_fields_dict["gender"], phone_number=optional_fields_dict["phone_number"],
+                                       address=optional_fields_dict["address"], is_logged_in=False)
+        async with get_db_session() as db_session:
+            db_session.add(new_account)
+            try:
+                await db_session.commit()
+            except IntegrityError as e:
+                await db_session.rollback()
+                message: str | None = services.get_unicity_error_message(e)
+                if message is None:
+                    raise
+                return failure_response(message, 400)
+
+        await start_session(new_account.id)
+        return success_response("signup success")
+
+    except HashingQueueFull:
+        return hashing_busy_response()
+
+    except Exception as e:
+        log_exception(e)
+        return failure_response("signup request failed", 500)
+
+
+@async_authentication.route("/login", methods=["POST"])
+async def login() -> Response:
+    try:
+        data: dict[str, str] = g.request_body
+        retry_after: float | None = await asyncio.to_thread(login_throttle.hit, data["username"], request.remote_addr)
+        if retry_after is not None:
+            return login_throttled_response(retry_after)
+
+        async with get_db_session() as db_session:
+            account: Account | None = (await db_session.execute(services.build_login_query(data["username"]))).scalars().first()
+
+            if account is None:
+                return failure_response("wrong username", 400)
+
+            if not session_store.allow_multiple_per_account and await asyncio.to_thread(session_store.is_logged_in, account.id):
+                return failure_response("the account is already logged in", 400)
+
+            real_password: str = account.password
+            if not await password_hasher.async_check_password_hash(real_password, data["password"]):
+                return failure_response("wrong password", 400)
+
+            if password_hasher.needs_rehash(real_password):
+                account.password = await password_hasher.async_generate_password_hash(data["password"])
+                await db_session.commit()
+
+        session_token: str = await start_session(account.id)
+        response_body: dict[str, str | int] = {"status": "success", "message": "login success", "code": "200"}
+        if token_manager.enabled:
+            response_body.update(token_manager.issue(account.id, data["username"], session_token))
+        return make_json_response(response_body, 200)
+
+    except HashingQueueFull:
+        return hashing_busy_response()
+
+    except Exception as e:
+        log_exception(e)
+        return failure_response("login request failed", 500)
+
+
+@async_authentication.route("/token/refresh", methods=["POST"])
+async def refresh_token() -> Response:
+    try:
+        if not token_manager.enabled:
+            return failure_response("token authentication is disabled", 404)
+
+        data: dict[str, str] = g.request_body
+        try:
+            claims, tokens = await asyncio.to_thread(token_manager.refresh, str(data.get("refresh_token", "")))
+        except InvalidToken as e:
+            return failure_response("invalid refresh token: " + str(e), 401)
+
+        if await asyncio.to_thread(session_store.get_account_id, claims["sid"]) is None:
+            await asyncio.to_thread(token_manager.revoke_session, claims["sid"])
+            return failure_response("the session has ended", 401)
+
+        return success_response("token refreshed", **tokens)
+
+    except Exception as e:
+        log_exception(e)
+        return failure_response("token refresh request failed", 500)
+
+
+@async_authentication.route("/home")
+@login_required
+async def home() -> Response | str:
+    try:
+        account_id, _ = await get_current_session()
+        cache_entry: dict[str, str | bool | None] | None = await asyncio.to_thread(account_cache.get, account_id)
+        if cache_entry is None:
+            async with get_db_session() as db_session:
+                account: Account | None = await get_account_by_id(db_session, account_id)
+            if account is None:
+                return failure_response("login required", 401)
+            cache_entry = account.convert_to_cache_entry()
+            await asyncio.to_thread(account_cache.set, account.id, cache_entry)
+
+        return "Welcome " + cache_entry["username"] + "!"
+
+    except Exception as e:
+        log_exception(e)
+        return failure_response("access to homepage failed", 500)
+
+
+@async_authentication.route("/logout/<int:id>", methods=["POST"])
+@login_required
+async def logout(id: int) -> Response:
+    try:
+        async with get_db_session() as db_session:
+            account_to_logout: Row | None = (await db_session.execute(services.build_live_account_query(id, Account.id))).first()
+        if account_to_logout is None:
+            return failure_response("the account does not exist", 404)
+
+        if not await asyncio.to_thread(session_store.is_logged_in, account_to_logout.id):
+            return failure_response("the account is already logged out", 400)
+
+        # The caller's own session ends; logging out another account leaves the caller's session untouched.
+        token: str | None = session.get(SESSION_TOKEN_KEY) or (await get_current_session())[1]
+        if token is not None and await asyncio.to_thread(session_store.get_account_id, token) == account_to_logout.id:
+            await asyncio.to_thread(end_session, token)
+            logout_user()
+        else:
+            await asyncio.to_thread(end_account_sessions, account_to_logout.id)
+        await asyncio.to_thread(invalidate_account, account_to_logout.id)
+        return success_response("the account has been logged out")
+
+    except Exception as e:
+        log_exception(e)
+        return failure_response("logout request failed", 500)
+
+
+@async_authentication.route("/accounts/<int:id>", methods=["PATCH"])
+async def modify_content(id: int) -> Response:
+    try:
+        request_params: dict[str, str] = g.request_body
+        immutable_fields: list[str] = services.get_immutable_fields(request_params)
+        if len(immutable_fields) != 0:
+            return failure_response("field cannot be modified: " + ", ".join(immutable_fields), 400)
+
+        try:
+            expected_version: int | None = services.parse_if_match(request.headers.get("If-Match"))
+        except ValueError as e:
+            return failure_response(str(e), 400)
+
+        new_values: dict[str, str | None] = services.get_new_values(request_params)
+        async with get_db_session() as db_session:
+            if "password" in request_params or len(new_values) == 0:
+                current_account: Row | None = (await db_session.execute(
+                    services.build_live_account_query(id, Account.password, Account.version))).first()
+                if current_account is None:
+                    return failure_response("the account does not exist", 400)
+                if expected_version is not None and current_account.version != expected_version:
+                    return precondition_failed_response()
+                # The update below only applies if nobody changed the account since this read.
+                expected_version = current_account.version
+
+            if "password" in request_params:
+                if "password_validation" not in request_params.keys():
+                    return failure_response("'password_validation' field missing (should contain original password as value)", 400)
+
+                if not await password_hasher.async_check_password_hash(current_account.password,
+                                                                       request_params["password_validation"]):
+                    return failure_response("wrong original password", 400)
+
+                password_validity_check: dict[str, bool | list[str]] = services.check_password_validity(request_params["password"])
+                if not password_validity_check["validity"]:
+                    return failure_response(password_validity_check["message"], 400)
+
+                new_values["password"] = await password_hasher.async_generate_password_hash(request_params["password"])
+
+            new_version: int | None = expected_version
+            if len(new_values) != 0:
+                try:
+                    new_version = (await db_session.execute(services.build_account_update(id, new_values,
+                                                                                                       expected_version))).scalar()
+                    await db_session.commit()
+                except IntegrityError as e:
+                    await db_session.rollback()
+                    message: str | None = services.get_unicity_error_message(e)
+                    if message is None:
+                        raise
+                    return failure_response(message, 400)
+
+                if new_version is None:
+                    if (await db_session.execute(services.build_live_account_query(id, Account.id))).first() is not None:
+                        return precondition_failed_response()
+                    return failure_response("the account does not exist", 400)
+                await asyncio.to_thread(invalidate_account, id)
+
+        response: Response = success_response("the account has been updated")
+        response.headers["ETag"] = services.format_etag(new_version)
+        return response
+
+    except HashingQueueFull:
+        return hashing_busy_response()
+
+    except Exception as e:
+        log_exception(e)
+        return failure_response("updated request failed", 500)
+
+
+@async_authentication.route("/accounts/<int:id>", methods=["PUT"])
+async def reset_optional_field(id: int) -> Response:
+    try:
+        try:
+            expected_version: int | None = services.parse_if_match(request.headers.get("If-Match"))
+        except ValueError as e:
+            return failure_response(str(e), 400)
+
+        async with get_db_session() as db_session:
+            new_version: int | None = (await db_session.execute(services.build_account_update(id, account_schema.optional_defaults,
+                                                                                               expected_version))).scalar()
+            await db_session.commit()
+            if new_version is None:
+                if (expected_version is not None
+                        and (await db_session.execute(services.build_live_account_query(id, Account.id))).first() is not None):
+                    return precondition_failed_response()
+                return failure_response("the account does not exist", 404)
+
+        await asyncio.to_thread(invalidate_account, id)
+        response: Response = success_response("the account has been updated")
+        response.headers["ETag"] = services.format_etag(new_version)
+        return response
+
+    except Exception as e:
+        log_exception(e)
+        return failure_response("updated request failed", 500)
+
+
+@async_authentication.route("/accounts/<int:id>", methods=["DELETE"])
+async def delete_account(id: int) -> Response:
+    try:
+        async with get_db_session() as db_session:
+            deleted_id: int | None = (await db_session.execute(services.build_soft_delete([id]))).scalar()
+            await db_session.commit()
+        if deleted_id is None:
+            return failure_response("the account does not exist", 404)
+
+        await asyncio.to_thread(invalidate_account, id)
+        await asyncio.to_thread(end_account_sessions, id)
+        return success_response("the account has been deleted")
+
+    except Exception as e:
+        log_exception(e)
+        return failure_response("delete request failed", 500)
+
+
+
+def create_async_app(config_class: type) -> Quart:
+    app: Quart = Quart(__name__)
+    app.config.from_object(config_class)
+
+    password_hasher.init_app(app)
+    account_cache.init_app(app)
+    account_etag_cache.init_app(app)
+    session_store.init_app(app)
+    login_throttle.init_app(app)
+    error_logger.init_app(app)
+    request_validator.init_app(app)
+    token_manager.init_app(app)
+    password_policy.init_app(app)
+
+    database_uri: str = get_async_database_uri(app.config)
+    engine: AsyncEngine = create_async_engine(database_uri, **get_async_engine_options(app.config, database_uri))
+    app.extensions["async_engine"] = engine
+    app.extensions["async_sessionmaker"] = async_sessionmaker(engine, expire_on_commit=False)
+
+    if app.config.get("DB_CREATE_ALL", True):
+        @app.before_serving
+        async def create_tables() -> None:
+            async with engine.begin() as connection:
+                await connection.run_sync(db.metadata.create_all)
+
+    @app.before_request
+    async def start_request() -> Response | None:
+        g.error_log_start = time.perf_counter()
+        return await validate_request_body()
+
+    @app.after_serving
+    async def dispose_engine() -> None:
+        await engine.dispose()
+
+    app.register_blueprint(async_authentication)
+
+    return app
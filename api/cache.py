@@ -0,0 +1,192 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+from flask import Flask
+from .sessions import get_sqlite_path
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class LocalCacheBackend():
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size: int = max_size
+        self.ttl: float = ttl
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        with self._lock:
+            entry: tuple[float, dict[str, Any]] | None = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+
+    def set(self, key: str, value: dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+
+class SqliteCacheBackend():
+
+    def __init__(self, path: str, table: str, max_size: int, ttl: float) -> None:
+        # One file shared by the workers of a host: an entry invalidated by one worker is gone for all of them.
+        self.path: str = path
+        self.table: str = table
+        self.max_size: int = max_size
+        self.ttl: float = ttl
+        self._local: threading.local = threading.local()
+        self._next_sweep: float = time.time() + ttl
+        connection: sqlite3.Connection = self._connect()
+        connection.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+        connection.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_expires_at ON {table} (expires_at)")
+
+
+    def _connect(self) -> sqlite3.Connection:
+        if getattr(self._local, "pid", None) != os.getpid():
+            connection: sqlite3.Connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return self._local.connection
+
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        row: tuple[str] | None = self._connect().execute(f"SELECT value FROM {self.table} WHERE key = ? AND expires_at >= ?",
+                                                         (key, time.time())).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+
+    def set(self, key: str, value: dict[str, Any]) -> None:
+        now: float = time.time()
+        connection: sqlite3.Connection = self._connect()
+        connection.execute(f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                           (key, json.dumps(value), now + self.ttl))
+        if now >= self._next_sweep:
+            # Expired entries first, then the ones closest to expiry until the table is back under max_size.
+            self._next_sweep = now + min(self.ttl, 60)
+            connection.execute(f"DELETE FROM {self.table} WHERE expires_at < ?", (now,))
+            connection.execute(f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} ORDER BY expires_at "
+                               f"LIMIT max(0, (SELECT COUNT(*) FROM {self.table}) - ?))", (self.max_size,))
+
+
+    def delete(self, key: str) -> None:
+        self._connect().execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+
+    def close(self) -> None:
+        connection: sqlite3.Connection | None = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            connection.close()
+        self._local.connection, self._local.pid = None, None
+
+
+
+class RedisCacheBackend():
+
+    def __init__(self, url: str, ttl: float, prefix: str) -> None:
+        if redis is None:
+            raise RuntimeError("the redis package is required for the 'redis' cache type")
+        self.client = redis.Redis.from_url(url)
+        self.ttl: int = max(1, int(ttl))
+        self.prefix: str = prefix
+
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        value: bytes | None = self.client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+
+    def set(self, key: str, value: dict[str, Any]) -> None:
+        self.client.setex(self.prefix + key, self.ttl, json.dumps(value))
+
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+
+
+class NullCacheBackend():
+
+    def get(self, key: str) -> None:
+        return None
+
+
+    def set(self, key: str, value: dict[str, Any]) -> None:
+        pass
+
+
+    def delete(self, key: str) -> None:
+        pass
+
+
+
+class AccountCache():
+
+    def __init__(self, config_prefix: str = "ACCOUNT_CACHE", app: Flask | None = None) -> None:
+        self.config_prefix: str = config_prefix
+        self.backend: LocalCacheBackend | RedisCacheBackend | NullCacheBackend = NullCacheBackend()
+        if app is not None:
+            self.init_app(app)
+
+
+    def init_app(self, app: Flask) -> None:
+        cache_type: str = app.config.get(self.config_prefix + "_TYPE", "sqlite")
+        ttl: float = app.config.get(self.config_prefix + "_TTL", 60)
+
+        if cache_type == "sqlite":
+            self.backend = SqliteCacheBackend(get_sqlite_path(app, self.config_prefix + "_SQLITE_PATH", "cache.db"),
+                                              self.config_prefix.lower(), app.config.get(self.config_prefix + "_SIZE", 10000), ttl)
+            app.teardown_appcontext(self._close)
+        elif cache_type == "local":
+            self.backend = LocalCacheBackend(app.config.get(self.config_prefix + "_SIZE", 10000), ttl)
+        elif cache_type == "redis":
+            self.backend = RedisCacheBackend(app.config.get(self.config_prefix + "_REDIS_URL"), ttl,
+                                             self.config_prefix.lower() + ":")
+        elif cache_type == "null":
+            self.backend = NullCacheBackend()
+        else:
+            raise ValueError(f"unknown {self.config_prefix}_TYPE: {cache_type}")
+
+
+    def get(self, account_id: int | str) -> dict[str, Any] | None:
+        return self.backend.get(str(account_id))
+
+
+    def set(self, account_id: int | str, value: dict[str, Any]) -> None:
+        self.backend.set(str(account_id), value)
+
+
+    def invalidate(self, account_id: int | str) -> None:
+        self.backend.delete(str(account_id))
+
+
+    def _close(self, exception: BaseException | None = None) -> None:
+        if isinstance(self.backend, SqliteCacheBackend):
+            self.backend.close()
+
+
+account_cache: AccountCache = AccountCache()
+account_etag_cache: AccountCache = AccountCache(config_prefix="ACCOUNT_ETAG_CACHE")
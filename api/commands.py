@@ -0,0 +1,177 @@
+import csv
+import io
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Any, Iterator
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import Connection, Result, Row, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from .models import Account, account_schema, db
+from .hashing import _generate_hash, password_hasher
+from .serializers import ACCOUNT_FIELDS, dumps
+from .purge import tombstone_purger
+from . import services
+
+
+IMPORT_FIELDS: list[str] = [*account_schema.required, *account_schema.optional]
+
+accounts: AppGroup = AppGroup("accounts", help="Bulk import and export of accounts.")
+
+
+def uses_copy(connection: Connection) -> bool:
+    return connection.dialect.name == "postgresql" and connection.dialect.driver == "psycopg2"
+
+
+def read_batches(input_file: IO[str], file_format: str, batch_size: int) -> Iterator[list[dict[str, Any]]]:
+    records: Iterator[Any] = (csv.DictReader(input_file) if file_format == "csv"
+                              else (json.loads(line) for line in input_file if line.strip()))
+    batch: list[dict[str, Any]] = []
+    for record in records:
+        if file_format == "csv":
+            # Empty CSV cells are missing values, so that an empty required field is reported as missing.
+            record = {field: value for field, value in record.items() if value != ""}
+        batch.append(record)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def insert_accounts(connection: Connection, rows: list[dict[str, Any]]) -> None:
+    if not uses_copy(connection):
+        connection.execute(insert(Account), rows)
+        return
+
+    columns: list[str] = [*IMPORT_FIELDS, "is_logged_in"]
+    buffer: io.StringIO = io.StringIO()
+    csv.writer(buffer).writerows([row[column] for column in columns] for row in rows)
+    buffer.seek(0)
+    with connection.connection.dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY account ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+@accounts.command("import")
+@click.argument("input_file", type=click.File("r", encoding="utf-8"))
+@click.option("--format", "file_format", type=click.Choice(["csv", "jsonl"]), default="csv", show_default=True)
+@click.option("--batch-size", type=click.IntRange(1), default=1000, show_default=True)
+@click.option("--workers", type=click.IntRange(1), default=os.cpu_count(), show_default=True,
+              help="Processes hashing the passwords.")
+@click.option("--log-rounds", type=click.IntRange(4, 31), default=None,
+              help="bcrypt cost of the imported hashes, defaults to BCRYPT_LOG_ROUNDS. Hashes with another cost are "
+                   "rehashed at the next login.")
+def import_accounts(input_file: IO[str], file_format: str, batch_size: int, workers: int, log_rounds: int | None) -> None:
+    log_rounds = log_rounds or password_hasher.log_rounds
+    imported_count: int = 0
+    rejected_count: int = 0
+    start: float = time.perf_counter()
+    executor: ProcessPoolExecutor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(
+        current_app.config.get("HASHING_START_METHOD", "forkserver")))
+    with executor:
+        for batch_number, batch in enumerate(read_batches(input_file, file_format, batch_size)):
+            errors: list[str | list[str] | None] = services.validate_signup_batch(db.session, batch)
+            for index, error in enumerate(errors):
+                if error is not None:
+                    click.echo(f"record {batch_number * batch_size + index + 1}: {error}", err=True)
+            valid_records: list[dict[str, Any]] = [record for record, error in zip(batch, errors) if error is None]
+            rejected_count += len(batch) - len(valid_records)
+
+            size: int = len(valid_records)
+            password_hashes: Iterator[str] = executor.map(_generate_hash, [record["password"] for record in valid_records],
+                                                          [log_rounds] * size, [password_hasher.prefix] * size,
+                                                          [password_hasher.handle_long_passwords] * size,
+                                                          chunksize=max(1, size // (workers * 4)))
+            rows: list[dict[str, Any]] = [{"email": record["email"], "username": record["username"], "password": password_hash,
+                                           "is_logged_in": False, **services.handle_optional_field_for_signup(record)}
+                                          for record, password_hash in zip(valid_records, password_hashes)]
+            if rows:
+                try:
+                    insert_accounts(db.session.connection(), rows)
+                    db.session.commit()
+                except IntegrityError as e:
+                    db.session.rollback()
+                    raise click.ClickException(f"batch {batch_number + 1} rejected: "
+                                               + (services.get_unicity_error_message(e) or str(e.orig)))
+            imported_count += len(rows)
+
+    elapsed: float = time.perf_counter() - start
+    click.echo(f"imported {imported_count} accounts, rejected {rejected_count}, in {elapsed:.1f}s "
+               f"({(imported_count + rejected_count) / max(elapsed, 1e-9):.0f} rows/s)", err=True)
+
+
+@accounts.command("export")
+@click.option("--output", "output_file", type=click.File("w", encoding="utf-8"), default="-", show_default=True)
+@click.option("--format", "file_format", type=click.Choice(["csv", "jsonl"]), default="csv", show_default=True)
+@click.option("--fields", default=",".join(ACCOUNT_FIELDS), show_default=True, help="Comma separated columns.")
+def export_accounts(output_file: IO[str], file_format: str, fields: str) -> None:
+    columns: list[str] | None = services.get_requested_columns(fields)
+    if columns is None:
+        raise click.BadParameter("available fields: " + ", ".join(ACCOUNT_FIELDS), param_hint="--fields")
+
+    exported_count: int = 0
+    start: float = time.perf_counter()
+    connection: Connection = db.session.connection()
+    if file_format == "csv" and uses_copy(connection):
+        with connection.connection.dbapi_connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY (SELECT {', '.join(columns)} FROM account WHERE deleted_at IS NULL ORDER BY id) TO STDOUT WITH (FORMAT csv, HEADER)",
+                               output_file)
+            exported_count = cursor.rowcount
+    else:
+        writer: Any = csv.writer(output_file) if file_format == "csv" else None
+        if writer is not None:
+            writer.writerow(columns)
+        result: Result = db.session.execute(services.build_db_content_query(columns, None, None)
+                                            .execution_options(yield_per=current_app.config.get("DB_CONTENT_YIELD_PER", 1000)))
+        for partition in result.partitions():
+            if writer is not None:
+                writer.writerows(partition)
+            else:
+                output_file.writelines(dumps(dict(zip(columns, row))).decode("utf-8") + "\n" for row in partition)
+            exported_count += len(partition)
+    db.session.commit()
+
+    elapsed: float = time.perf_counter() - start
+    click.echo(f"exported {exported_count} accounts in {elapsed:.1f}s ({exported_count / max(elapsed, 1e-9):.0f} rows/s)",
+               err=True)
+
+
+@accounts.command("purge")
+@click.option("--max-rows", type=click.IntRange(1), default=None, help="Stops after purging this many accounts.")
+@click.option("--retention", type=click.IntRange(0), default=None,
+              help="Seconds a deleted account is kept, defaults to ACCOUNT_PURGE_RETENTION.")
+def purge_accounts(max_rows: int | None, retention: int | None) -> None:
+    start: float = time.perf_counter()
+    purged_count: int = tombstone_purger.purge(max_rows, retention)
+    click.echo(f"purged {purged_count} deleted accounts in {time.perf_counter() - start:.1f}s", err=True)
+
+
+@accounts.command("restore")
+@click.argument("account_id", type=int)
+def restore_account(account_id: int) -> None:
+    tombstone: Row | None = db.session.execute(select(Account.email, Account.username)
+                                               .where(Account.id == account_id, Account.deleted_at.is_not(None))).first()
+    if tombstone is None:
+        raise click.ClickException(f"no deleted account with id {account_id}, it may have been purged")
+    # Checked in a fixed order (email, then username) so that the message does not depend on the database driver.
+    if not services.check_email_unicity(db.session, tombstone.email):
+        raise click.ClickException("the account cannot be restored: an account is already registered with this email")
+    if not services.check_username_unicity(db.session, tombstone.username):
+        raise click.ClickException("the account cannot be restored: the username is already taken")
+
+    try:
+        restored_id: int | None = db.session.execute(update(Account)
+                                                     .where(Account.id == account_id, Account.deleted_at.is_not(None))
+                                                     .values(deleted_at=None, version=Account.version + 1)
+                                                     .returning(Account.id)).scalar()
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        raise click.ClickException("the account cannot be restored: " + (services.get_unicity_error_message(e) or str(e.orig)))
+    if restored_id is None:
+        raise click.ClickException(f"no deleted account with id {account_id}, it may have been purged")
+    click.echo(f"restored account {account_id}", err=True)
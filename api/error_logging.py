@@ -0,0 +1,177 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
+from flask import Flask, g, has_request_context, request, session
+from sqlalchemy.exc import SQLAlchemyError
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {"time": round(record.created, 3), "level": record.levelname, "logger": record.name,
+                                 "message": record.getMessage(), **getattr(record, "context", {})}
+        if record.exc_info is not None:
+            entry["traceback"] = "".join(traceback.format_exception(*record.exc_info))
+        return json.dumps(entry, default=str)
+
+
+
+class DeduplicationFilter(logging.Filter):
+
+    def __init__(self, window: float, max_per_window: int) -> None:
+        super().__init__()
+        self.window: float = window
+        self.max_per_window: int = max_per_window
+        self.suppressed: int = 0
+        self._windows: dict[tuple[str, ...], list[float | int]] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context: dict[str, Any] = getattr(record, "context", {})
+        key: tuple[str, ...] = (str(context.get("route")), str(context.get("error_class")), record.getMessage())
+        now: float = time.monotonic()
+        with self._lock:
+            if len(self._windows) > 10000:
+                self._windows = {window_key: state for window_key, state in self._windows.items() if state[0] > now}
+            state: list[float | int] | None = self._windows.get(key)
+            if state is None or state[0] <= now:
+                # [window end, records let through, records suppressed]: the first record of the next window reports
+                # how many identical ones were dropped.
+                suppressed: int = state[2] if state is not None else 0
+                self._windows[key] = [now + self.window, 1, 0]
+                if suppressed:
+                    record.context = {**context, "suppressed": suppressed}
+                return True
+            if state[1] < self.max_per_window:
+                state[1] += 1
+                return True
+            state[2] += 1
+            self.suppressed += 1
+            return False
+
+
+
+class DrainingQueueListener(QueueListener):
+
+    def enqueue_sentinel(self) -> None:
+        # Waits for room behind the pending records instead of failing on a full queue, but not for a stuck writer.
+        self.queue.put(self._sentinel, timeout=5)
+
+
+
+class BoundedQueueHandler(QueueHandler):
+
+    def __init__(self, size: int, handler: logging.Handler) -> None:
+        super().__init__(queue.Queue(size))
+        self.target: logging.Handler = handler
+        self.dropped: int = 0
+        self._listener: QueueListener | None = None
+        self._pid: int | None = None
+        self._lock: threading.Lock = threading.Lock()
+        atexit.register(self.stop)
+
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting (traceback included) is left to the listener thread.
+        return record
+
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self._pid != os.getpid():
+            self._start_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+    def stop(self) -> None:
+        with self._lock:
+            listener: QueueListener | None = self._listener
+            self._listener, self._pid = None, None
+        if listener is not None:
+            try:
+                listener.stop()
+            except queue.Full:
+                pass
+
+
+    def _start_listener(self) -> None:
+        # Threads do not survive a fork: each gunicorn worker starts its own listener on its first record.
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.queue.maxsize)
+            self._listener = DrainingQueueListener(self.queue, self.target)
+            self._listener.start()
+            self._pid = os.getpid()
+
+
+
+class ErrorLogger():
+
+    def __init__(self, name: str = "flask_auth.errors", app: Flask | None = None) -> None:
+        self.logger: logging.Logger = logging.getLogger(name)
+        self.logger.propagate = False
+        self.handler: BoundedQueueHandler | None = None
+        self.deduplication: DeduplicationFilter | None = None
+        if app is not None:
+            self.init_app(app)
+
+
+    def init_app(self, app: Flask) -> None:
+        if self.handler is not None:
+            self.handler.stop()
+            self.logger.removeHandler(self.handler)
+
+        stream_handler: logging.StreamHandler = logging.StreamHandler(sys.stderr if app.config.get("ERROR_LOG_STREAM") == "stderr"
+                                                                       else sys.stdout)
+        stream_handler.setFormatter(JsonFormatter())
+        self.handler = BoundedQueueHandler(app.config.get("ERROR_LOG_QUEUE_SIZE", 1000), stream_handler)
+        self.deduplication = DeduplicationFilter(app.config.get("ERROR_LOG_DEDUP_WINDOW", 10),
+                                                 app.config.get("ERROR_LOG_DEDUP_MAX", 1))
+        self.handler.addFilter(self.deduplication)
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.WARNING)
+        if isinstance(app, Flask):
+            # The hook relies on Flask's request globals: the ASGI app times its requests and passes their context itself.
+            app.before_request(self._start_request)
+        app.extensions["error_logger"] = self
+
+
+    def log_exception(self, error: BaseException, level: int = logging.ERROR,
+                      request_context: dict[str, Any] | None = None) -> None:
+        context: dict[str, Any] = {"error_class": type(error).__name__}
+        if isinstance(error, SQLAlchemyError):
+            context["sql_error_class"] = type(getattr(error, "orig", None) or error).__name__
+        if request_context is not None:
+            context.update(request_context)
+        elif has_request_context():
+            start: float | None = g.get("error_log_start")
+            context.update({"route": request.endpoint, "method": request.method, "path": request.path,
+                            "account_id": (request.view_args or {}).get("id") or session.get("_user_id"),
+                            "duration_ms": round((time.perf_counter() - start) * 1000, 3) if start is not None else None})
+        self.logger.log(level, str(error), exc_info=error, extra={"context": context})
+
+
+    def get_metrics(self) -> dict[str, int]:
+        return {"queued": self.handler.queue.qsize() if self.handler is not None else 0,
+                "dropped": self.handler.dropped if self.handler is not None else 0,
+                "suppressed": self.deduplication.suppressed if self.deduplication is not None else 0}
+
+
+    def _start_request(self) -> None:
+        g.error_log_start = time.perf_counter()
+
+
+error_logger: ErrorLogger = ErrorLogger()
@@ -0,0 +1,307 @@
+import asyncio
+import fcntl
+import hashlib
+import hmac
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+import bcrypt
+from flask import Flask
+
+
+class HashingQueueFull(Exception):
+    pass
+
+
+def _prepare_password(password: str, handle_long_passwords: bool) -> bytes:
+    password_bytes: bytes = password.encode("utf-8")
+    if handle_long_passwords:
+        password_bytes = hashlib.sha256(password_bytes).hexdigest().encode("utf-8")
+    return password_bytes
+
+
+def _generate_hash(password: str, log_rounds: int, prefix: str, handle_long_passwords: bool) -> str:
+    salt: bytes = bcrypt.gensalt(rounds=log_rounds, prefix=prefix.encode("utf-8"))
+    return bcrypt.hashpw(_prepare_password(password, handle_long_passwords), salt).decode("utf-8")
+
+
+def _check_hash(password_hash: str, password: str, handle_long_passwords: bool) -> bool:
+    password_hash_bytes: bytes = password_hash.encode("utf-8")
+    candidate: bytes = bcrypt.hashpw(_prepare_password(password, handle_long_passwords), password_hash_bytes)
+    return hmac.compare_digest(candidate, password_hash_bytes)
+
+
+def get_log_rounds(password_hash: str) -> int | None:
+    hash_parts: list[str] = password_hash.split("$")
+    if len(hash_parts) < 4 or not hash_parts[2].isdigit():
+        return None
+    return int(hash_parts[2])
+
+
+def calibrate_log_rounds(latency_budget: float, samples: int, min_rounds: int, max_rounds: int, 
+                         prefix: str = "2b", handle_long_passwords: bool = False) -> int:
+    selected_rounds: int = min_rounds
+    for log_rounds in range(min_rounds, max_rounds + 1):
+        latencies: list[float] = []
+        for _ in range(samples):
+            start: float = time.perf_counter()
+            _generate_hash("calibration-Pw0", log_rounds, prefix, handle_long_passwords)
+            latencies.append(time.perf_counter() - start)
+
+        latencies.sort()
+        if latencies[int(0.95 * (len(latencies) - 1))] > latency_budget:
+            break
+        selected_rounds = log_rounds
+
+    return selected_rounds
+
+
+def load_or_calibrate_log_rounds(path: str, latency_budget: float, samples: int, min_rounds: int, max_rounds: int,
+                                 prefix: str = "2b", handle_long_passwords: bool = False) -> int:
+    # The first process to boot calibrates and stores the result, the other workers and the flask CLI read it: the cost is
+    # the same everywhere and is not skewed by several workers benchmarking at once. Delete the file to recalibrate.
+    settings: dict[str, Any] = {"latency_budget": latency_budget, "samples": samples, "min_rounds": min_rounds,
+                                "max_rounds": max_rounds, "prefix": prefix, "handle_long_passwords": handle_long_passwords}
+    with open(path + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            with open(path) as calibration_file:
+                calibration: dict[str, Any] = json.load(calibration_file)
+            if calibration.get("settings") == settings:
+                return int(calibration["log_rounds"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        log_rounds: int = calibrate_log_rounds(latency_budget, samples, min_rounds, max_rounds, prefix, handle_long_passwords)
+        with open(path + ".tmp", "w") as calibration_file:
+            json.dump({"settings": settings, "log_rounds": log_rounds}, calibration_file)
+        os.replace(path + ".tmp", path)
+        return log_rounds
+
+
+class PasswordHasher():
+
+    def __init__(self, app: Flask | None = None) -> None:
+        self.pool_size: int = 0
+        self.start_method: str = "forkserver"
+        self.queue_size: int = 0
+        self.retry_after: int = 1
+        self.log_rounds: int = 12
+        self.prefix: str = "2b"
+        self.handle_long_passwords: bool = False
+        self._executor: Executor | None = None
+        self._slots: threading.BoundedSemaphore | None = None
+        self._lock: threading.Lock = threading.Lock()
+        self._in_flight: int = 0
+        self._completed: int = 0
+        self._rejected: int = 0
+        self._latency_total: float = 0.0
+        self._latency_max: float = 0.0
+        self._latencies: deque[float] = deque(maxlen=1024)
+        self.latency_listeners: list[Callable[[float], None]] = []
+
+        if app is not None:
+            self.init_app(app)
+
+
+    def init_app(self, app: Flask) -> None:
+        if app.config.get("BCRYPT_CALIBRATE", False):
+            app.config["BCRYPT_LOG_ROUNDS"] = load_or_calibrate_log_rounds(app.config.get("BCRYPT_CALIBRATION_PATH",
+                                                                                          "bcrypt_calibration.json"),
+                                                                           app.config.get("BCRYPT_LATENCY_BUDGET_MS", 250) / 1000,
+                                                                           app.config.get("BCRYPT_CALIBRATION_SAMPLES", 5),
+                                                                           app.config.get("BCRYPT_MIN_LOG_ROUNDS", 10),
+                                                                           app.config.get("BCRYPT_MAX_LOG_ROUNDS", 16),
+                                                                           app.config.get("BCRYPT_HASH_PREFIX", "2b"),
+                                                                           app.config.get("BCRYPT_HANDLE_LONG_PASSWORDS", False))
+
+        self.pool_size = app.config.get("HASHING_POOL_SIZE", 0)
+        self.start_method = app.config.get("HASHING_START_METHOD", "forkserver")
+        self.queue_size = app.config.get("HASHING_QUEUE_SIZE", 0)
+        self.retry_after = app.config.get("HASHING_RETRY_AFTER", 1)
+        self.log_rounds = app.config.get("BCRYPT_LOG_ROUNDS", 12)
+        self.prefix = app.config.get("BCRYPT_HASH_PREFIX", "2b")
+        self.handle_long_passwords = app.config.get("BCRYPT_HANDLE_LONG_PASSWORDS", False)
+        self._slots = threading.BoundedSemaphore(self.pool_size + self.queue_size) if self.pool_size > 0 else None
+        app.extensions["password_hasher"] = self
+
+
+    def generate_password_hash(self, password: str) -> str:
+        if not password:
+            raise ValueError("Password must be non-empty.")
+        return self._run(_generate_hash, password, self.log_rounds, self.prefix, self.handle_long_passwords)
+
+
+    def check_password_hash(self, password_hash: str, password: str) -> bool:
+        return self._run(_check_hash, password_hash, password, self.handle_long_passwords)
+
+
+    def generate_password_hashes(self, passwords: list[str]) -> list[str]:
+        if not all(passwords):
+            raise ValueError("Password must be non-empty.")
+        if len(passwords) == 0:
+            return []
+
+        start: float = time.perf_counter()
+        size: int = len(passwords)
+        if self._slots is None:
+            try:
+                return [_generate_hash(password, self.log_rounds, self.prefix, self.handle_long_passwords) for password in passwords]
+            finally:
+                self._record_latency(time.perf_counter() - start)
+
+        # A batch takes a single queue slot and is spread over the whole pool.
+        self._acquire_slot()
+        try:
+            return self._call_executor(lambda executor: list(executor.map(_generate_hash, passwords, [self.log_rounds] * size,
+                                                                          [self.prefix] * size, [self.handle_long_passwords] * size,
+                                                                          chunksize=max(1, size // (self.pool_size * 4)))))
+        finally:
+            self._release_slot(start)
+
+
+    async def async_generate_password_hash(self, password: str) -> str:
+        if not password:
+            raise ValueError("Password must be non-empty.")
+        return await self._run_async(_generate_hash, password, self.log_rounds, self.prefix, self.handle_long_passwords)
+
+
+    async def async_check_password_hash(self, password_hash: str, password: str) -> bool:
+        return await self._run_async(_check_hash, password_hash, password, self.handle_long_passwords)
+
+
+    async def async_generate_password_hashes(self, passwords: list[str]) -> list[str]:
+        # The batch waits on the pool from a thread, as generate_password_hashes, so the event loop is never blocked.
+        return await asyncio.to_thread(self.generate_password_hashes, passwords)
+
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        # Only upgrades: a hash stronger than the current cost is kept, so workers never rehash back and forth.
+        log_rounds: int | None = get_log_rounds(password_hash)
+        return log_rounds is None or log_rounds < self.log_rounds
+
+
+    def get_metrics(self) -> dict[str, int | float]:
+        with self._lock:
+            latencies: list[float] = sorted(self._latencies)
+            in_flight: int = self._in_flight
+            metrics: dict[str, int | float] = {
+                "log_rounds": self.log_rounds,
+                "pool_size": self.pool_size,
+                "queue_size": self.queue_size,
+                "in_flight": in_flight,
+                "queue_depth": max(0, in_flight - self.pool_size),
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "latency_total_seconds": self._latency_total,
+                "latency_max_seconds": self._latency_max,
+            }
+        metrics["latency_p50_seconds"] = latencies[int(0.50 * (len(latencies) - 1))] if latencies else 0.0
+        metrics["latency_p95_seconds"] = latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0
+        return metrics
+
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor: Executor | None = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+    def _get_executor(self) -> Executor:
+        # Created on first use so that each gunicorn worker gets its own pool after fork.
+        # Daemonic workers (e.g. hypercorn) cannot have children: bcrypt releases the GIL, so threads are used instead.
+        with self._lock:
+            if self._executor is None and multiprocessing.current_process().daemon:
+                self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="password-hasher")
+            elif self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.pool_size,
+                                                     mp_context=multiprocessing.get_context(self.start_method))
+            return self._executor
+
+
+    def _drop_executor(self, executor: Executor) -> None:
+        # A killed child (OOM killer, SIGKILL) breaks the whole process pool for good: the next call builds a new one.
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+    def _call_executor(self, call: Callable[[Executor], Any]) -> Any:
+        # Hashing has no side effect, so a call that hit a broken pool is retried once on a new one, then answered as busy.
+        for _ in range(2):
+            executor: Executor = self._get_executor()
+            try:
+                return call(executor)
+            except BrokenExecutor:
+                self._drop_executor(executor)
+        raise HashingQueueFull("the password hashing pool keeps breaking")
+
+
+    def _run(self, function: Callable[..., Any], *args: Any) -> Any:
+        start: float = time.perf_counter()
+        if self._slots is None:
+            try:
+                return function(*args)
+            finally:
+                self._record_latency(time.perf_counter() - start)
+
+        self._acquire_slot()
+        try:
+            return self._call_executor(lambda executor: executor.submit(function, *args).result())
+        finally:
+            self._release_slot(start)
+
+
+    async def _run_async(self, function: Callable[..., Any], *args: Any) -> Any:
+        if self._slots is None:
+            return await asyncio.to_thread(self._run, function, *args)
+
+        start: float = time.perf_counter()
+        self._acquire_slot()
+        try:
+            for _ in range(2):
+                executor: Executor = self._get_executor()
+                try:
+                    return await asyncio.wrap_future(executor.submit(function, *args))
+                except BrokenExecutor:
+                    self._drop_executor(executor)
+            raise HashingQueueFull("the password hashing pool keeps breaking")
+        finally:
+            self._release_slot(start)
+
+
+    def _acquire_slot(self) -> None:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise HashingQueueFull("the password hashing queue is full")
+        with self._lock:
+            self._in_flight += 1
+
+
+    def _release_slot(self, start: float) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+        self._record_latency(time.perf_counter() - start)
+
+
+    def _record_latency(self, latency: float) -> None:
+        with self._lock:
+            self._completed += 1
+            self._latency_total += latency
+            self._latency_max = max(self._latency_max, latency)
+            self._latencies.append(latency)
+        for listener in self.latency_listeners:
+            listener(latency)
+
+
+password_hasher: PasswordHasher = PasswordHasher()
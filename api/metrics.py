@@ -0,0 +1,198 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Any
+from flask import Flask, Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine.base import Engine
+from .error_logging import error_logger
+from .hashing import password_hasher
+from .models import db
+from .pool import get_pool_metrics
+from .purge import tombstone_purger
+
+
+LATENCY_BUCKETS: tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS: tuple[float, ...] = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+# Values of the component get_metrics() that only ever grow, rendered as counters; the other numbers are gauges.
+COUNTER_FIELDS: frozenset[str] = frozenset(("completed", "rejected", "dropped", "suppressed", "purged", "checkouts"))
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_names: tuple[str, ...], label_values: tuple[str, ...]) -> str:
+    return ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in zip(label_names, label_values))
+
+
+def render_component_metrics(prefix: str, label_names: tuple[str, ...],
+                             samples: dict[tuple[str, ...], dict[str, Any]]) -> list[str]:
+    # Renders the get_metrics() dictionaries of a component (one per label values) as Prometheus samples, skipping
+    # the non numeric values.
+    field_names: list[str] = sorted({name for values in samples.values() for name, value in values.items()
+                                     if isinstance(value, (int, float))})
+    lines: list[str] = []
+    for field_name in field_names:
+        is_counter: bool = field_name in COUNTER_FIELDS
+        name: str = f"{prefix}_{field_name}_total" if is_counter else f"{prefix}_{field_name}"
+        lines.append(f"# TYPE {name} {'counter' if is_counter else 'gauge'}")
+        for label_values, values in sorted(samples.items()):
+            if field_name in values:
+                labels: str = _format_labels(label_names, label_values)
+                value: int | float = int(values[field_name]) if isinstance(values[field_name], bool) else values[field_name]
+                lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+    return lines
+
+
+def render_process_metrics(engines: dict[str | None, Engine]) -> list[str]:
+    return [*render_component_metrics("flask_auth_hashing", (), {(): password_hasher.get_metrics()}),
+            *render_component_metrics("flask_auth_error_log", (), {(): error_logger.get_metrics()}),
+            *render_component_metrics("flask_auth_purge", (), {(): tombstone_purger.get_metrics()}),
+            *render_component_metrics("flask_auth_pool", ("bind",), {(bind_key or "default",): get_pool_metrics(engine)
+                                                                    for bind_key, engine in engines.items()})]
+
+
+
+class Counter():
+
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...]) -> None:
+        self.name: str = name
+        self.help: str = help
+        self.label_names: tuple[str, ...] = label_names
+        self._values: dict[tuple[str, ...], int] = {}
+
+
+    def inc(self, label_values: tuple[str, ...]) -> None:
+        self._values[label_values] = self._values.get(label_values, 0) + 1
+
+
+    def render(self) -> list[str]:
+        lines: list[str] = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{{{_format_labels(self.label_names, label_values)}}} {value}")
+        return lines
+
+
+
+class Histogram():
+
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...], buckets: tuple[float, ...]) -> None:
+        self.name: str = name
+        self.help: str = help
+        self.label_names: tuple[str, ...] = label_names
+        self.buckets: tuple[float, ...] = buckets
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+
+    def observe(self, label_values: tuple[str, ...], value: float) -> None:
+        series: tuple[list[int], list[float]] | None = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = ([0] * (len(self.buckets) + 1), [0.0])
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+
+    def render(self) -> list[str]:
+        lines: list[str] = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total) in sorted(self._series.items()):
+            labels: str = _format_labels(self.label_names, label_values)
+            cumulative_count: int = 0
+            for upper_bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative_count += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{upper_bound}"}} {cumulative_count}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total[0]}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative_count}")
+        return lines
+
+
+
+class RequestMetrics():
+
+    def __init__(self, blueprint: str = "authentication", app: Flask | None = None) -> None:
+        self.blueprint: str = blueprint
+        self.requests: Counter = Counter("flask_auth_requests_total", "Responses by endpoint and status code.",
+                                         ("endpoint", "method", "status"))
+        self.latency: Histogram = Histogram("flask_auth_request_duration_seconds", "Request latency.",
+                                            ("endpoint", "method"), LATENCY_BUCKETS)
+        self.bcrypt_latency: Histogram = Histogram("flask_auth_request_bcrypt_duration_seconds",
+                                                   "Time spent in bcrypt per request, queueing included.",
+                                                   ("endpoint", "method"), LATENCY_BUCKETS)
+        self.db_latency: Histogram = Histogram("flask_auth_request_db_duration_seconds", "Time spent executing SQL per request.",
+                                               ("endpoint", "method"), LATENCY_BUCKETS)
+        self.db_statements: Histogram = Histogram("flask_auth_request_db_statements", "SQL statements executed per request.",
+                                                  ("endpoint", "method"), STATEMENT_BUCKETS)
+        self._lock: threading.Lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+
+    def init_app(self, app: Flask) -> None:
+        if not app.config.get("METRICS_ENABLED", True):
+            return
+
+        app.before_request(self._start_request)
+        app.after_request(self._end_request)
+        app.add_url_rule("/metrics", "metrics", self.render)
+        with app.app_context():
+            for engine in db.engines.values():
+                self.instrument_engine(engine)
+        if self._record_bcrypt not in password_hasher.latency_listeners:
+            password_hasher.latency_listeners.append(self._record_bcrypt)
+        app.extensions["request_metrics"] = self
+
+
+    def instrument_engine(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+
+    def render(self) -> Response:
+        with self._lock:
+            lines: list[str] = [line for metric in (self.requests, self.latency, self.bcrypt_latency, self.db_latency,
+                                                    self.db_statements) for line in metric.render()]
+        lines.extend(render_process_metrics(db.engines))
+        return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+
+    def _start_request(self) -> None:
+        g.metrics = [time.perf_counter(), 0.0, 0.0, 0]
+
+
+    def _end_request(self, response: Response) -> Response:
+        metrics: list[float] | None = g.pop("metrics", None)
+        if metrics is None or request.blueprint != self.blueprint:
+            return response
+
+        start, bcrypt_time, db_time, statement_count = metrics
+        label_values: tuple[str, str] = (request.endpoint.rsplit(".", 1)[-1], request.method)
+        latency: float = time.perf_counter() - start
+        with self._lock:
+            self.requests.inc((*label_values, str(response.status_code)))
+            self.latency.observe(label_values, latency)
+            self.bcrypt_latency.observe(label_values, bcrypt_time)
+            self.db_latency.observe(label_values, db_time)
+            self.db_statements.observe(label_values, statement_count)
+        return response
+
+
+    def _record_bcrypt(self, latency: float) -> None:
+        metrics: list[float] | None = g.get("metrics") if has_request_context() else None
+        if metrics is not None:
+            metrics[1] += latency
+
+
+    def _before_cursor_execute(self, connection: Any, cursor: Any, statement: str, parameters: Any, context: Any,
+                               executemany: bool) -> None:
+        connection.info["metrics_query_start"] = time.perf_counter()
+
+
+    def _after_cursor_execute(self, connection: Any, cursor: Any, statement: str, parameters: Any, context: Any,
+                              executemany: bool) -> None:
+        metrics: list[float] | None = g.get("metrics") if has_request_context() else None
+        if metrics is not None:
+            metrics[2] += time.perf_counter() - connection.info.pop("metrics_query_start", time.perf_counter())
+            metrics[3] += 1
+
+
+request_metrics: RequestMetrics = RequestMetrics()
@@ -1,6 +1,9 @@
+from typing import Any
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_login import LoginManager, UserMixin
+from sqlalchemy import Table, text
+from sqlalchemy.orm import make_transient_to_detached
 
 db: SQLAlchemy = SQLAlchemy()
 flask_bcrypt: Bcrypt = Bcrypt()
@@ -17,6 +20,19 @@ class Account(db.Model, UserMixin):
     phone_number = db.Column(db.String, nullable=True)
     address = db.Column(db.String, nullable=True)
     is_logged_in = db.Column(db.Boolean, nullable=True, default=False)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    deleted_at = db.Column(db.DateTime, nullable=True)
+
+    # Deleted accounts stay as tombstones until the purge: email and username are only unique among the live accounts,
+    # and the purge scans the tombstones through their own small index.
+    __table_args__ = (
+        db.Index("ix_account_email", "email", unique=True, postgresql_where=text("deleted_at IS NULL"),
+                 sqlite_where=text("deleted_at IS NULL")),
+        db.Index("ix_account_username", "username", unique=True, postgresql_where=text("deleted_at IS NULL"),
+                 sqlite_where=text("deleted_at IS NULL")),
+        db.Index("ix_account_deleted_at", "deleted_at", postgresql_where=text("deleted_at IS NOT NULL"),
+                 sqlite_where=text("deleted_at IS NOT NULL")),
+    )
 
 
     def __init__(self, email: str, username: str, password: str, is_logged_in: bool, gender: str | None, 
@@ -31,25 +47,53 @@ class Account(db.Model, UserMixin):
 
 
     def convert_to_dict(self) -> dict[str, str]:
-        account_dict: dict[str, str] = self.__dict__
-        del account_dict["_sa_instance_state"]
-        return account_dict
+        return {column: getattr(self, column) for column in account_schema.columns}
+
+
+    def convert_to_cache_entry(self) -> dict[str, str | bool | None]:
+        return {column: getattr(self, column) for column in account_schema.cache_entry_columns}
 
 
     @staticmethod
-    def get_model_fields(method: str="all") -> list[str]:
-        auto: list[str] = ["id", "is_logged_in"]
-        required: list[str] = ["email", "username", "password"]
-        optional: list[str] = ["gender", "phone_number", "address"]
+    def restore_from_cache_entry(cache_entry: dict[str, str | bool | None]) -> "Account":
+        account: Account = Account.__mapper__.class_manager.new_instance()
+        for column, value in cache_entry.items():
+            setattr(account, column, value)
+        make_transient_to_detached(account)
+        return db.session.merge(account, load=False)
+
 
+    @staticmethod
+    def get_model_fields(method: str="all") -> list[str]:
         if method == "auto":
-            return auto
+            return list(account_schema.auto)
         elif method == "required":
-            return required
+            return list(account_schema.required)
         elif method == "optional":
-            return optional
+            return list(account_schema.optional)
         else:
-            return auto + required + optional
-    
-    
+            return list(account_schema.auto + account_schema.required + account_schema.optional)
+
+
+
+class AccountSchema():
+
+    def __init__(self, table: Table, auto: tuple[str, ...], required: tuple[str, ...], optional: tuple[str, ...],
+                 internal: tuple[str, ...] = ()) -> None:
+        # Internal columns are never exposed, requested or modified through the API.
+        self.columns: tuple[str, ...] = tuple(column for column in table.columns.keys() if column not in internal)
+        self.auto: tuple[str, ...] = auto
+        self.required: tuple[str, ...] = required
+        self.optional: tuple[str, ...] = optional
+        self.column_set: frozenset[str] = frozenset(self.columns)
+        self.mutable: frozenset[str] = frozenset(required + optional)
+        self.immutable: frozenset[str] = frozenset(auto)
+        self.cache_entry_columns: tuple[str, ...] = tuple(column for column in self.columns if column != "password")
+        self.optional_defaults: dict[str, Any] = {column: table.columns[column].default.arg
+                                                  if table.columns[column].default is not None and table.columns[column].default.is_scalar
+                                                  else None for column in optional}
+
 
+# Built once when the model is mapped: the request validation paths read these instead of rebuilding field lists.
+account_schema: AccountSchema = AccountSchema(Account.__table__, ("id", "is_logged_in", "version"),
+                                              ("email", "username", "password"), ("gender", "phone_number", "address"), ("deleted_at",))
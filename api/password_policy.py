@@ -0,0 +1,108 @@
+import hashlib
+import math
+from flask import Flask
+
+
+UPPER_CASE: int = 1
+LOWER_CASE: int = 2
+DIGIT: int = 4
+SPECIAL: int = 8
+
+CHARACTER_CLASS_RULES: tuple[tuple[int, str, str], ...] = (
+    (SPECIAL, "PASSWORD_REQUIRE_SPECIAL", "password must contain at least 1 special character"),
+    (UPPER_CASE, "PASSWORD_REQUIRE_UPPER_CASE", "password must contain at least 1 upper case letter"),
+    (LOWER_CASE, "PASSWORD_REQUIRE_LOWER_CASE", "password must contain at least 1 lower case letter"),
+    (DIGIT, "PASSWORD_REQUIRE_DIGIT", "password must contain at least 1 numerical character"),
+)
+
+
+def get_character_classes(character: str) -> int:
+    return ((UPPER_CASE if character.isupper() else 0) | (LOWER_CASE if character.islower() else 0)
+            | (DIGIT if character.isdigit() else 0) | (SPECIAL if not character.isalnum() else 0))
+
+
+ASCII_CHARACTER_CLASSES: dict[str, int] = {chr(code): get_character_classes(chr(code)) for code in range(128)}
+
+
+class BloomFilter():
+
+    def __init__(self, capacity: int, false_positive_rate: float) -> None:
+        capacity = max(1, capacity)
+        self.size: int = max(8, math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count: int = max(1, round(self.size / capacity * math.log(2)))
+        self._bits: bytearray = bytearray((self.size + 7) // 8)
+
+
+    def _get_positions(self, value: str) -> list[int]:
+        digest: bytes = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        first_hash: int = int.from_bytes(digest[:8], "little")
+        second_hash: int = int.from_bytes(digest[8:], "little") | 1
+        return [(first_hash + i * second_hash) % self.size for i in range(self.hash_count)]
+
+
+    def add(self, value: str) -> None:
+        for position in self._get_positions(value):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+
+    def __contains__(self, value: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._get_positions(value))
+
+
+    @classmethod
+    def from_file(cls, path: str, false_positive_rate: float) -> "BloomFilter":
+        with open(path, encoding="utf-8", errors="ignore") as denylist_file:
+            capacity: int = sum(1 for _ in denylist_file)
+            bloom_filter: BloomFilter = cls(capacity, false_positive_rate)
+            denylist_file.seek(0)
+            for line in denylist_file:
+                password: str = line.rstrip("\r\n")
+                if password:
+                    bloom_filter.add(password)
+        return bloom_filter
+
+
+
+class PasswordPolicy():
+
+    def __init__(self, app: Flask | None = None) -> None:
+        self.min_length: int = 6
+        self.required_classes: int = UPPER_CASE | LOWER_CASE | DIGIT | SPECIAL
+        self.class_messages: tuple[tuple[int, str], ...] = tuple((flag, message) for flag, _, message in CHARACTER_CLASS_RULES)
+        self.denylist: BloomFilter | None = None
+        if app is not None:
+            self.init_app(app)
+
+
+    def init_app(self, app: Flask) -> None:
+        self.min_length = app.config.get("PASSWORD_MIN_LENGTH", 6)
+        enabled_rules: list[tuple[int, str]] = [(flag, message) for flag, config_key, message in CHARACTER_CLASS_RULES
+                                                if app.config.get(config_key, True)]
+        self.class_messages = tuple(enabled_rules)
+        self.required_classes = sum(flag for flag, _ in enabled_rules)
+
+        denylist_path: str | None = app.config.get("PASSWORD_DENYLIST_PATH")
+        self.denylist = (BloomFilter.from_file(denylist_path, app.config.get("PASSWORD_DENYLIST_FALSE_POSITIVE_RATE", 0.001))
+                         if denylist_path else None)
+
+
+    def check(self, password: str) -> list[str]:
+        required_classes: int = self.required_classes
+        found_classes: int = 0
+        for character in password:
+            character_classes: int | None = ASCII_CHARACTER_CLASSES.get(character)
+            found_classes |= character_classes if character_classes is not None else get_character_classes(character)
+            if found_classes & required_classes == required_classes:
+                break
+
+        messages: list[str] = []
+        if len(password) < self.min_length:
+            messages.append(f"password must contain at least {self.min_length} characters")
+        if found_classes & required_classes != required_classes:
+            messages += [message for flag, message in self.class_messages if not found_classes & flag]
+        if not messages and self.denylist is not None and password in self.denylist:
+            messages.append("password is too common")
+        return messages
+
+
+password_policy: PasswordPolicy = PasswordPolicy()
@@ -0,0 +1,58 @@
+import os
+import threading
+import time
+from typing import Any
+from flask import Flask
+from sqlalchemy.engine.base import Engine
+from sqlalchemy.pool import ConnectionPoolEntry, QueuePool
+from .models import db
+
+
+class InstrumentedQueuePool(QueuePool):
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.wait_lock: threading.Lock = threading.Lock()
+        self.wait_count: int = 0
+        self.wait_total: float = 0.0
+        self.wait_max: float = 0.0
+
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start: float = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            wait: float = time.perf_counter() - start
+            with self.wait_lock:
+                self.wait_count += 1
+                self.wait_total += wait
+                self.wait_max = max(self.wait_max, wait)
+
+
+
+def init_pool_instrumentation(app: Flask) -> None:
+    database_uri: str | None = app.config.get("SQLALCHEMY_DATABASE_URI")
+    if database_uri is not None and not database_uri.startswith("sqlite"):
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"poolclass": InstrumentedQueuePool, 
+                                                   **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})}
+
+
+def dispose_engines_after_fork(app: Flask) -> None:
+    # Connections opened by the parent (e.g. during create_all) must not be shared with forked workers.
+    with app.app_context():
+        engines: list[Engine] = list(db.engines.values())
+    os.register_at_fork(after_in_child=lambda: [engine.dispose(close=False) for engine in engines])
+
+
+def get_pool_metrics(engine: Engine) -> dict[str, str | int | float]:
+    pool: Any = engine.pool
+    metrics: dict[str, str | int | float] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        metrics.update({"size": pool.size(), "checked_in": pool.checkedin(), 
+                        "checked_out": pool.checkedout(), "overflow": max(0, pool.overflow())})
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool.wait_lock:
+            metrics.update({"checkouts": pool.wait_count, "checkout_wait_total_seconds": pool.wait_total,
+                            "checkout_wait_max_seconds": pool.wait_max})
+    return metrics
@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from flask import Flask
+from .error_logging import error_logger
+from .models import db
+from . import services
+
+
+def parse_hours(hours: str | None) -> tuple[int, int] | None:
+    # "1-5" allows the hours 1 to 4 UTC, "22-4" wraps around midnight, an empty value allows any hour.
+    if not hours:
+        return None
+    start, end = (int(hour) for hour in hours.split("-", 1))
+    if not (0 <= start < 24 and 0 <= end <= 24):
+        raise ValueError(f"invalid ACCOUNT_PURGE_HOURS: {hours}")
+    return start, end
+
+
+def is_within_hours(hours: tuple[int, int] | None, hour: int) -> bool:
+    if hours is None:
+        return True
+    start, end = hours
+    return start <= hour < end if start <= end else (hour >= start or hour < end)
+
+
+
+class TombstonePurger():
+
+    def __init__(self, app: Flask | None = None) -> None:
+        self.app: Flask | None = None
+        self.enabled: bool = False
+        self.retention: float = 86400
+        self.batch_size: int = 500
+        self.max_rows_per_second: float = 1000
+        self.interval: float = 300
+        self.hours: tuple[int, int] | None = None
+        self.purged: int = 0
+        self._pid: int | None = None
+        self._stop: threading.Event = threading.Event()
+        self._lock: threading.Lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+
+    def init_app(self, app: Flask) -> None:
+        self.app = app
+        self.enabled = app.config.get("ACCOUNT_PURGE_WORKER", False)
+        self.retention = app.config.get("ACCOUNT_PURGE_RETENTION", 86400)
+        self.batch_size = app.config.get("ACCOUNT_PURGE_BATCH_SIZE", 500)
+        self.max_rows_per_second = app.config.get("ACCOUNT_PURGE_MAX_ROWS_PER_SECOND", 1000)
+        self.interval = app.config.get("ACCOUNT_PURGE_INTERVAL", 300)
+        self.hours = parse_hours(app.config.get("ACCOUNT_PURGE_HOURS"))
+        self._pid = None
+        if self.enabled:
+            app.before_request(self._start_worker)
+        app.extensions["tombstone_purger"] = self
+
+
+    def purge(self, max_rows: int | None = None, retention: float | None = None, respect_hours: bool = False) -> int:
+        # Deletes the expired tombstones batch by batch, each in its own short transaction, pausing between batches
+        # so that the purge never deletes more than max_rows_per_second.
+        purged_count: int = 0
+        while max_rows is None or purged_count < max_rows:
+            if self._stop.is_set() or (respect_hours and not is_within_hours(self.hours, datetime.now(timezone.utc).hour)):
+                break
+            batch_size: int = self.batch_size if max_rows is None else min(self.batch_size, max_rows - purged_count)
+            start: float = time.monotonic()
+            deleted_count: int = db.session.execute(services.build_purge(self.retention if retention is None else retention,
+                                                                         batch_size)).rowcount
+            db.session.commit()
+            purged_count += deleted_count
+            with self._lock:
+                self.purged += deleted_count
+            if deleted_count < batch_size:
+                break
+            if self.max_rows_per_second > 0:
+                self._stop.wait(max(0.0, deleted_count / self.max_rows_per_second - (time.monotonic() - start)))
+        return purged_count
+
+
+    def get_metrics(self) -> dict[str, int | bool]:
+        return {"enabled": self.enabled, "running": self._pid == os.getpid(), "purged": self.purged}
+
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+    def _start_worker(self) -> None:
+        # Threads do not survive a fork: each gunicorn worker starts its own purge thread on its first request.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+        threading.Thread(target=self._run, name="tombstone-purger", daemon=True).start()
+
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if is_within_hours(self.hours, datetime.now(timezone.utc).hour):
+                with self.app.app_context():
+                    try:
+                        self.purge(respect_hours=True)
+                    except Exception as e:
+                        db.session.rollback()
+                        error_logger.log_exception(e)
+            self._stop.wait(self.interval)
+
+
+tombstone_purger: TombstonePurger = TombstonePurger()
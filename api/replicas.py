@@ -0,0 +1,241 @@
+import itertools
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable
+from flask import Flask
+from flask.globals import app_ctx
+from sqlalchemy import Executable, Result, text
+from sqlalchemy.engine.base import Engine
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.orm import scoped_session, sessionmaker
+from .error_logging import error_logger
+from .models import db
+from .sessions import get_sqlite_path
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class LocalStickinessBackend():
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl: float = ttl
+        self._written_until: dict[int, float] = {}
+        self._next_sweep: float = 0.0
+        self._lock: threading.Lock = threading.Lock()
+
+
+    def mark(self, account_ids: Iterable[int]) -> None:
+        now: float = time.monotonic()
+        with self._lock:
+            if now >= self._next_sweep:
+                self._written_until = {account_id: until for account_id, until in self._written_until.items() if until >= now}
+                self._next_sweep = now + self.ttl
+            for account_id in account_ids:
+                self._written_until[account_id] = now + self.ttl
+
+
+    def is_any_marked(self, account_ids: Iterable[int]) -> bool:
+        now: float = time.monotonic()
+        return any(self._written_until.get(account_id, 0.0) >= now for account_id in account_ids)
+
+
+
+class SqliteStickinessBackend():
+
+    def __init__(self, path: str, ttl: float) -> None:
+        # One file shared by the workers of a host, like the session store: an account written through one worker is
+        # read from the primary by all of them.
+        self.path: str = path
+        self.ttl: float = ttl
+        self._local: threading.local = threading.local()
+        self._next_sweep: float = 0.0
+        self._connect().execute("CREATE TABLE IF NOT EXISTS replica_sticky "
+                                "(account_id INTEGER PRIMARY KEY, written_until REAL NOT NULL)")
+
+
+    def _connect(self) -> sqlite3.Connection:
+        if getattr(self._local, "pid", None) != os.getpid():
+            connection: sqlite3.Connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return self._local.connection
+
+
+    def mark(self, account_ids: Iterable[int]) -> None:
+        now: float = time.time()
+        connection: sqlite3.Connection = self._connect()
+        connection.executemany("INSERT OR REPLACE INTO replica_sticky (account_id, written_until) VALUES (?, ?)",
+                               [(account_id, now + self.ttl) for account_id in account_ids])
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.ttl
+            connection.execute("DELETE FROM replica_sticky WHERE written_until < ?", (now,))
+
+
+    def is_any_marked(self, account_ids: Iterable[int]) -> bool:
+        ids: list[int] = list(account_ids)
+        if len(ids) == 0:
+            return False
+        placeholders: str = ", ".join("?" * len(ids))
+        return self._connect().execute(f"SELECT 1 FROM replica_sticky WHERE account_id IN ({placeholders}) AND written_until >= ? "
+                                       "LIMIT 1", (*ids, time.time())).fetchone() is not None
+
+
+    def close(self) -> None:
+        connection: sqlite3.Connection | None = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            connection.close()
+        self._local.connection, self._local.pid = None, None
+
+
+
+class RedisStickinessBackend():
+
+    def __init__(self, url: str, ttl: float, prefix: str) -> None:
+        if redis is None:
+            raise RuntimeError("the redis package is required for the 'redis' replica stickiness type")
+        self.client = redis.Redis.from_url(url)
+        self.ttl_ms: int = max(1, int(ttl * 1000))
+        self.prefix: str = prefix
+
+
+    def mark(self, account_ids: Iterable[int]) -> None:
+        pipeline = self.client.pipeline()
+        for account_id in account_ids:
+            pipeline.psetex(f"{self.prefix}{account_id}", self.ttl_ms, 1)
+        pipeline.execute()
+
+
+    def is_any_marked(self, account_ids: Iterable[int]) -> bool:
+        keys: list[str] = [f"{self.prefix}{account_id}" for account_id in account_ids]
+        return len(keys) != 0 and self.client.exists(*keys) > 0
+
+
+
+def get_app_context_id() -> int:
+    return id(app_ctx._get_current_object())
+
+
+
+class ReplicaRouter():
+
+    def __init__(self, app: Flask | None = None) -> None:
+        self.bind_keys: list[str] = []
+        self.retry_interval: float = 10
+        self.stickiness: LocalStickinessBackend | SqliteStickinessBackend | RedisStickinessBackend = LocalStickinessBackend(5)
+        # Reads sent to a replica go through their own session, scoped to the app context like db.session: a failing
+        # replica is rolled back without touching the writes pending in db.session.
+        self.session: scoped_session = scoped_session(sessionmaker(), scopefunc=get_app_context_id)
+        self._next_replica: itertools.count = itertools.count()
+        self._down: dict[str, Engine] = {}
+        self._checker_pid: int | None = None
+        self._lock: threading.Lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+
+    def init_app(self, app: Flask) -> None:
+        # Called before db.init_app: every replica is a Flask-SQLAlchemy bind, so it gets the same engine options,
+        # pool and SQL instrumentation and fork handling as the primary.
+        replica_uris: list[str] = app.config.get("SQLALCHEMY_REPLICA_URIS") or []
+        self.bind_keys = [f"replica_{index}" for index in range(len(replica_uris))]
+        self.retry_interval = app.config.get("REPLICA_RETRY_INTERVAL", 10)
+        self._down = {}
+        app.teardown_appcontext(self._remove_session)
+        app.config["SQLALCHEMY_BINDS"] = {**app.config.get("SQLALCHEMY_BINDS", {}),
+                                          **{bind_key: {"url": uri} for bind_key, uri in zip(self.bind_keys, replica_uris)}}
+
+        stickiness_type: str = app.config.get("REPLICA_STICKINESS_TYPE", "sqlite")
+        sticky_seconds: float = app.config.get("REPLICA_STICKY_SECONDS", 5)
+        if not self.bind_keys:
+            # Without replicas every read goes to the primary: nothing to remember.
+            self.stickiness = LocalStickinessBackend(sticky_seconds)
+        elif stickiness_type == "sqlite":
+            self.stickiness = SqliteStickinessBackend(get_sqlite_path(app, "REPLICA_STICKINESS_SQLITE_PATH", "sessions.db"),
+                                                      sticky_seconds)
+        elif stickiness_type == "local":
+            self.stickiness = LocalStickinessBackend(sticky_seconds)
+        elif stickiness_type == "redis":
+            self.stickiness = RedisStickinessBackend(app.config.get("REPLICA_STICKINESS_REDIS_URL"), sticky_seconds,
+                                                     "replica_sticky:")
+        else:
+            raise ValueError(f"unknown REPLICA_STICKINESS_TYPE: {stickiness_type}")
+
+
+    def mark_written(self, *account_ids: int | str) -> None:
+        if self.bind_keys:
+            self.stickiness.mark([int(account_id) for account_id in account_ids])
+
+
+    def get_replica(self, account_ids: Iterable[int | str] = ()) -> Engine | None:
+        if not self.bind_keys or self.stickiness.is_any_marked([int(account_id) for account_id in account_ids]):
+            return None
+
+        # Round robin over the replicas, skipping the failed ones until the background health check brings them back.
+        start: int = next(self._next_replica)
+        for offset in range(len(self.bind_keys)):
+            bind_key: str = self.bind_keys[(start + offset) % len(self.bind_keys)]
+            if bind_key not in self._down:
+                return db.engines[bind_key]
+        return None
+
+
+    def execute(self, statement: Executable, account_ids: Iterable[int | str] = ()) -> Result:
+        replica: Engine | None = self.get_replica(account_ids)
+        if replica is None:
+            return db.session.execute(statement)
+        try:
+            return self.session.execute(statement, bind_arguments={"bind": replica})
+        except OperationalError as e:
+            error_logger.log_exception(e, logging.WARNING)
+            self.session.rollback()
+            self._mark_down(replica)
+            return db.session.execute(statement)
+
+
+    def check_down_replicas(self) -> None:
+        for bind_key, engine in list(self._down.items()):
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+            except DBAPIError:
+                continue
+            with self._lock:
+                self._down.pop(bind_key, None)
+
+
+    def _mark_down(self, replica: Engine) -> None:
+        with self._lock:
+            for bind_key in self.bind_keys:
+                if db.engines[bind_key] is replica:
+                    self._down[bind_key] = replica
+            # Health checks run on a background thread, never on the request path. It stops once every replica is back.
+            if self._checker_pid == os.getpid():
+                return
+            self._checker_pid = os.getpid()
+        threading.Thread(target=self._run_health_checks, name="replica-health-check", daemon=True).start()
+
+
+    def _run_health_checks(self) -> None:
+        while True:
+            time.sleep(self.retry_interval)
+            self.check_down_replicas()
+            with self._lock:
+                if not self._down:
+                    self._checker_pid = None
+                    return
+
+
+    def _remove_session(self, exception: BaseException | None = None) -> None:
+        self.session.remove()
+        if isinstance(self.stickiness, SqliteStickinessBackend):
+            self.stickiness.close()
+
+
+replica_router: ReplicaRouter = ReplicaRouter()
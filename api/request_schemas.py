@@ -0,0 +1,165 @@
+import json
+import re
+from typing import Any, Callable
+from flask import Flask, Response, g, request
+from .responses import failure_response
+
+
+STRING_LITERAL: re.Pattern[bytes] = re.compile(rb'"(?:[^"\\]|\\.)*"')
+
+
+class Field():
+
+    def __init__(self, required: bool = False, nullable: bool = False, max_length: int = 256) -> None:
+        self.required: bool = required
+        self.nullable: bool = nullable
+        self.max_length: int = max_length
+
+
+
+def compile_field_checks(fields: dict[str, Field]) -> Callable[[dict[str, Any]], str | None]:
+    required_fields: tuple[str, ...] = tuple(name for name, field in fields.items() if field.required)
+    field_checks: tuple[tuple[str, bool, int], ...] = tuple((name, field.nullable, field.max_length) for name, field in fields.items())
+
+    def check_fields(body: dict[str, Any]) -> str | None:
+        missing_fields: list[str] = [name for name in required_fields if name not in body]
+        if missing_fields:
+            return "missing field: " + ", ".join(missing_fields)
+        for name, nullable, max_length in field_checks:
+            value: Any = body.get(name)
+            if value is None:
+                if name in body and not nullable:
+                    return f"field cannot be null: {name}"
+            elif not isinstance(value, str):
+                return f"field must be a string: {name}"
+            elif len(value) > max_length:
+                return f"field is too long: {name} (at most {max_length} characters)"
+        return None
+
+    return check_fields
+
+
+
+class RequestSchema():
+
+    def __init__(self, fields: dict[str, Field] | None = None, body_type: type = dict, max_body_size_key: str = "REQUEST_MAX_BODY_SIZE",
+                 max_containers: int | str = 16) -> None:
+        # fields=None only checks the envelope (size, nesting, top-level type): the route validates the content.
+        self.fields: dict[str, Field] | None = fields
+        self.body_type: type = body_type
+        self.max_body_size_key: str = max_body_size_key
+        self.max_containers: int | str = max_containers
+
+
+    def compile(self, config: dict[str, Any]) -> Callable[[bytes], tuple[Any, str | None]]:
+        max_containers: int = (self.max_containers if isinstance(self.max_containers, int)
+                               else config.get(self.max_containers, 1000) + 2)
+        body_type: type = self.body_type
+        type_message: str = "the body must be a JSON " + ("object" if body_type is dict else "array")
+        check_fields: Callable[[dict[str, Any]], str | None] | None = (compile_field_checks(self.fields)
+                                                                       if self.fields is not None else None)
+
+        def validate(raw_body: bytes) -> tuple[Any, str | None]:
+            # Containers are counted outside of string literals before parsing, which also bounds the nesting depth.
+            stripped_body: bytes = STRING_LITERAL.sub(b"", raw_body)
+            if stripped_body.count(b"{") + stripped_body.count(b"[") > max_containers:
+                return None, "the body is too deeply nested"
+            try:
+                body: Any = json.loads(raw_body)
+            except ValueError:
+                return None, "the body must be valid JSON"
+            if not isinstance(body, body_type):
+                return None, type_message
+            if check_fields is None:
+                return body, None
+            message: str | None = check_fields(body)
+            return (None, message) if message is not None else (body, None)
+
+        return validate
+
+
+
+SIGNUP_FIELDS: dict[str, Field] = {
+    "email": Field(required=True, max_length=254),
+    "username": Field(required=True, max_length=64),
+    "password": Field(required=True, max_length=1024),
+    "gender": Field(nullable=True, max_length=32),
+    "phone_number": Field(nullable=True, max_length=32),
+    "address": Field(nullable=True, max_length=512),
+}
+
+# The items of /accounts/batch and of the import command, reported one by one instead of rejecting the whole batch.
+check_signup_fields: Callable[[dict[str, Any]], str | None] = compile_field_checks(SIGNUP_FIELDS)
+
+ROUTE_SCHEMAS: dict[str, RequestSchema] = {
+    "authentication.signup": RequestSchema(SIGNUP_FIELDS),
+    "authentication.login": RequestSchema({"username": Field(required=True, max_length=64),
+                                           "password": Field(required=True, max_length=1024)}),
+    "authentication.modify_content": RequestSchema({**{name: Field(nullable=field.nullable, max_length=field.max_length)
+                                                       for name, field in SIGNUP_FIELDS.items()},
+                                                    "password_validation": Field(max_length=1024)}),
+    "authentication.refresh_token": RequestSchema({"refresh_token": Field(max_length=4096)}),
+    "authentication.batch_signup": RequestSchema(body_type=list, max_body_size_key="REQUEST_MAX_BATCH_BODY_SIZE",
+                                                 max_containers="ACCOUNT_BATCH_MAX_SIZE"),
+    "authentication.batch_delete": RequestSchema(max_body_size_key="REQUEST_MAX_BATCH_BODY_SIZE", max_containers=2),
+}
+
+
+class RequestValidator():
+
+    def __init__(self, schemas: dict[str, RequestSchema] = ROUTE_SCHEMAS, app: Flask | None = None) -> None:
+        self.schemas: dict[str, RequestSchema] = schemas
+        self.validators: dict[str, tuple[int, Callable[[bytes], tuple[Any, str | None]]]] = {}
+        if app is not None:
+            self.init_app(app)
+
+
+    def init_app(self, app: Flask) -> None:
+        self.validators = {endpoint: (app.config.get(schema.max_body_size_key, 16384), schema.compile(app.config))
+                           for endpoint, schema in self.schemas.items()}
+        if isinstance(app, Flask):
+            # The ASGI app reads the body asynchronously and calls check_content_length and validate_body itself.
+            app.before_request(self._validate_request)
+        app.extensions["request_validator"] = self
+
+
+    def get_max_body_size(self, endpoint: str | None) -> int | None:
+        validator: tuple[int, Callable[[bytes], tuple[Any, str | None]]] | None = self.validators.get(endpoint)
+        return validator[0] if validator is not None else None
+
+
+    def check_content_length(self, endpoint: str | None, content_length: int | None) -> Response | None:
+        max_body_size: int | None = self.get_max_body_size(endpoint)
+        if max_body_size is not None and content_length is not None and content_length > max_body_size:
+            return failure_response(f"the body is larger than {max_body_size} bytes", 413)
+        return None
+
+
+    def validate_body(self, endpoint: str | None, raw_body: bytes) -> tuple[Any, Response | None]:
+        max_body_size, validate = self.validators[endpoint]
+        if len(raw_body) > max_body_size:
+            return None, failure_response(f"the body is larger than {max_body_size} bytes", 413)
+
+        body, message = validate(raw_body)
+        if message is not None:
+            return None, failure_response(message, 400)
+        return body, None
+
+
+    def _validate_request(self) -> Response | None:
+        max_body_size: int | None = self.get_max_body_size(request.endpoint)
+        if max_body_size is None:
+            return None
+
+        response: Response | None = self.check_content_length(request.endpoint, request.content_length)
+        if response is not None:
+            return response
+        # Reads at most one byte past the limit, whatever the Content-Length claims.
+        body, response = self.validate_body(request.endpoint, request.stream.read(max_body_size + 1))
+        if response is not None:
+            return response
+        g.request_body = body
+        return None
+
+
+request_validator: RequestValidator = RequestValidator()
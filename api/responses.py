@@ -0,0 +1,42 @@
+import math
+from typing import Any
+from flask import Response
+from .hashing import password_hasher
+from .models import account_schema
+from .serializers import make_json_response
+
+# Shared by the WSGI and the ASGI routes: they need no app context, and Quart serves werkzeug responses as they are.
+
+
+def failure_response(message: str | list[str], code: int) -> Response:
+    return make_json_response({"status": "failure", "message": message, "code": str(code)}, code)
+
+
+def success_response(message: Any, **extra: Any) -> Response:
+    return make_json_response({"status": "success", "message": message, **extra, "code": "200"}, 200)
+
+
+def unknown_field_response() -> Response:
+    return failure_response("unknown field, available fields: " + ", ".join(account_schema.columns), 400)
+
+
+def hashing_busy_response() -> Response:
+    response: Response = failure_response("the password hashing service is busy, please retry later", 503)
+    response.headers["Retry-After"] = str(password_hasher.retry_after)
+    return response
+
+
+def login_throttled_response(retry_after: float) -> Response:
+    response: Response = failure_response("too many login attempts, please retry later", 429)
+    response.headers["Retry-After"] = str(math.ceil(retry_after))
+    return response
+
+
+def precondition_failed_response() -> Response:
+    return failure_response("the account has been modified since the version given in If-Match", 412)
+
+
+def not_modified_response(etag: str) -> Response:
+    response: Response = Response("", 304)
+    response.headers["ETag"] = etag
+    return response
@@ -1,17 +1,90 @@
-from flask import Blueprint, Response, request, make_response, jsonify
-from flask_sqlalchemy.query import Query
+from typing import Iterator
+from flask import Blueprint, Request, Response, current_app, g, request, session, stream_with_context
+from sqlalchemy import Result, Row, insert, select
+from sqlalchemy.exc import IntegrityError
 from flask_login import login_required, login_user, logout_user, current_user
 from werkzeug.local import LocalProxy
-from .models import Account, db, flask_bcrypt, login_manager
+from .models import Account, account_schema, db, login_manager
+from .hashing import HashingQueueFull, password_hasher
+from .cache import account_cache, account_etag_cache
+from .sessions import SESSION_TOKEN_KEY, session_store
+from .throttling import login_throttle
+from .tokens import InvalidToken, TokenUser, token_manager
+from .error_logging import error_logger
+from .replicas import replica_router
+from .serializers import dumps, make_json_response, serialize_account
+from .responses import (failure_response, hashing_busy_response, login_throttled_response, not_modified_response,
+                        precondition_failed_response, success_response, unknown_field_response)
 from . import services
 
 
 authentication: Blueprint = Blueprint("authentication", __name__)
 
 
+def invalidate_account(account_id: int | str) -> None:
+    # Called after every change to an account, its login state included.
+    account_cache.invalidate(account_id)
+    account_etag_cache.invalidate(account_id)
+    replica_router.mark_written(account_id)
+
+
+def cache_etag(account_id: int, fields_key: str, etag: str) -> None:
+    # Most GETs find the ETag they cached last time: the entry is only rewritten when it changed.
+    cached_etags: dict[str, str] = account_etag_cache.get(account_id) or {}
+    if cached_etags.get(fields_key) != etag:
+        account_etag_cache.set(account_id, {**cached_etags, fields_key: etag})
+
+
+def start_session(account: Account) -> str:
+    invalidate_account(account.id)
+    session_token: str = session_store.create(account.id)
+    session[SESSION_TOKEN_KEY] = session_token
+    login_user(account)
+    return session_token
+
+
+def end_session(session_token: str) -> None:
+    session_store.revoke(session_token)
+    token_manager.revoke_session(session_token)
+
+
+def end_account_sessions(account_id: int | str) -> None:
+    session_store.revoke_account(account_id)
+    token_manager.revoke_account(account_id)
+
+
+def serialize_accounts(accounts: list[Account] | list[Row], columns: list[str]) -> list[dict[str, str | int | bool | None]]:
+    serialized_accounts: list[dict[str, str | int | bool | None]] = [serialize_account(account, columns) for account in accounts]
+    if "is_logged_in" in columns:
+        logged_in_ids: set[int] = session_store.get_logged_in_account_ids(account["id"] for account in serialized_accounts)
+        for account in serialized_accounts:
+            account["is_logged_in"] = account["id"] in logged_in_ids
+    return serialized_accounts
+
+
 @login_manager.user_loader
 def load_user(id: int) -> Account | None:
-    return db.session.query(Account).filter(Account.id == id).first()
+    token: str | None = session.get(SESSION_TOKEN_KEY)
+    if token is None or str(session_store.get_account_id(token)) != str(id):
+        return None
+
+    cache_entry: dict[str, str | bool | None] | None = account_cache.get(id)
+    if cache_entry is not None:
+        return Account.restore_from_cache_entry(cache_entry)
+
+    account: Account | None = replica_router.execute(select(Account).where(Account.id == id, Account.deleted_at.is_(None)),
+                                                     [id]).scalar()
+    if account is not None:
+        account_cache.set(id, account.convert_to_cache_entry())
+    return account
+
+
+@login_manager.request_loader
+def load_user_from_token(incoming_request: Request) -> TokenUser | None:
+    authorization: str = incoming_request.headers.get("Authorization", "")
+    if not token_manager.enabled or not authorization.startswith("Bearer "):
+        return None
+    return token_manager.load_user(authorization[len("Bearer "):])
 
 
 @authentication.route("/")
@@ -22,208 +95,433 @@ def base() -> str:
 @authentication.route("/db-content", methods=["GET"])
 def show_db_content() -> Response:
     try:
-        all_accounts: Query = db.session.query(Account).order_by(Account.id)
-        account_lists: list[dict[str, str | None]] = [account.convert_to_dict() for account in all_accounts]
-        return make_response(jsonify(account_lists), 200)
+        columns: list[str] | None = services.get_requested_columns(request.args.get("fields"))
+        if columns is None:
+            return unknown_field_response()
+
+        try:
+            after_id: int | None = int(request.args["after_id"]) if "after_id" in request.args else None
+            limit: int | None = int(request.args["limit"]) if "limit" in request.args else None
+        except ValueError:
+            message: str = "'after_id' and 'limit' must be integers"
+            return failure_response(message, 400)
+
+        is_json_lines: bool = request.args.get("format") == "jsonl"
+        if not is_json_lines and (limit is not None or after_id is not None):
+            max_limit: int = current_app.config.get("DB_CONTENT_MAX_LIMIT", 1000)
+            limit = max(1, min(limit if limit is not None else max_limit, max_limit))
+            rows: list[Row] = replica_router.execute(services.build_db_content_query(columns, after_id, limit)).all()
+            next_after_id: int | None = rows[-1].id if len(rows) == limit else None
+            return make_json_response({"status": "success", "message": serialize_accounts(rows, columns),
+                                       "next_after_id": next_after_id, "code": "200"}, 200)
+
+        result: Result = replica_router.execute(services.build_db_content_query(columns, after_id, limit)
+                                                .execution_options(yield_per=current_app.config.get("DB_CONTENT_YIELD_PER", 1000)))
+        accounts: Iterator[dict[str, str | int | bool | None]] = (account for partition in result.partitions()
+                                                                  for account in serialize_accounts(partition, columns))
+        if is_json_lines:
+            return Response(stream_with_context(dumps(account) + b"\n" for account in accounts),
+                            mimetype="application/x-ndjson")
+
+        def generate_json_array() -> Iterator[bytes]:
+            separator: bytes = b"["
+            for account in accounts:
+                yield separator + dumps(account)
+                separator = b","
+            yield b"[]" if separator == b"[" else b"]"
+
+        return Response(stream_with_context(generate_json_array()), mimetype="application/json")
+
     except Exception as e:
-        print(e)
-        return make_response(jsonify({"status": "failure", "message": "get request failed", "code": "500"}), 500)
+        error_logger.log_exception(e)
+        return failure_response("get request failed", 500)
 
 
 @authentication.route("/accounts/<id>", methods=["GET"])
 def get_account(id: int) -> Response:
     try:
-        account_info: Account | None = db.session.query(Account).filter(Account.id == id).first()
+        columns: list[str] | None = services.get_requested_columns(request.args.get("fields"))
+        if columns is None:
+            return unknown_field_response()
+
+        # ETags are cached per account and field list: a poll with a current If-None-Match is answered without a query.
+        fields_key: str = ",".join(columns)
+        if_none_match: str | None = request.headers.get("If-None-Match")
+        cached_etags: dict[str, str] | None = account_etag_cache.get(id) if if_none_match is not None else None
+        if cached_etags is not None and fields_key in cached_etags and services.etag_matches(if_none_match, cached_etags[fields_key]):
+            return not_modified_response(cached_etags[fields_key])
+
+        account_info: Account | None = replica_router.execute(select(Account).where(Account.id == id, Account.deleted_at.is_(None)),
+                                                              [id]).scalar()
         if not account_info:
-            return make_response(jsonify({"status": "failure", "message": "the account does not exist", "code": "404"}), 404)
+            return failure_response("the account does not exist", 404)
         
-        return make_response(jsonify({"status": "success", "message": account_info.convert_to_dict(), "code": "200"}), 200)
+        account_data: dict[str, str | int | bool | None] = serialize_accounts([account_info], columns)[0]
+        etag: str = services.format_etag(account_info.version, account_data.get("is_logged_in"))
+        cache_etag(id, fields_key, etag)
+        if services.etag_matches(if_none_match, etag):
+            return not_modified_response(etag)
+
+        response: Response = success_response(account_data)
+        response.headers["ETag"] = etag
+        return response
     
     except Exception as e:
-        print(e)
-        return make_response(jsonify({"status": "failure", "message": "account request failed", "code": "500"}), 500)
+        error_logger.log_exception(e)
+        return failure_response("account request failed", 500)
     
 
+@authentication.route("/accounts", methods=["GET"])
+def get_accounts() -> Response:
+    try:
+        max_batch_size: int = current_app.config.get("ACCOUNT_BATCH_MAX_SIZE", 1000)
+        ids: list[int] | None = services.parse_id_list(request.args.get("ids"))
+        if not ids or len(ids) > max_batch_size:
+            message: str = f"'ids' must be a comma separated list of 1 to {max_batch_size} account ids"
+            return failure_response(message, 400)
+
+        columns: list[str] | None = services.get_requested_columns(request.args.get("fields"))
+        if columns is None:
+            return unknown_field_response()
+
+        rows: list[Row] = replica_router.execute(services.build_accounts_query(columns, ids), ids).all()
+        missing_ids: list[int] = sorted(set(ids) - {row.id for row in rows})
+        return make_json_response({"status": "success", "message": serialize_accounts(rows, columns),
+                                   "missing_ids": missing_ids, "code": "200"}, 200)
+
+    except Exception as e:
+        error_logger.log_exception(e)
+        return failure_response("accounts request failed", 500)
+
+
+@authentication.route("/accounts/batch", methods=["POST"])
+def batch_signup() -> Response:
+    try:
+        max_batch_size: int = current_app.config.get("ACCOUNT_BATCH_MAX_SIZE", 1000)
+        batch: list[dict[str, str]] = g.request_body
+        if not 0 < len(batch) <= max_batch_size:
+            message: str = f"the body must be a list of 1 to {max_batch_size} accounts"
+            return failure_response(message, 400)
+
+        errors: list[str | list[str] | None] = services.validate_signup_batch(db.session, batch)
+        valid_accounts: list[dict[str, str]] = [data for data, error in zip(batch, errors) if error is None]
+        password_hashes: list[str] = password_hasher.generate_password_hashes([data["password"] for data in valid_accounts])
+        new_rows: list[dict[str, str | bool | None]] = services.build_signup_batch_rows(valid_accounts, password_hashes)
+        new_ids: list[int] = []
+        if len(new_rows) != 0:
+            try:
+                new_ids = db.session.execute(insert(Account).returning(Account.id, sort_by_parameter_order=True),
+                                             new_rows).scalars().all()
+                db.session.commit()
+                replica_router.mark_written(*new_ids)
+            except IntegrityError as e:
+                db.session.rollback()
+                message: str | None = services.get_unicity_error_message(e)
+                if message is None:
+                    raise
+                return failure_response("batch rejected: " + message, 400)
+
+        results: list[dict[str, str | int | list[str]]] = services.get_signup_batch_results(errors, new_ids)
+        return make_json_response({"status": "success", "message": results, "code": "200"}, 200)
+
+    except HashingQueueFull:
+        return hashing_busy_response()
+
+    except Exception as e:
+        error_logger.log_exception(e)
+        return failure_response("batch signup request failed", 500)
+
+
+@authentication.route("/accounts/batch", methods=["DELETE"])
+def batch_delete() -> Response:
+    try:
+        max_batch_size: int = current_app.config.get("ACCOUNT_BATCH_MAX_SIZE", 1000)
+        data: dict[str, list[int]] = g.request_body
+        ids: list[int] | None = services.parse_id_list(data.get("ids"))
+        if not ids or len(ids) > max_batch_size:
+            message: str = f"'ids' must be a list of 1 to {max_batch_size} account ids"
+            return failure_response(message, 400)
+
+        deleted_ids: list[int] = db.session.execute(services.build_soft_delete(ids)).scalars().all()
+        db.session.commit()
+        for deleted_id in deleted_ids:
+            invalidate_account(deleted_id)
+            end_account_sessions(deleted_id)
+
+        message: dict[str, list[int]] = {"deleted_ids": sorted(deleted_ids), "missing_ids": sorted(set(ids) - set(deleted_ids))}
+        return make_json_response({"status": "success", "message": message, "code": "200"}, 200)
+
+    except Exception as e:
+        error_logger.log_exception(e)
+        return failure_response("batch delete request failed", 500)
+
+
 @authentication.route("/signup", methods=["POST"])
 def signup() -> Response:
     try:
-        data: dict[str, str] = request.get_json()
+        data: dict[str, str] = g.request_body
         missing_fields: list[str] = services.get_missing_field(data)
         optional_fields_dict: dict[str, str | None] = services.handle_optional_field_for_signup(data)
 
         if len(missing_fields) != 0:
             message: str = "missing field: " + ", ".join(missing_fields)
-            return make_response(jsonify({"status": "failure", "message": message, "code": "400"}), 400)
-    
-        if not services.check_email_unicity(db.session, data["email"]):
-            message: str = "an account is already registered with this email"
-            return make_response(jsonify({"status": "failure", "message": message, "code": "400"}), 400)
-
-        if not services.check_username_unicity(db.session, data["username"]):
-            message: str = "the username is already taken"
-            return make_response(jsonify({"status": "failure", "message": message, "code": "400"}), 400)
+            return failure_response(message, 400)
 
         password_validity_check: dict[str, bool | list[str]] = services.check_password_validity(data["password"])
         is_password_valid: bool = password_validity_check["validity"]
         password_not_valid_message: list[str] = password_validity_check["message"]
         
         if not is_password_valid:
-            return make_response(jsonify({"status": "failure", "message": password_not_valid_message, "code": "400"}), 400)
+            return failure_response(password_not_valid_message, 400)
 
         new_account: Account = Account(email=data["email"], username=data["username"], 
-                                       password=flask_bcrypt.generate_password_hash(data["password"]).decode("utf-8"), 
+                                       password=password_hasher.generate_password_hash(data["password"]), 
                                        gender=optional_fields_dict["gender"], phone_number=optional_fields_dict["phone_number"],
-                                       address=optional_fields_dict["address"], is_logged_in=True)
+                                       address=optional_fields_dict["address"], is_logged_in=False)
         db.session.add(new_account)
-        db.session.commit()
-        login_user(new_account)
-        return make_response(jsonify({"status": "success", "message": "signup success", "code": "200"}), 200)
+        try:
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            message: str | None = services.get_unicity_error_message(e)
+            if message is None:
+                raise
+            return failure_response(message, 400)
+
+        start_session(new_account)
+        return success_response("signup success")
                     
+    except HashingQueueFull:
+        return hashing_busy_response()
+
     except Exception as e:
-        print(e)
-        return make_response(jsonify({"status": "failure", "message": "signup request failed", "code": "500"}), 500)
+        error_logger.log_exception(e)
+        return failure_response("signup request failed", 500)
 
 
 @authentication.route("/login", methods=["POST"])
 def login() -> Response:
     try:
-        data: dict[str, str] = request.get_json()
-        account: Account | None = db.session.query(Account).filter(Account.username == data["username"]).first()
+        data: dict[str, str] = g.request_body
+        retry_after: float | None = login_throttle.hit(data["username"], request.remote_addr)
+        if retry_after is not None:
+            return login_throttled_response(retry_after)
+
+        account: Account | None = services.get_account_for_login(db.session, data["username"])
 
         if account is None:
-            return make_response(jsonify({"status": "failure", "message": "wrong username", "code": "400"}), 400)
+            return failure_response("wrong username", 400)
         
-        if account.is_logged_in == True:
-            return make_response(jsonify({"status": "failure", "message": "the account is already logged in", "code": "400"}), 400)
+        if not session_store.allow_multiple_per_account and session_store.is_logged_in(account.id):
+            return failure_response("the account is already logged in", 400)
         
         real_password: str = account.password
-        if not flask_bcrypt.check_password_hash(real_password, data["password"]):
-            return make_response(jsonify({"status": "failure", "message": "wrong password", "code": "400"}), 400)
-                    
-        account.is_logged_in: bool = True
-        db.session.commit()
-        login_user(account)
-        return make_response(jsonify({"status": "success", "message": "login success", "code": "200"}), 200)
+        if not password_hasher.check_password_hash(real_password, data["password"]):
+            return failure_response("wrong password", 400)
+        
+        if password_hasher.needs_rehash(real_password):
+            account.password = password_hasher.generate_password_hash(data["password"])
+            db.session.commit()
+
+        session_token: str = start_session(account)
+        response_body: dict[str, str | int] = {"status": "success", "message": "login success", "code": "200"}
+        if token_manager.enabled:
+            response_body.update(token_manager.issue(account.id, data["username"], session_token))
+        return make_json_response(response_body, 200)
                
+    except HashingQueueFull:
+        return hashing_busy_response()
+
     except Exception as e:
-        print(e)
-        return make_response(jsonify({"status": "failure", "message": "login request failed", "code": "500"}), 500)
+        error_logger.log_exception(e)
+        return failure_response("login request failed", 500)
     
 
+@authentication.route("/token/refresh", methods=["POST"])
+def refresh_token() -> Response:
+    try:
+        if not token_manager.enabled:
+            return failure_response("token authentication is disabled", 404)
+
+        data: dict[str, str] = g.request_body
+        try:
+            claims, tokens = token_manager.refresh(str(data.get("refresh_token", "")))
+        except InvalidToken as e:
+            return failure_response("invalid refresh token: " + str(e), 401)
+
+        if session_store.get_account_id(claims["sid"]) is None:
+            token_manager.revoke_session(claims["sid"])
+            return failure_response("the session has ended", 401)
+
+        return success_response("token refreshed", **tokens)
+
+    except Exception as e:
+        error_logger.log_exception(e)
+        return failure_response("token refresh request failed", 500)
+
+
 @authentication.route("/home")
 @login_required
 def home() -> Response:
     try:
         account: LocalProxy = current_user
         if account.is_anonymous:
-            return make_response(jsonify({"status": "failure", "message": "login required", "code": "401"}), 401)
+            return failure_response("login required", 401)
         
         welcome_message: str = "Welcome " + account.username + "!"
         return welcome_message
     
     except Exception as e:
-        print(e)
-        return make_response(jsonify({"status": "failure", "message": "access to homepage failed", "code": "500"}), 500)
+        error_logger.log_exception(e)
+        return failure_response("access to homepage failed", 500)
 
 
 @authentication.route("/logout/<id>", methods=["POST"])
 @login_required
 def logout(id: int) -> Response:
     try:
-        account_to_logout: Account | None = db.session.query(Account).filter(Account.id == id).first()
+        account_to_logout: Row | None = db.session.query(Account.id).filter(Account.id == id, Account.deleted_at.is_(None)).first()
         if account_to_logout is None:
-            return make_response(jsonify({"status": "failure", "message": "the account does not exist", "code": "404"}), 404)
+            return failure_response("the account does not exist", 404)
         
-        if account_to_logout.is_logged_in == False:
-            return make_response(jsonify({"status": "failure", "message": "the account is already logged out", "code": "400"}), 400)
+        if not session_store.is_logged_in(account_to_logout.id):
+            return failure_response("the account is already logged out", 400)
         
-        account_to_logout.is_logged_in: bool = False
-        db.session.commit()
-        logout_user()
-        return make_response(jsonify({"status": "success", "message": "the account has been logged out", "code": "200"}), 200)
+        # The caller's own session ends; logging out another account leaves the caller's session untouched.
+        token: str | None = session.get(SESSION_TOKEN_KEY) or getattr(current_user, "session_id", None)
+        if token is not None and session_store.get_account_id(token) == account_to_logout.id:
+            end_session(token)
+            session.pop(SESSION_TOKEN_KEY, None)
+            logout_user()
+        else:
+            end_account_sessions(account_to_logout.id)
+        invalidate_account(account_to_logout.id)
+        return success_response("the account has been logged out")
             
     except Exception as e:
-        print(e)
-        return make_response(jsonify({"status": "failure", "message": "logout request failed", "code": "500"}), 500)
+        error_logger.log_exception(e)
+        return failure_response("logout request failed", 500)
 
 
 
 @authentication.route("/accounts/<id>", methods=["PATCH"])
 def modify_content(id: int) -> Response:
     try:
-        request_params: dict[str, str] = request.get_json()
-        account_to_update: Account | None = db.session.query(Account).filter(Account.id == id).first()
-
-        if account_to_update is None:
-            return make_response(jsonify({"status": "failure", "message": "the account does not exist", "code": "400"}), 400)
-        
-        for column_name in request_params.keys():
-            if column_name != "password" and column_name in Account.get_model_fields():
-                setattr(account_to_update, column_name, request_params[column_name])
-
-            elif column_name == "password":
-                if "password_validation" not in request_params.keys():
-                    message: str = "'password_validation' field missing (should contain original password as value)"
-                    return make_response(jsonify({"status": "failure", "message": message, "code": "400"}), 400)
-                    
-                is_original_password_validated: bool = flask_bcrypt.check_password_hash(account_to_update.password, 
-                                                                                        request_params["password_validation"])
-                            
-                if not is_original_password_validated:
-                    message: str = "wrong original password"
-                    return make_response(jsonify({"status": "failure", "message": message, "code": "400"}), 400)  
-                
-                password_validity_check: dict[str, bool | list[str]] = services.check_password_validity(request_params[column_name])
-                is_password_valid: bool = password_validity_check["validity"]
-                password_not_valid_message: list[str] = password_validity_check["message"]
-
-                if not is_password_valid:
-                    return make_response(jsonify({"status": "failure", "message": password_not_valid_message, "code": "400"}), 400)
-                
-                new_password: str = flask_bcrypt.generate_password_hash(request_params[column_name]).decode("utf-8")
-                setattr(account_to_update, column_name, new_password)  
-                        
-        db.session.commit()
-        return make_response(jsonify({"status": "success", "message": "the account has been updated", "code": "200"}), 200)
+        request_params: dict[str, str] = g.request_body
+        immutable_fields: list[str] = services.get_immutable_fields(request_params)
+        if len(immutable_fields) != 0:
+            message: str = "field cannot be modified: " + ", ".join(immutable_fields)
+            return failure_response(message, 400)
+
+        try:
+            expected_version: int | None = services.parse_if_match(request.headers.get("If-Match"))
+        except ValueError as e:
+            return failure_response(str(e), 400)
+
+        new_values: dict[str, str | None] = services.get_new_values(request_params)
+        if "password" in request_params or len(new_values) == 0:
+            current_account: Row | None = (db.session.query(Account.password, Account.version)
+                                           .filter(Account.id == id, Account.deleted_at.is_(None)).first())
+            if current_account is None:
+                return failure_response("the account does not exist", 400)
+            if expected_version is not None and current_account.version != expected_version:
+                return precondition_failed_response()
+            # The update below only applies if nobody changed the account since this read.
+            expected_version = current_account.version
+
+        if "password" in request_params:
+            if "password_validation" not in request_params.keys():
+                message: str = "'password_validation' field missing (should contain original password as value)"
+                return failure_response(message, 400)
+
+            is_original_password_validated: bool = password_hasher.check_password_hash(current_account.password, 
+                                                                                       request_params["password_validation"])
+            if not is_original_password_validated:
+                message: str = "wrong original password"
+                return failure_response(message, 400)  
+
+            password_validity_check: dict[str, bool | list[str]] = services.check_password_validity(request_params["password"])
+            is_password_valid: bool = password_validity_check["validity"]
+            password_not_valid_message: list[str] = password_validity_check["message"]
+
+            if not is_password_valid:
+                return failure_response(password_not_valid_message, 400)
+
+            new_values["password"] = password_hasher.generate_password_hash(request_params["password"])
+
+        new_version: int | None = expected_version
+        if len(new_values) != 0:
+            try:
+                new_version = db.session.execute(services.build_account_update(id, new_values, expected_version)).scalar()
+                db.session.commit()
+            except IntegrityError as e:
+                db.session.rollback()
+                message: str | None = services.get_unicity_error_message(e)
+                if message is None:
+                    raise
+                return failure_response(message, 400)
+
+            if new_version is None:
+                if db.session.query(Account.id).filter(Account.id == id, Account.deleted_at.is_(None)).first() is not None:
+                    return precondition_failed_response()
+                return failure_response("the account does not exist", 400)
+            invalidate_account(id)
+
+        response: Response = success_response("the account has been updated")
+        response.headers["ETag"] = services.format_etag(new_version)
+        return response
             
+    except HashingQueueFull:
+        db.session.rollback()
+        return hashing_busy_response()
+
     except Exception as e:
-        print(e)
-        return make_response(jsonify({"status": "failure", "message": "updated request failed", "code": "500"}), 500)
+        error_logger.log_exception(e)
+        return failure_response("updated request failed", 500)
 
 
 
 @authentication.route("/accounts/<id>", methods=["PUT"])
 def reset_optional_field(id: int) -> Response:
     try:
-        account_to_update: Account | None = db.session.query(Account).filter(Account.id == id).first()
-        if account_to_update is None:
-            return make_response(jsonify({"status": "failure", "message": "the account does not exist", "code": "404"}), 404)
-        
-        required_fields: list[str] = Account.get_model_fields("required") + Account.get_model_fields("auto")
-        new_body: dict[str, str | None] = {param: (getattr(account_to_update, param) if param in required_fields else None) 
-                                           for param in Account.__table__.columns.keys()}
-        for column_name, new_value in new_body.items():
-            setattr(account_to_update, column_name, new_value)
+        try:
+            expected_version: int | None = services.parse_if_match(request.headers.get("If-Match"))
+        except ValueError as e:
+            return failure_response(str(e), 400)
+
+        new_version: int | None = db.session.execute(services.build_account_update(id, account_schema.optional_defaults,
+                                                                                    expected_version)).scalar()
         db.session.commit()
-        return make_response(jsonify({"status": "success", "message": "the account has been updated", "code": "200"}), 200)
+        if new_version is None:
+            if (expected_version is not None
+                    and db.session.query(Account.id).filter(Account.id == id, Account.deleted_at.is_(None)).first() is not None):
+                return precondition_failed_response()
+            return failure_response("the account does not exist", 404)
+
+        invalidate_account(id)
+        response: Response = success_response("the account has been updated")
+        response.headers["ETag"] = services.format_etag(new_version)
+        return response
             
     except Exception as e:
-        print(e)
-        return make_response(jsonify({"status": "failure", "message": "updated request failed", "code": "500"}), 500)
+        error_logger.log_exception(e)
+        return failure_response("updated request failed", 500)
     
 
 
 @authentication.route("/accounts/<id>", methods=["DELETE"])
 def delete_account(id: int) -> Response:
     try:
-        account_to_delete: Account | None = db.session.query(Account).filter(Account.id == id).first()
-        if account_to_delete is None:
-            return make_response(jsonify({"status": "failure", "message": "the account does not exist", "code": "404"}), 404)
-        
-        db.session.delete(account_to_delete)
+        # A soft delete: the tombstone is hard deleted later by the purge (api.purge).
+        deleted_id: int | None = db.session.execute(services.build_soft_delete([id])).scalar()
         db.session.commit()
-        return make_response(jsonify({"status": "success", "message": "the account has been deleted", "code": "200"}), 200)
+        if deleted_id is None:
+            return failure_response("the account does not exist", 404)
+
+        invalidate_account(id)
+        end_account_sessions(id)
+        return success_response("the account has been deleted")
             
     except Exception as e:
-        print(e)
-        return make_response(jsonify({"status": "failure", "message": "delete request failed", "code": "500"}), 500)
\ No newline at end of file
+        error_logger.log_exception(e)
+        return failure_response("delete request failed", 500)
\ No newline at end of file
@@ -0,0 +1,27 @@
+import json
+from typing import Any
+from flask import Response
+from sqlalchemy import Row
+from .models import Account, account_schema
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+ACCOUNT_FIELDS: tuple[str, ...] = account_schema.columns
+
+
+def serialize_account(account: Account | Row, fields: tuple[str, ...] | list[str] = ACCOUNT_FIELDS) -> dict[str, Any]:
+    return {field: getattr(account, field) for field in fields}
+
+
+def dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def make_json_response(data: Any, status: int) -> Response:
+    return Response(dumps(data), status=status, mimetype="application/json")
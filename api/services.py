@@ -1,48 +1,229 @@
-from flask_sqlalchemy.query import Query
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+from sqlalchemy import Delete, Select, Update, delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import InstrumentedAttribute, load_only
 from sqlalchemy.orm.scoping import scoped_session
-from .models import Account
+from .models import Account, account_schema
+from .password_policy import password_policy
+from .request_schemas import check_signup_fields
+
+
+MUTABLE_COLUMNS: frozenset[str] = account_schema.mutable
+IMMUTABLE_COLUMNS: frozenset[str] = account_schema.immutable
 
 
 def get_missing_field(request_data: dict[str, str]) -> list[str]:
-    return [field for field in Account.get_model_fields("required") if field not in request_data.keys()]
+    return [field for field in account_schema.required if field not in request_data]
 
 
 def check_email_unicity(session: scoped_session, email: str) -> bool:
-    query: Query = session.query(Account).filter(Account.email == email)
-    if query.count() < 1:
-        return True
-    else:
-        return False
+    return not session.query(session.query(Account).filter(Account.email == email, Account.deleted_at.is_(None)).exists()).scalar()
 
 
 def check_username_unicity(session: scoped_session, username: str) -> bool:
-    query: Query = session.query(Account).filter(Account.username == username)
-    if query.count() < 1:
-        return True
+    return not session.query(session.query(Account).filter(Account.username == username, Account.deleted_at.is_(None)).exists()).scalar()
+
+
+def get_unicity_error_message(error: IntegrityError) -> str | None:
+    error_message: str = str(error.orig)
+    if "ix_account_email" in error_message or "account.email" in error_message:
+        return "an account is already registered with this email"
+    elif "ix_account_username" in error_message or "account.username" in error_message:
+        return "the username is already taken"
     else:
-        return False
+        return None
+
+
+def build_login_query(username: str) -> Select:
+    return (select(Account)
+            .options(load_only(Account.id, Account.password))
+            .where(Account.username == username, Account.deleted_at.is_(None))
+            .limit(1))
+
+
+def get_account_for_login(session: scoped_session, username: str) -> Account | None:
+    return session.execute(build_login_query(username)).scalars().first()
+
+
+def build_taken_emails_and_usernames_query(emails: list[str], usernames: list[str]) -> Select:
+    return (select(Account.email, Account.username)
+            .where(or_(Account.email.in_(emails), Account.username.in_(usernames)), Account.deleted_at.is_(None)))
+
+
+def find_taken_emails_and_usernames(session: scoped_session, emails: list[str], 
+                                    usernames: list[str]) -> tuple[set[str], set[str]]:
+    rows = session.execute(build_taken_emails_and_usernames_query(emails, usernames)).all()
+    return {row.email for row in rows}, {row.username for row in rows}
+
+
+def validate_signup_batch(session: scoped_session, batch: list[dict[str, str]]) -> list[str | list[str] | None]:
+    errors: list[str | list[str] | None] = check_signup_batch_fields(batch)
+    candidates: list[dict[str, str]] = get_signup_batch_candidates(batch, errors)
+    taken_emails, taken_usernames = find_taken_emails_and_usernames(session, [data["email"] for data in candidates],
+                                                                    [data["username"] for data in candidates])
+    return check_signup_batch_unicity(batch, errors, taken_emails, taken_usernames)
+
+
+def check_signup_batch_fields(batch: list[dict[str, str]]) -> list[str | list[str] | None]:
+    errors: list[str | list[str] | None] = [None] * len(batch)
+    for index, data in enumerate(batch):
+        if not isinstance(data, dict):
+            errors[index] = "each account must be a JSON object"
+            continue
+        field_error: str | None = check_signup_fields(data)
+        if field_error is not None:
+            errors[index] = field_error
+            continue
+        password_validity_check: dict[str, bool | list[str]] = check_password_validity(data["password"])
+        if not password_validity_check["validity"]:
+            errors[index] = password_validity_check["message"]
+    return errors
+
+
+def get_signup_batch_candidates(batch: list[dict[str, str]], errors: list[str | list[str] | None]) -> list[dict[str, str]]:
+    return [data for data, error in zip(batch, errors) if error is None]
+
+
+def check_signup_batch_unicity(batch: list[dict[str, str]], errors: list[str | list[str] | None], taken_emails: set[str],
+                               taken_usernames: set[str]) -> list[str | list[str] | None]:
+    # Also rejects the accounts of the batch that reuse the email or username of an earlier one.
+    for index, data in enumerate(batch):
+        if errors[index] is not None:
+            continue
+        if data["email"] in taken_emails:
+            errors[index] = "an account is already registered with this email"
+        elif data["username"] in taken_usernames:
+            errors[index] = "the username is already taken"
+        else:
+            taken_emails.add(data["email"])
+            taken_usernames.add(data["username"])
+
+    return errors
+
+
+def build_signup_batch_rows(accounts: list[dict[str, str]], password_hashes: list[str]) -> list[dict[str, str | bool | None]]:
+    return [{"email": data["email"], "username": data["username"], "password": password_hash, "is_logged_in": False,
+             **handle_optional_field_for_signup(data)} for data, password_hash in zip(accounts, password_hashes)]
+
+
+def get_signup_batch_results(errors: list[str | list[str] | None], new_ids: list[int]) -> list[dict[str, str | int | list[str]]]:
+    created_ids: Iterator[int] = iter(new_ids)
+    return [{"index": index, "status": "failure", "message": error} if error is not None
+            else {"index": index, "status": "success", "id": next(created_ids)}
+            for index, error in enumerate(errors)]
+
+
+def parse_id_list(ids: str | list | None) -> list[int] | None:
+    if ids is None:
+        return None
+    raw_ids: list = ids.split(",") if isinstance(ids, str) else ids
+    try:
+        return list(dict.fromkeys(int(id) for id in raw_ids if id != ""))
+    except (TypeError, ValueError):
+        return None
 
 
 def check_password_validity(password: str) -> dict[str, bool | list[str]]:
-    
-    is_longer_than_6_words: bool = (len(password) >= 6)
-    has_special_character: bool = any(not c.isalnum() for c in password)
-    has_capital_letter: bool = any(ele.isupper() for ele in password)
-    has_lower_letter: bool = any(ele.islower() for ele in password)
-    has_numerical_character: bool = any(char.isdigit() for char in password)
-    
-    message: list[str] = [(not is_longer_than_6_words) * "password must contain at least 6 characters", 
-                          (not has_special_character) * "password must contain at least 1 special character",
-                          (not has_capital_letter) * "password must contain at least 1 upper case letter",
-                          (not has_lower_letter) * "password must contain at least 1 lower case letter",
-                          (not has_numerical_character) * "password must contain at least 1 numerical character"]
-    cleaned_message: list[str] = [x for x in message if x != ""]
-
-    validity_dict: dict[str, bool | list[str]] = {"validity": (len(cleaned_message)==0), "message": cleaned_message}
-    
-    return validity_dict
-    
+    message: list[str] = password_policy.check(password)
+    return {"validity": len(message) == 0, "message": message}
+
 
 def handle_optional_field_for_signup(request_data: dict[str, str]) -> dict[str, str | None]:
-    optional_fields: list[str] = Account.get_model_fields("optional")
-    return {field: (request_data[field] if field in request_data.keys() else None) for field in optional_fields}
\ No newline at end of file
+    return {field: request_data.get(field) for field in account_schema.optional}
+
+
+def get_requested_columns(fields: str | None) -> list[str] | None:
+    if fields is None:
+        return list(account_schema.columns)
+
+    requested_fields: list[str] = [field for field in fields.split(",") if field != ""]
+    if not account_schema.column_set.issuperset(requested_fields):
+        return None
+    return ["id"] + [field for field in requested_fields if field != "id"]
+
+
+def get_immutable_fields(request_params: dict[str, str]) -> list[str]:
+    return [column_name for column_name in request_params if column_name in IMMUTABLE_COLUMNS]
+
+
+def get_new_values(request_params: dict[str, str]) -> dict[str, str | None]:
+    # The password is hashed by the route, after checking password_validation.
+    return {column_name: value for column_name, value in request_params.items()
+            if column_name in MUTABLE_COLUMNS and column_name != "password"}
+
+
+def build_live_account_query(id: int, *columns: InstrumentedAttribute) -> Select:
+    return select(*columns).where(Account.id == id, Account.deleted_at.is_(None))
+
+
+def parse_if_match(header: str | None) -> int | None:
+    if header is None or header.strip() == "*":
+        return None
+    tag: str = header.strip().removeprefix("W/")
+    version: str = tag[1:-1].split("-", 1)[0]
+    if len(tag) < 3 or tag[0] != '"' or tag[-1] != '"' or not version.isdigit():
+        raise ValueError("invalid If-Match header")
+    return int(version)
+
+
+def format_etag(version: int, is_logged_in: bool | None = None) -> str:
+    # The login state is part of GET representations that include it, If-Match only compares the version.
+    return f'"{version}"' if is_logged_in is None else f'"{version}-{int(is_logged_in)}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    return any(tag.strip().removeprefix("W/") in ("*", etag) for tag in if_none_match.split(","))
+
+
+def build_account_update(id: int, new_values: dict[str, str | None], expected_version: int | None) -> Update:
+    statement: Update = update(Account).where(Account.id == id, Account.deleted_at.is_(None))
+    if expected_version is not None:
+        statement = statement.where(Account.version == expected_version)
+    return (statement.values(**new_values, version=Account.version + 1)
+            .returning(Account.version)
+            .execution_options(synchronize_session=False))
+
+
+def build_accounts_query(columns: list[str], ids: list[int]) -> Select:
+    return (select(*[Account.__table__.columns[column] for column in columns])
+            .where(Account.id.in_(ids), Account.deleted_at.is_(None))
+            .order_by(Account.id))
+
+
+def build_db_content_query(columns: list[str], after_id: int | None, limit: int | None) -> Select:
+    query: Select = (select(*[Account.__table__.columns[column] for column in columns])
+                     .where(Account.deleted_at.is_(None))
+                     .order_by(Account.id))
+    if after_id is not None:
+        query = query.where(Account.id > after_id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def utc_now() -> datetime:
+    # deleted_at is a naive UTC timestamp, set and compared on the application side on every database.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def build_soft_delete(ids: list[int]) -> Update:
+    return (update(Account)
+            .where(Account.id.in_(ids), Account.deleted_at.is_(None))
+            .values(deleted_at=utc_now())
+            .returning(Account.id)
+            .execution_options(synchronize_session=False))
+
+
+def build_purge(retention: float, batch_size: int) -> Delete:
+    # The oldest tombstones first, through ix_account_deleted_at. SKIP LOCKED lets several purgers share the work on PostgreSQL.
+    tombstone_ids: Select = (select(Account.id)
+                             .where(Account.deleted_at.is_not(None), Account.deleted_at < utc_now() - timedelta(seconds=retention))
+                             .order_by(Account.deleted_at)
+                             .limit(batch_size)
+                             .with_for_update(skip_locked=True))
+    return (delete(Account)
+            .where(Account.id.in_(tombstone_ids.scalar_subquery()))
+            .execution_options(synchronize_session=False))
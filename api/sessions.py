@@ -0,0 +1,281 @@
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Iterable
+from flask import Flask
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+SESSION_TOKEN_KEY: str = "_session_token"
+
+
+def get_sqlite_path(app: Flask, config_key: str, file_name: str) -> str:
+    # The SQLite files shared by the workers of a host live in the instance folder unless configured, whatever the
+    # working directory the server was started from.
+    path: str | None = app.config.get(config_key)
+    if path:
+        return path
+    os.makedirs(app.instance_path, exist_ok=True)
+    return os.path.join(app.instance_path, file_name)
+
+
+class MemorySessionBackend():
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl: float = ttl
+        self._sessions: dict[str, tuple[int, float]] = {}
+        self._account_sessions: dict[int, set[str]] = {}
+        self._next_sweep: float = time.monotonic() + ttl
+        self._lock: threading.Lock = threading.Lock()
+
+
+    def add(self, token: str, account_id: int) -> None:
+        with self._lock:
+            now: float = time.monotonic()
+            if now >= self._next_sweep:
+                self._sweep(now)
+            self._sessions[token] = (account_id, now + self.ttl)
+            self._account_sessions.setdefault(account_id, set()).add(token)
+
+
+    def get(self, token: str) -> int | None:
+        with self._lock:
+            entry: tuple[int, float] | None = self._sessions.get(token)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                self._remove(token, entry[0])
+                return None
+            return entry[0]
+
+
+    def delete(self, token: str) -> None:
+        with self._lock:
+            entry: tuple[int, float] | None = self._sessions.get(token)
+            if entry is not None:
+                self._remove(token, entry[0])
+
+
+    def delete_account(self, account_id: int) -> int:
+        with self._lock:
+            tokens: set[str] = self._account_sessions.pop(account_id, set())
+            now: float = time.monotonic()
+            active_count: int = sum(1 for token in tokens if self._sessions.pop(token)[1] >= now)
+            return active_count
+
+
+    def get_logged_in_account_ids(self, account_ids: Iterable[int]) -> set[int]:
+        with self._lock:
+            now: float = time.monotonic()
+            return {account_id for account_id in account_ids
+                    if any(self._sessions[token][1] >= now for token in self._account_sessions.get(account_id, ()))}
+
+
+    def close(self) -> None:
+        pass
+
+
+    def _remove(self, token: str, account_id: int) -> None:
+        del self._sessions[token]
+        tokens: set[str] = self._account_sessions[account_id]
+        tokens.discard(token)
+        if len(tokens) == 0:
+            del self._account_sessions[account_id]
+
+
+    def _sweep(self, now: float) -> None:
+        for token, (account_id, expires_at) in list(self._sessions.items()):
+            if expires_at < now:
+                self._remove(token, account_id)
+        self._next_sweep = now + self.ttl
+
+
+
+class SqliteSessionBackend():
+
+    def __init__(self, path: str, ttl: float) -> None:
+        self.path: str = path
+        self.ttl: float = ttl
+        self._local: threading.local = threading.local()
+        with self._connect() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS session "
+                               "(token TEXT PRIMARY KEY, account_id INTEGER NOT NULL, expires_at REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_session_account_id ON session (account_id, expires_at)")
+
+
+    def _connect(self) -> sqlite3.Connection:
+        if getattr(self._local, "pid", None) != os.getpid():
+            connection: sqlite3.Connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return self._local.connection
+
+
+    def add(self, token: str, account_id: int) -> None:
+        now: float = time.time()
+        connection: sqlite3.Connection = self._connect()
+        connection.execute("INSERT INTO session (token, account_id, expires_at) VALUES (?, ?, ?)",
+                           (token, account_id, now + self.ttl))
+        connection.execute("DELETE FROM session WHERE account_id = ? AND expires_at < ?", (account_id, now))
+
+
+    def get(self, token: str) -> int | None:
+        row: tuple[int] | None = self._connect().execute("SELECT account_id FROM session WHERE token = ? AND expires_at >= ?",
+                                                         (token, time.time())).fetchone()
+        return row[0] if row is not None else None
+
+
+    def delete(self, token: str) -> None:
+        self._connect().execute("DELETE FROM session WHERE token = ?", (token,))
+
+
+    def delete_account(self, account_id: int) -> int:
+        connection: sqlite3.Connection = self._connect()
+        active_count: int = connection.execute("SELECT COUNT(*) FROM session WHERE account_id = ? AND expires_at >= ?",
+                                               (account_id, time.time())).fetchone()[0]
+        connection.execute("DELETE FROM session WHERE account_id = ?", (account_id,))
+        return active_count
+
+
+    def get_logged_in_account_ids(self, account_ids: Iterable[int]) -> set[int]:
+        account_ids = list(account_ids)
+        if len(account_ids) == 0:
+            return set()
+        placeholders: str = ", ".join("?" * len(account_ids))
+        rows: list[tuple[int]] = self._connect().execute(f"SELECT DISTINCT account_id FROM session WHERE account_id IN ({placeholders}) "
+                                                         "AND expires_at >= ?", (*account_ids, time.time())).fetchall()
+        return {row[0] for row in rows}
+
+
+    def close(self) -> None:
+        # Called at the end of every request: threads of the dev server and of gthread workers come and go.
+        connection: sqlite3.Connection | None = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            connection.close()
+        self._local.connection, self._local.pid = None, None
+
+
+
+class RedisSessionBackend():
+
+    def __init__(self, url: str, ttl: float, prefix: str) -> None:
+        if redis is None:
+            raise RuntimeError("the redis package is required for the 'redis' session type")
+        self.client = redis.Redis.from_url(url)
+        self.ttl: int = max(1, int(ttl))
+        self.prefix: str = prefix
+
+
+    def add(self, token: str, account_id: int) -> None:
+        now: float = time.time()
+        account_key: str = f"{self.prefix}account:{account_id}"
+        pipeline = self.client.pipeline()
+        pipeline.setex(f"{self.prefix}token:{token}", self.ttl, account_id)
+        pipeline.zadd(account_key, {token: now + self.ttl})
+        pipeline.zremrangebyscore(account_key, "-inf", now)
+        pipeline.expire(account_key, self.ttl)
+        pipeline.execute()
+
+
+    def get(self, token: str) -> int | None:
+        value: bytes | None = self.client.get(f"{self.prefix}token:{token}")
+        return int(value) if value is not None else None
+
+
+    def delete(self, token: str) -> None:
+        account_id: int | None = self.get(token)
+        pipeline = self.client.pipeline()
+        pipeline.delete(f"{self.prefix}token:{token}")
+        if account_id is not None:
+            pipeline.zrem(f"{self.prefix}account:{account_id}", token)
+        pipeline.execute()
+
+
+    def delete_account(self, account_id: int) -> int:
+        account_key: str = f"{self.prefix}account:{account_id}"
+        tokens: list[bytes] = self.client.zrangebyscore(account_key, time.time(), "+inf")
+        pipeline = self.client.pipeline()
+        for token in tokens:
+            pipeline.delete(f"{self.prefix}token:{token.decode('utf-8')}")
+        pipeline.delete(account_key)
+        pipeline.execute()
+        return len(tokens)
+
+
+    def get_logged_in_account_ids(self, account_ids: Iterable[int]) -> set[int]:
+        account_ids = list(account_ids)
+        now: float = time.time()
+        pipeline = self.client.pipeline()
+        for account_id in account_ids:
+            pipeline.zcount(f"{self.prefix}account:{account_id}", now, "+inf")
+        return {account_id for account_id, count in zip(account_ids, pipeline.execute()) if count > 0}
+
+
+    def close(self) -> None:
+        pass
+
+
+
+class SessionStore():
+
+    def __init__(self, app: Flask | None = None) -> None:
+        self.allow_multiple_per_account: bool = False
+        self.backend: MemorySessionBackend | SqliteSessionBackend | RedisSessionBackend = MemorySessionBackend(86400)
+        if app is not None:
+            self.init_app(app)
+
+
+    def init_app(self, app: Flask) -> None:
+        session_type: str = app.config.get("SESSION_TYPE") or "sqlite"
+        ttl: float = app.config.get("SESSION_TTL", 86400)
+        self.allow_multiple_per_account = app.config.get("SESSION_MULTIPLE_PER_ACCOUNT", False)
+
+        if session_type == "memory":
+            self.backend = MemorySessionBackend(ttl)
+        elif session_type == "sqlite":
+            self.backend = SqliteSessionBackend(get_sqlite_path(app, "SESSION_SQLITE_PATH", "sessions.db"), ttl)
+        elif session_type == "redis":
+            self.backend = RedisSessionBackend(app.config.get("SESSION_REDIS_URL"), ttl, "session:")
+        else:
+            raise ValueError(f"unknown SESSION_TYPE: {session_type}")
+        app.teardown_appcontext(self._close)
+
+
+    def create(self, account_id: int) -> str:
+        token: str = secrets.token_urlsafe(32)
+        self.backend.add(token, int(account_id))
+        return token
+
+
+    def get_account_id(self, token: str) -> int | None:
+        return self.backend.get(token)
+
+
+    def revoke(self, token: str) -> None:
+        self.backend.delete(token)
+
+
+    def revoke_account(self, account_id: int | str) -> int:
+        return self.backend.delete_account(int(account_id))
+
+
+    def is_logged_in(self, account_id: int | str) -> bool:
+        return int(account_id) in self.backend.get_logged_in_account_ids([int(account_id)])
+
+
+    def get_logged_in_account_ids(self, account_ids: Iterable[int]) -> set[int]:
+        return self.backend.get_logged_in_account_ids(account_ids)
+
+
+    def _close(self, exception: BaseException | None = None) -> None:
+        self.backend.close()
+
+
+session_store: SessionStore = SessionStore()
@@ -0,0 +1,139 @@
+import hashlib
+import math
+import threading
+import time
+from array import array
+from flask import Flask
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class SlidingWindowSketch():
+
+    def __init__(self, width: int, depth: int, window: float, buckets: int) -> None:
+        self.width: int = width
+        self.depth: int = depth
+        self.buckets: int = buckets
+        self.bucket_length: float = window / buckets
+        self._counters: list[array] = [array("I", [0]) * (width * depth) for _ in range(buckets)]
+        self._epochs: list[int] = [-1] * buckets
+        self._lock: threading.Lock = threading.Lock()
+
+
+    def _get_indexes(self, key: str) -> list[int]:
+        digest: bytes = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first_hash: int = int.from_bytes(digest[:8], "little")
+        second_hash: int = int.from_bytes(digest[8:], "little") | 1
+        return [row * self.width + (first_hash + row * second_hash) % self.width for row in range(self.depth)]
+
+
+    def add(self, key: str, now: float) -> int:
+        indexes: list[int] = self._get_indexes(key)
+        epoch: int = int(now // self.bucket_length)
+        with self._lock:
+            bucket: int = epoch % self.buckets
+            if self._epochs[bucket] != epoch:
+                self._counters[bucket] = array("I", [0]) * (self.width * self.depth)
+                self._epochs[bucket] = epoch
+            counters: array = self._counters[bucket]
+            for index in indexes:
+                counters[index] += 1
+            return self._estimate(indexes, epoch)
+
+
+    def count(self, key: str, now: float) -> int:
+        with self._lock:
+            return self._estimate(self._get_indexes(key), int(now // self.bucket_length))
+
+
+    def _estimate(self, indexes: list[int], epoch: int) -> int:
+        live_counters: list[array] = [self._counters[bucket] for bucket in range(self.buckets)
+                                      if 0 <= epoch - self._epochs[bucket] < self.buckets]
+        return min(sum(counters[index] for counters in live_counters) for index in indexes)
+
+
+
+class LocalThrottleBackend():
+
+    def __init__(self, width: int, depth: int, window: float, buckets: int) -> None:
+        self.sketch: SlidingWindowSketch = SlidingWindowSketch(width, depth, window, buckets)
+
+
+    def hit(self, keys: list[str], now: float) -> list[int]:
+        return [self.sketch.add(key, now) for key in keys]
+
+
+
+class RedisThrottleBackend():
+
+    def __init__(self, url: str, window: float, buckets: int, prefix: str) -> None:
+        if redis is None:
+            raise RuntimeError("the redis package is required for the 'redis' login throttle type")
+        self.client = redis.Redis.from_url(url)
+        self.buckets: int = buckets
+        self.bucket_length: float = window / buckets
+        self.prefix: str = prefix
+
+
+    def hit(self, keys: list[str], now: float) -> list[int]:
+        epoch: int = int(now // self.bucket_length)
+        expiry: int = math.ceil(self.bucket_length * (self.buckets + 1))
+        pipeline = self.client.pipeline()
+        for key in keys:
+            pipeline.incr(f"{self.prefix}{key}:{epoch}")
+            pipeline.expire(f"{self.prefix}{key}:{epoch}", expiry)
+            pipeline.mget([f"{self.prefix}{key}:{epoch - offset}" for offset in range(self.buckets)])
+        results: list = pipeline.execute()
+        return [sum(int(count) for count in counts if count is not None) for counts in results[2::3]]
+
+
+
+class NullThrottleBackend():
+
+    def hit(self, keys: list[str], now: float) -> list[int]:
+        return [0] * len(keys)
+
+
+
+class LoginThrottle():
+
+    def __init__(self, app: Flask | None = None) -> None:
+        self.max_per_username: int = 10
+        self.max_per_ip: int = 50
+        self.bucket_length: float = 10
+        self.backend: LocalThrottleBackend | RedisThrottleBackend | NullThrottleBackend = NullThrottleBackend()
+        if app is not None:
+            self.init_app(app)
+
+
+    def init_app(self, app: Flask) -> None:
+        throttle_type: str = app.config.get("LOGIN_THROTTLE_TYPE", "local")
+        window: float = app.config.get("LOGIN_THROTTLE_WINDOW", 60)
+        buckets: int = app.config.get("LOGIN_THROTTLE_BUCKETS", 6)
+        self.max_per_username = app.config.get("LOGIN_THROTTLE_MAX_PER_USERNAME", 10)
+        self.max_per_ip = app.config.get("LOGIN_THROTTLE_MAX_PER_IP", 50)
+        self.bucket_length = window / buckets
+
+        if throttle_type == "local":
+            self.backend = LocalThrottleBackend(app.config.get("LOGIN_THROTTLE_SKETCH_WIDTH", 4096),
+                                                app.config.get("LOGIN_THROTTLE_SKETCH_DEPTH", 4), window, buckets)
+        elif throttle_type == "redis":
+            self.backend = RedisThrottleBackend(app.config.get("LOGIN_THROTTLE_REDIS_URL"), window, buckets, "login_throttle:")
+        elif throttle_type == "null":
+            self.backend = NullThrottleBackend()
+        else:
+            raise ValueError(f"unknown LOGIN_THROTTLE_TYPE: {throttle_type}")
+
+
+    def hit(self, username: str, ip: str | None) -> float | None:
+        now: float = time.time()
+        username_count, ip_count = self.backend.hit(["username:" + username, "ip:" + str(ip)], now)
+        if username_count <= self.max_per_username and ip_count <= self.max_per_ip:
+            return None
+        return self.bucket_length - now % self.bucket_length
+
+
+login_throttle: LoginThrottle = LoginThrottle()
@@ -0,0 +1,247 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Any
+from flask import Flask
+from flask_login import UserMixin
+from .sessions import get_sqlite_path
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class TokenUser(UserMixin):
+
+    def __init__(self, id: int, username: str, session_id: str) -> None:
+        self.id: int = id
+        self.username: str = username
+        self.session_id: str = session_id
+
+
+
+def _encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+class LocalDenylistBackend():
+
+    def __init__(self) -> None:
+        self._entries: dict[str, tuple[float, float]] = {}
+        self._next_sweep: float = 0.0
+        self._lock: threading.Lock = threading.Lock()
+
+
+    def set(self, key: str, value: float, ttl: float) -> None:
+        now: float = time.time()
+        with self._lock:
+            if now >= self._next_sweep:
+                self._entries = {key: entry for key, entry in self._entries.items() if entry[1] >= now}
+                self._next_sweep = now + 60
+            self._entries[key] = (value, now + ttl)
+
+
+    def get(self, key: str) -> float | None:
+        entry: tuple[float, float] | None = self._entries.get(key)
+        if entry is None or entry[1] < time.time():
+            return None
+        return entry[0]
+
+
+
+class SqliteDenylistBackend():
+
+    def __init__(self, path: str) -> None:
+        # One file shared by the workers of a host, like the session store: a token revoked by one worker is refused
+        # by all of them.
+        self.path: str = path
+        self._local: threading.local = threading.local()
+        self._next_sweep: float = 0.0
+        self._connect().execute("CREATE TABLE IF NOT EXISTS token_denylist "
+                                "(key TEXT PRIMARY KEY, value REAL NOT NULL, expires_at REAL NOT NULL)")
+
+
+    def _connect(self) -> sqlite3.Connection:
+        if getattr(self._local, "pid", None) != os.getpid():
+            connection: sqlite3.Connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return self._local.connection
+
+
+    def set(self, key: str, value: float, ttl: float) -> None:
+        now: float = time.time()
+        connection: sqlite3.Connection = self._connect()
+        connection.execute("INSERT OR REPLACE INTO token_denylist (key, value, expires_at) VALUES (?, ?, ?)",
+                           (key, value, now + ttl))
+        if now >= self._next_sweep:
+            self._next_sweep = now + 60
+            connection.execute("DELETE FROM token_denylist WHERE expires_at < ?", (now,))
+
+
+    def get(self, key: str) -> float | None:
+        row: tuple[float] | None = self._connect().execute("SELECT value FROM token_denylist WHERE key = ? AND expires_at >= ?",
+                                                           (key, time.time())).fetchone()
+        return row[0] if row is not None else None
+
+
+    def close(self) -> None:
+        connection: sqlite3.Connection | None = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            connection.close()
+        self._local.connection, self._local.pid = None, None
+
+
+
+class RedisDenylistBackend():
+
+    def __init__(self, url: str, prefix: str) -> None:
+        if redis is None:
+            raise RuntimeError("the redis package is required for the 'redis' token denylist type")
+        self.client = redis.Redis.from_url(url)
+        self.prefix: str = prefix
+
+
+    def set(self, key: str, value: float, ttl: float) -> None:
+        self.client.setex(self.prefix + key, max(1, int(ttl) + 1), value)
+
+
+    def get(self, key: str) -> float | None:
+        value: bytes | None = self.client.get(self.prefix + key)
+        return float(value) if value is not None else None
+
+
+
+class TokenManager():
+
+    HEADER: bytes = _encode(json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(",", ":")).encode("utf-8"))
+
+    def __init__(self, app: Flask | None = None) -> None:
+        self.enabled: bool = False
+        self.access_ttl: int = 300
+        self.refresh_ttl: int = 86400
+        self._signer: Any = None
+        self.denylist: LocalDenylistBackend | SqliteDenylistBackend | RedisDenylistBackend = LocalDenylistBackend()
+        if app is not None:
+            self.init_app(app)
+
+
+    def init_app(self, app: Flask) -> None:
+        self.enabled = app.config.get("TOKEN_AUTH_ENABLED", False)
+        self.access_ttl = app.config.get("TOKEN_ACCESS_TTL", 300)
+        self.refresh_ttl = app.config.get("TOKEN_REFRESH_TTL", 86400)
+        if not self.enabled:
+            return
+
+        secret_key: str | None = app.config.get("TOKEN_SECRET_KEY") or app.config.get("SECRET_KEY")
+        if not secret_key:
+            raise ValueError("TOKEN_AUTH_ENABLED requires TOKEN_SECRET_KEY or SECRET_KEY")
+        # The keyed HMAC state is computed once, each signature starts from a copy of it.
+        self._signer = hmac.new(secret_key.encode("utf-8"), digestmod=hashlib.sha256)
+
+        denylist_type: str = app.config.get("TOKEN_DENYLIST_TYPE", "sqlite")
+        if denylist_type == "sqlite":
+            self.denylist = SqliteDenylistBackend(get_sqlite_path(app, "TOKEN_DENYLIST_SQLITE_PATH", "sessions.db"))
+            app.teardown_appcontext(self._close)
+        elif denylist_type == "local":
+            self.denylist = LocalDenylistBackend()
+        elif denylist_type == "redis":
+            self.denylist = RedisDenylistBackend(app.config.get("TOKEN_DENYLIST_REDIS_URL"), "token_denylist:")
+        else:
+            raise ValueError(f"unknown TOKEN_DENYLIST_TYPE: {denylist_type}")
+
+
+    def _close(self, exception: BaseException | None = None) -> None:
+        if isinstance(self.denylist, SqliteDenylistBackend):
+            self.denylist.close()
+
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        signer: Any = self._signer.copy()
+        signer.update(signing_input)
+        return _encode(signer.digest())
+
+
+    def _encode_token(self, claims: dict[str, str | int | float]) -> str:
+        signing_input: bytes = self.HEADER + b"." + _encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+        return (signing_input + b"." + self._sign(signing_input)).decode("ascii")
+
+
+    def issue(self, account_id: int, username: str, session_id: str) -> dict[str, str | int]:
+        now: float = time.time()
+        claims: dict[str, str | int | float] = {"sub": str(account_id), "username": username, "sid": session_id,
+                                                "iat": round(now, 3)}
+        access_token: str = self._encode_token({**claims, "typ": "access", "exp": int(now) + self.access_ttl})
+        refresh_token: str = self._encode_token({**claims, "typ": "refresh", "exp": int(now) + self.refresh_ttl,
+                                                 "jti": secrets.token_urlsafe(12)})
+        return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "Bearer",
+                "expires_in": self.access_ttl}
+
+
+    def verify(self, token: str, token_type: str = "access") -> dict[str, str | int]:
+        try:
+            header, payload, signature = token.encode("ascii").split(b".")
+        except (UnicodeEncodeError, ValueError):
+            raise InvalidToken("malformed token")
+        if header != self.HEADER or not hmac.compare_digest(signature, self._sign(header + b"." + payload)):
+            raise InvalidToken("invalid signature")
+
+        try:
+            claims: dict[str, str | int] = json.loads(_decode(payload))
+        except ValueError:
+            raise InvalidToken("malformed token")
+        if claims.get("typ") != token_type or claims.get("exp", 0) < time.time():
+            raise InvalidToken("expired token")
+        if self.denylist.get("sid:" + claims["sid"]) is not None:
+            raise InvalidToken("revoked token")
+        revoked_before: float | None = self.denylist.get("account:" + claims["sub"])
+        if revoked_before is not None and claims["iat"] < revoked_before:
+            raise InvalidToken("revoked token")
+        return claims
+
+
+    def load_user(self, token: str) -> TokenUser | None:
+        try:
+            claims: dict[str, str | int] = self.verify(token)
+        except InvalidToken:
+            return None
+        return TokenUser(int(claims["sub"]), claims["username"], claims["sid"])
+
+
+    def refresh(self, refresh_token: str) -> tuple[dict[str, str | int], dict[str, str | int]]:
+        claims: dict[str, str | int] = self.verify(refresh_token, "refresh")
+        if self.denylist.get("jti:" + claims["jti"]) is not None:
+            # A rotated refresh token was replayed: the whole session is revoked.
+            self.revoke_session(claims["sid"])
+            raise InvalidToken("reused refresh token")
+        self.denylist.set("jti:" + claims["jti"], 1, claims["exp"] - time.time())
+        return claims, self.issue(int(claims["sub"]), claims["username"], claims["sid"])
+
+
+    def revoke_session(self, session_id: str) -> None:
+        if self.enabled:
+            self.denylist.set("sid:" + session_id, 1, self.refresh_ttl)
+
+
+    def revoke_account(self, account_id: int | str) -> None:
+        if self.enabled:
+            self.denylist.set("account:" + str(account_id), time.time(), self.refresh_ttl)
+
+
+token_manager: TokenManager = TokenManager()
@@ -0,0 +1,198 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Callable
+import bcrypt
+import requests
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.engine.base import Engine
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config, get_engine_options
+from api.models import Account
+from test.test_helper import build_test_config
+from load import Workload, get_rss_mb, run_load
+
+
+# Starts the API from create_app in a child process, seeds the account table and drives each workload against it.
+# The script drops and recreates the account table, only point --database-url at a throwaway database.
+
+PASSWORD: str = "Harness-pw0"
+SEED_BATCH_SIZE: int = 10000
+
+
+def serve(database_url: str, port: int, overrides: dict[str, str | int | bool]) -> None:
+    from werkzeug.serving import BaseWSGIServer, make_server
+    from api import create_app
+    from api.hashing import password_hasher
+
+    # The cache files live in a directory of their own, removed on exit: every server starts with empty caches.
+    directory: str = tempfile.mkdtemp()
+    config_class: type = build_test_config(directory, SQLALCHEMY_DATABASE_URI=database_url,
+                                           SQLALCHEMY_ENGINE_OPTIONS=get_engine_options(database_url),
+                                           LOGIN_THROTTLE_TYPE="null", **overrides)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server: BaseWSGIServer = make_server("127.0.0.1", port, create_app(config_class), threaded=True)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        password_hasher.shutdown()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def start_server(database_url: str, port: int, overrides: dict[str, str | int | bool]) -> multiprocessing.Process:
+    process: multiprocessing.Process = multiprocessing.get_context("spawn").Process(target=serve, 
+                                                                                    args=(database_url, port, overrides))
+    process.start()
+    deadline: float = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/").status_code == 200:
+                # Starts the hashing pool workers before the measured run.
+                requests.post(f"http://127.0.0.1:{port}/signup", json={"email": "warmup@harness.test", "username": "warmup",
+                                                                       "password": PASSWORD})
+                return process
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("the server did not start within 60 seconds")
+
+
+def reset_and_seed(engine: Engine, size: int, log_rounds: int) -> list[tuple[int, str]]:
+    password_hash: str = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(rounds=log_rounds)).decode("utf-8")
+    with engine.begin() as connection:
+        connection.execute(Account.__table__.delete())
+        for start in range(0, size, SEED_BATCH_SIZE):
+            rows: list[dict[str, str | bool]] = [{"email": f"user{i}@harness.test", "username": f"user{i}",
+                                                  "password": password_hash, "is_logged_in": False}
+                                                 for i in range(start, min(start + SEED_BATCH_SIZE, size))]
+            connection.execute(insert(Account), rows)
+        return [(row.id, row.username) for row in connection.execute(select(Account.id, Account.username))]
+
+
+def signup_heavy_workload(accounts: list[tuple[int, str]]) -> Workload:
+    def next_request(generator: random.Random) -> tuple[str, str, dict[str, str] | None, tuple[int, ...]]:
+        if generator.random() < 0.8:
+            name: str = uuid.uuid4().hex
+            return "POST", "/signup", {"email": f"{name}@harness.test", "username": name, "password": PASSWORD}, (200,)
+        return "GET", f"/accounts/{generator.choice(accounts)[0]}", None, (200,)
+    return next_request
+
+
+def login_storm_workload(accounts: list[tuple[int, str]]) -> Workload:
+    def next_request(generator: random.Random) -> tuple[str, str, dict[str, str] | None, tuple[int, ...]]:
+        username: str = generator.choice(accounts)[1]
+        if generator.random() < 0.5:
+            # 400 once the account already holds a session.
+            return "POST", "/login", {"username": username, "password": PASSWORD}, (200, 400)
+        return "POST", "/login", {"username": username, "password": "Wrong-pw0"}, (400,)
+    return next_request
+
+
+def db_content_scan_workload(accounts: list[tuple[int, str]]) -> Workload:
+    def next_request(generator: random.Random) -> tuple[str, str, dict[str, str] | None, tuple[int, ...]]:
+        return "GET", f"/db-content?limit=100&after_id={generator.choice(accounts)[0]}", None, (200,)
+    return next_request
+
+
+def patch_churn_workload(accounts: list[tuple[int, str]]) -> Workload:
+    def next_request(generator: random.Random) -> tuple[str, str, dict[str, str] | None, tuple[int, ...]]:
+        body: dict[str, str] = {"gender": generator.choice(("F", "M", "X")), "phone_number": str(generator.randrange(10 ** 9))}
+        return "PATCH", f"/accounts/{generator.choice(accounts)[0]}", body, (200,)
+    return next_request
+
+
+def mixed_workload(accounts: list[tuple[int, str]]) -> Workload:
+    workloads: list[Workload] = [signup_heavy_workload(accounts), login_storm_workload(accounts),
+                                 db_content_scan_workload(accounts), patch_churn_workload(accounts)]
+
+    def next_request(generator: random.Random) -> tuple[str, str, dict[str, str] | None, tuple[int, ...]]:
+        return generator.choices(workloads, weights=(1, 2, 2, 5))[0](generator)
+    return next_request
+
+
+WORKLOADS: dict[str, Callable[[list[tuple[int, str]]], Workload]] = {
+    "signup_heavy": signup_heavy_workload,
+    "login_storm": login_storm_workload,
+    "db_content_scan": db_content_scan_workload,
+    "patch_churn": patch_churn_workload,
+    "mixed": mixed_workload,
+}
+
+
+def get_git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(database_url: str, args: argparse.Namespace) -> dict:
+    overrides: dict[str, str | int | bool] = {"BCRYPT_LOG_ROUNDS": args.log_rounds, "HASHING_POOL_SIZE": args.hashing_pool_size}
+    engine: Engine = create_engine(database_url)
+    Account.__table__.drop(engine, checkfirst=True)
+    Account.__table__.create(engine)
+    report: dict = {"commit": get_git_commit(), "database": engine.dialect.name, "accounts": args.accounts,
+                    "concurrency": args.concurrency, "duration": args.duration, "log_rounds": args.log_rounds,
+                    "hashing_pool_size": args.hashing_pool_size, "workloads": {}}
+    try:
+        for name in args.workloads.split(","):
+            # Every workload starts from the same seeded table and a fresh server (empty caches and session store),
+            # so its numbers do not depend on the previous ones.
+            accounts: list[tuple[int, str]] = reset_and_seed(engine, args.accounts, args.log_rounds)
+            server: multiprocessing.Process = start_server(database_url, args.port, overrides)
+            try:
+                report["workloads"][name] = run_load(f"http://127.0.0.1:{args.port}", WORKLOADS[name](accounts),
+                                                     args.concurrency, args.duration)
+                report["workloads"][name]["rss_mb"] = get_rss_mb(server.pid)
+            finally:
+                server.terminate()
+                server.join()
+            print(json.dumps({name: report["workloads"][name]}), file=sys.stderr)
+    finally:
+        Account.__table__.drop(engine, checkfirst=True)
+        engine.dispose()
+    return report
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Load test the auth endpoints and report as JSON")
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    parser.add_argument("--workloads", default=",".join(WORKLOADS), help="comma separated, among: " + ", ".join(WORKLOADS))
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--log-rounds", type=int, default=Config.BCRYPT_LOG_ROUNDS)
+    parser.add_argument("--hashing-pool-size", type=int, default=Config.HASHING_POOL_SIZE)
+    parser.add_argument("--port", type=int, default=5600)
+    parser.add_argument("--output", default=None, help="also write the report to this file")
+    args: argparse.Namespace = parser.parse_args()
+
+    unknown_workloads: set[str] = set(args.workloads.split(",")) - set(WORKLOADS)
+    if unknown_workloads:
+        parser.error("unknown workload: " + ", ".join(sorted(unknown_workloads)))
+
+    with tempfile.TemporaryDirectory() as directory:
+        report: dict = run(args.database_url or "sqlite:///" + os.path.join(directory, "harness.db"), args)
+
+    print(json.dumps(report, indent=2))
+    if args.output is not None:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
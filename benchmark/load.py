@@ -0,0 +1,119 @@
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Callable
+import requests
+
+
+# A workload picks the next request to send: it returns (method, path, json body or None, expected status codes).
+Workload = Callable[[random.Random], tuple[str, str, dict[str, str] | None, tuple[int, ...]]]
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    return sorted_values[int(fraction * (len(sorted_values) - 1))] if sorted_values else 0.0
+
+
+def get_rss_mb(pid: int) -> float:
+    pids: list[int] = [pid]
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as children_file:
+            pids += [int(child) for child in children_file.read().split()]
+
+    rss_kb: int = 0
+    for process_id in pids:
+        with open(f"/proc/{process_id}/status") as status_file:
+            rss_kb += next(int(line.split()[1]) for line in status_file if line.startswith("VmRSS:"))
+    return rss_kb / 1024
+
+
+def run_load(base_url: str, workload: Workload, concurrency: int, duration: float) -> dict[str, float | int]:
+    latencies: list[list[float]] = [[] for _ in range(concurrency)]
+    errors: list[int] = [0] * concurrency
+    deadline: float = time.perf_counter() + duration
+
+    def worker(index: int) -> None:
+        session: requests.Session = requests.Session()
+        generator: random.Random = random.Random(index)
+        while time.perf_counter() < deadline:
+            method, path, body, expected_status = workload(generator)
+            start: float = time.perf_counter()
+            try:
+                response: requests.Response = session.request(method, base_url + path, json=body)
+                if response.status_code not in expected_status:
+                    errors[index] += 1
+            except requests.RequestException:
+                errors[index] += 1
+            latencies[index].append(time.perf_counter() - start)
+
+    threads: list[threading.Thread] = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    start: float = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed: float = time.perf_counter() - start
+
+    all_latencies: list[float] = sorted(latency for worker_latencies in latencies for latency in worker_latencies)
+    total: int = len(all_latencies)
+    return {"requests": total, "requests_per_second": total / elapsed, "error_rate": sum(errors) / total if total else 0.0,
+            "p50_ms": percentile(all_latencies, 0.50) * 1000, "p95_ms": percentile(all_latencies, 0.95) * 1000,
+            "p99_ms": percentile(all_latencies, 0.99) * 1000}
+
+
+def seed_accounts(base_url: str, count: int, password: str) -> list[tuple[int, str]]:
+    prefix: str = uuid.uuid4().hex[:8]
+    for i in range(count):
+        requests.post(base_url + "/signup", json={"email": f"{prefix}{i}@load.test", "username": f"{prefix}{i}",
+                                                  "password": password})
+
+    accounts: list[tuple[int, str]] = []
+    after_id: int | None = None
+    while True:
+        params: dict[str, str | int] = {"fields": "username", "limit": 1000, **({"after_id": after_id} if after_id else {})}
+        page: dict = requests.get(base_url + "/db-content", params=params).json()
+        accounts += [(account["id"], account["username"]) for account in page["message"]
+                     if account["username"].startswith(prefix)]
+        after_id = page["next_after_id"]
+        if after_id is None:
+            return accounts
+
+
+def mixed_read_workload(accounts: list[tuple[int, str]]) -> Workload:
+    def next_request(generator: random.Random) -> tuple[str, str, dict[str, str] | None, tuple[int, ...]]:
+        account_id, username = generator.choice(accounts)
+        roll: float = generator.random()
+        if roll < 0.2:
+            return "GET", "/", None, (200,)
+        elif roll < 0.8:
+            return "GET", f"/accounts/{account_id}", None, (200,)
+        else:
+            return "POST", "/login", {"username": username, "password": "Wrong-pw0"}, (400,)
+    return next_request
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Compare running servers under the same workload")
+    parser.add_argument("--target", action="append", required=True, help="name=base_url, e.g. sync=http://127.0.0.1:5555")
+    parser.add_argument("--pid", action="append", default=[], help="name=server pid, to report resident memory")
+    parser.add_argument("--accounts", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20)
+    args: argparse.Namespace = parser.parse_args()
+
+    pids: dict[str, int] = {name: int(pid) for name, pid in (item.split("=", 1) for item in args.pid)}
+    report: dict[str, dict[str, float | int]] = {}
+    for name, base_url in (item.split("=", 1) for item in args.target):
+        accounts: list[tuple[int, str]] = seed_accounts(base_url, args.accounts, "Load-pw0")
+        report[name] = run_load(base_url, mixed_read_workload(accounts), args.concurrency, args.duration)
+        if name in pids:
+            report[name]["rss_mb"] = get_rss_mb(pids[name])
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Callable
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine.base import Engine
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from api.models import Account
+from api import services
+
+
+# Lookups only: bcrypt is excluded so that the numbers isolate the database access path.
+# The script creates and drops the account table itself, only point it at a throwaway database.
+
+SEED_BATCH_SIZE: int = 10000
+PASSWORD_HASH: str = "$2b$12$" + "x" * 53
+
+
+def seed_accounts(engine: Engine, size: int) -> None:
+    with engine.begin() as connection:
+        for start in range(0, size, SEED_BATCH_SIZE):
+            rows: list[dict[str, str | bool]] = [{"email": f"user{i}@bench.test", "username": f"user{i}",
+                                                  "password": PASSWORD_HASH, "is_logged_in": False}
+                                                 for i in range(start, min(start + SEED_BATCH_SIZE, size))]
+            connection.execute(insert(Account), rows)
+
+
+def full_row_lookup(session: Session, username: str) -> Account | None:
+    return session.query(Account).filter(Account.username == username).first()
+
+
+def measure(session: Session, lookup: Callable[[Session, str], Account | None], usernames: list[str]) -> dict[str, float]:
+    latencies: list[float] = []
+    for username in usernames:
+        start: float = time.perf_counter()
+        lookup(session, username)
+        latencies.append(time.perf_counter() - start)
+        session.expunge_all()
+
+    latencies.sort()
+    return {"p50_ms": latencies[int(0.50 * (len(latencies) - 1))] * 1000,
+            "p99_ms": latencies[int(0.99 * (len(latencies) - 1))] * 1000}
+
+
+def run(database_url: str, size: int, lookups: int) -> dict[str, int | dict[str, float]]:
+    engine: Engine = create_engine(database_url)
+    username_index = next(index for index in Account.__table__.indexes if index.name == "ix_account_username")
+    Account.__table__.drop(engine, checkfirst=True)
+    Account.__table__.create(engine)
+    username_index.drop(engine)
+    seed_accounts(engine, size)
+
+    usernames: list[str] = [f"user{random.randrange(size)}" for _ in range(lookups)]
+    with Session(engine) as session:
+        before: dict[str, float] = measure(session, full_row_lookup, usernames)
+    username_index.create(engine)
+    with Session(engine) as session:
+        after: dict[str, float] = measure(session, services.get_account_for_login, usernames)
+
+    Account.__table__.drop(engine)
+    engine.dispose()
+    return {"accounts": size, "lookups": lookups, "before": before, "after": after}
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Benchmark the /login account lookup")
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    parser.add_argument("--sizes", default="10000,1000000,10000000", help="comma separated account counts")
+    parser.add_argument("--lookups", type=int, default=200)
+    args: argparse.Namespace = parser.parse_args()
+
+    results: list[dict[str, int | dict[str, float]]] = []
+    for size in [int(size) for size in args.sizes.split(",")]:
+        with tempfile.TemporaryDirectory() as directory:
+            database_url: str = args.database_url or "sqlite:///" + os.path.join(directory, "bench.db")
+            results.append(run(database_url, size, args.lookups))
+            print(json.dumps(results[-1]), file=sys.stderr)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
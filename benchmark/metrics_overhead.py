@@ -0,0 +1,73 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Callable
+from flask import Flask, Response, g
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from api.metrics import request_metrics
+from test.test_helper import create_test_app
+
+
+# The instrumentation cost is measured directly: end to end timings of two servers, or of a query with and without
+# the listeners, differ by more than the hooks themselves from one run to the next. A request pays the before/after
+# request hooks once, plus the cursor listeners once per SQL statement.
+
+def best_of(function: Callable[[], None], iterations: int, repeat: int) -> float:
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        for _ in range(iterations):
+            function()
+        best = min(best, time.perf_counter() - start)
+    return best / iterations
+
+
+def measure_request_hooks(app: Flask, iterations: int, repeat: int) -> float:
+    response: Response = Response("ok")
+
+    def run_hooks() -> None:
+        request_metrics._start_request()
+        request_metrics._end_request(response)
+
+    with app.test_request_context("/accounts/1"):
+        return best_of(run_hooks, iterations, repeat)
+
+
+def measure_cursor_listeners(app: Flask, iterations: int, repeat: int) -> float:
+    # SQLAlchemy passes its Connection, only its info dictionary is used by the listeners.
+    connection: SimpleNamespace = SimpleNamespace(info={})
+    statement: str = "SELECT account.id FROM account WHERE account.id = ?"
+
+    def run_listeners() -> None:
+        request_metrics._before_cursor_execute(connection, None, statement, (1,), None, False)
+        request_metrics._after_cursor_execute(connection, None, statement, (1,), None, False)
+
+    with app.test_request_context("/accounts/1"):
+        g.metrics = [time.perf_counter(), 0.0, 0.0, 0]
+        return best_of(run_listeners, iterations, repeat)
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Benchmark the per-request cost of /metrics instrumentation")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--statements", type=int, default=3, help="SQL statements per request for the estimate")
+    args: argparse.Namespace = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app: Flask = create_test_app(directory, METRICS_ENABLED=True)
+        hooks: float = measure_request_hooks(app, args.iterations, args.repeat)
+        listeners: float = measure_cursor_listeners(app, args.iterations, args.repeat)
+
+    print(json.dumps({"request_hooks_us": hooks * 1e6, "cursor_listeners_us_per_statement": listeners * 1e6,
+                      "overhead_us_per_request": (hooks + args.statements * listeners) * 1e6,
+                      "statements_per_request": args.statements}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from api.models import Account
+from api import serializers
+
+
+def legacy_serialize(account: Account) -> bytes:
+    account_dict: dict[str, str] = {key: value for key, value in account.__dict__.items() if key != "_sa_instance_state"}
+    return json.dumps(account_dict, sort_keys=True).encode("utf-8")
+
+
+def serialize(account: Account) -> bytes:
+    return serializers.dumps(serializers.serialize_account(account))
+
+
+def measure(function: Callable[[Account], bytes], accounts: list[Account], repeat: int) -> float:
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        for account in accounts:
+            function(account)
+        best = min(best, time.perf_counter() - start)
+    return len(accounts) / best
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Benchmark Account serialization throughput")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args: argparse.Namespace = parser.parse_args()
+
+    accounts: list[Account] = [Account(f"user{i}@bench.test", f"user{i}", "$2b$12$" + "x" * 53, False, "F", 
+                                       "0101010101", "1 bench street") for i in range(args.rows)]
+    for i, account in enumerate(accounts):
+        account.id = i
+
+    results: dict[str, float | int | bool] = {"rows": args.rows, "orjson": serializers.orjson is not None,
+                                              "legacy_rows_per_second": measure(legacy_serialize, accounts, args.repeat),
+                                              "serializer_rows_per_second": measure(serialize, accounts, args.repeat)}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
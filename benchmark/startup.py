@@ -0,0 +1,108 @@
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import requests
+from sqlalchemy import create_engine
+from sqlalchemy.engine.base import Engine
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from api.models import Account
+
+
+# Each boot is a fresh interpreter, as a new gunicorn worker or autoscaled instance would be. The worker reports
+# its own import and create_app times and the SQL statements run before serving, the parent measures the time from
+# spawning it to the first response and to the first response that needs the database.
+
+WORKER: str = """
+import json, sys, time
+start = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+statements = []
+event.listen(Engine, "before_cursor_execute", lambda *args: statements.append(1))
+from werkzeug.serving import make_server
+import runserver
+imported = time.perf_counter()
+server = make_server("127.0.0.1", int(sys.argv[1]), runserver.gunicorn_app, threaded=True)
+print(json.dumps({"import_and_create_app_seconds": imported - start, "startup_statements": len(statements)}), flush=True)
+server.serve_forever()
+"""
+
+MODES: dict[str, dict[str, str]] = {
+    "development": {"DB_CREATE_ALL": "True"},
+    "production": {"DB_CREATE_ALL": "False"},
+}
+
+
+def get_free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def wait_for(url: str, deadline: float) -> None:
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url).status_code == 200:
+                return
+        except requests.ConnectionError:
+            time.sleep(0.005)
+    raise RuntimeError(f"{url} did not answer within the timeout")
+
+
+def boot(database_url: str, mode: str) -> dict[str, float | int]:
+    port: int = get_free_port()
+    environment: dict[str, str] = {**os.environ, **MODES[mode], "SQLALCHEMY_DATABASE_URI": database_url,
+                                   "SECRET_KEY": "startup", "SESSION_TYPE": "memory", "PYTHONDONTWRITEBYTECODE": "1"}
+    start: float = time.monotonic()
+    worker: subprocess.Popen = subprocess.Popen([sys.executable, "-c", WORKER, str(port)], cwd=ROOT, env=environment,
+                                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        wait_for(f"http://127.0.0.1:{port}/", start + 60)
+        ready: float = time.monotonic() - start
+        wait_for(f"http://127.0.0.1:{port}/db-content?limit=1", start + 60)
+        first_db_request: float = time.monotonic() - start
+        return {**json.loads(worker.stdout.readline()), "time_to_first_request_seconds": ready,
+                "time_to_first_db_request_seconds": first_db_request}
+    finally:
+        worker.terminate()
+        worker.wait()
+
+
+def run(database_url: str, boots: int) -> dict:
+    engine: Engine = create_engine(database_url)
+    Account.__table__.drop(engine, checkfirst=True)
+    Account.__table__.create(engine)
+    engine.dispose()
+
+    report: dict = {"database": engine.dialect.name, "boots": boots, "modes": {}}
+    try:
+        for mode in MODES:
+            samples: list[dict[str, float | int]] = [boot(database_url, mode) for _ in range(boots)]
+            report["modes"][mode] = {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+    finally:
+        Account.__table__.drop(create_engine(database_url), checkfirst=True)
+    return report
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Measure worker import time and time to first request")
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    parser.add_argument("--boots", type=int, default=5, help="fresh workers started per mode, medians are reported")
+    args: argparse.Namespace = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        report: dict = run(args.database_url or "sqlite:///" + os.path.join(directory, "startup.db"), args.boots)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
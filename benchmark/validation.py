@@ -0,0 +1,107 @@
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from api.models import Account, account_schema
+from api import services
+
+
+# The legacy functions reproduce the request validation paths as they were before api.models.account_schema:
+# field lists rebuilt by Account.get_model_fields and Account.__table__.columns.keys() on every call.
+
+SIGNUP_BODY: dict[str, str] = {"email": "user@bench.test", "username": "user", "password": "Bench-pw0", "gender": "F",
+                               "phone_number": "0101010101"}
+PATCH_BODY: dict[str, str] = {"gender": "M", "phone_number": "0202020202", "address": "2 bench street", "random_field": "x"}
+FIELDS: str = "email,username,gender,is_logged_in"
+
+
+def legacy_get_model_fields(method: str = "all") -> list[str]:
+    auto: list[str] = ["id", "is_logged_in", "version"]
+    required: list[str] = ["email", "username", "password"]
+    optional: list[str] = ["gender", "phone_number", "address"]
+    if method == "auto":
+        return auto
+    elif method == "required":
+        return required
+    elif method == "optional":
+        return optional
+    return auto + required + optional
+
+
+def legacy_signup(body: dict[str, str]) -> None:
+    [field for field in legacy_get_model_fields("required") if field not in body.keys()]
+    optional_fields: list[str] = legacy_get_model_fields("optional")
+    {field: (body[field] if field in body.keys() else None) for field in optional_fields}
+
+
+def legacy_patch(body: dict[str, str]) -> None:
+    immutable_columns: frozenset[str] = frozenset(legacy_get_model_fields("auto"))
+    [column_name for column_name in body if column_name in immutable_columns]
+    {column_name: value for column_name, value in body.items()
+     if column_name != "password" and column_name in legacy_get_model_fields()}
+
+
+def legacy_reset() -> None:
+    {column_name: None for column_name in legacy_get_model_fields("optional")}
+
+
+def legacy_get_fields(fields: str) -> None:
+    columns: list[str] = Account.__table__.columns.keys()
+    requested_fields: list[str] = [field for field in fields.split(",") if field != ""]
+    any(field not in columns for field in requested_fields)
+    ["id"] + [field for field in requested_fields if field != "id"]
+
+
+def signup(body: dict[str, str]) -> None:
+    services.get_missing_field(body)
+    services.handle_optional_field_for_signup(body)
+
+
+def patch(body: dict[str, str]) -> None:
+    [column_name for column_name in body if column_name in services.IMMUTABLE_COLUMNS]
+    {column_name: value for column_name, value in body.items() if column_name in services.MUTABLE_COLUMNS and column_name != "password"}
+
+
+def reset() -> None:
+    account_schema.optional_defaults
+
+
+def get_fields(fields: str) -> None:
+    services.get_requested_columns(fields)
+
+
+def measure(function: Callable[[], None], iterations: int, repeat: int) -> float:
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        for _ in range(iterations):
+            function()
+        best = min(best, time.perf_counter() - start)
+    return best / iterations * 1e6
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Benchmark the per request cost of field validation")
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args: argparse.Namespace = parser.parse_args()
+
+    paths: dict[str, tuple[Callable[[], None], Callable[[], None]]] = {
+        "signup": (lambda: legacy_signup(SIGNUP_BODY), lambda: signup(SIGNUP_BODY)),
+        "patch": (lambda: legacy_patch(PATCH_BODY), lambda: patch(PATCH_BODY)),
+        "reset": (legacy_reset, reset),
+        "get_fields": (lambda: legacy_get_fields(FIELDS), lambda: get_fields(FIELDS)),
+    }
+    results: dict[str, dict[str, float]] = {}
+    for name, (legacy_function, function) in paths.items():
+        results[name] = {"legacy_microseconds": measure(legacy_function, args.iterations, args.repeat),
+                         "schema_microseconds": measure(function, args.iterations, args.repeat)}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,107 @@
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+DOTENV_PATH: str = os.getenv("DOTENV_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
+
+# python-dotenv is only imported when there is a file to load, production images set their environment directly.
+if os.path.isfile(DOTENV_PATH):
+    from dotenv import load_dotenv
+    load_dotenv(DOTENV_PATH)
+
+
+def get_engine_options(database_uri: str | None) -> dict[str, int | bool | dict[str, str]]:
+    if database_uri is None or database_uri.startswith("sqlite"):
+        return {}
+
+    engine_options: dict[str, int | bool | dict[str, str]] = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "True").lower() == "true",
+    }
+    statement_timeout: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))
+    if statement_timeout > 0 and database_uri.startswith("postgresql"):
+        engine_options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout}"}
+    return engine_options
+
 
 class Config():
     
     SQLALCHEMY_DATABASE_URI: str | None = os.getenv("SQLALCHEMY_DATABASE_URI")
+    SQLALCHEMY_ENGINE_OPTIONS: dict[str, int | bool | dict[str, str]] = get_engine_options(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS: bool = False
-    SESSION_TYPE: str = os.getenv("SESSION_TYPE")
+    DB_CREATE_ALL: bool = os.getenv("DB_CREATE_ALL", "True").lower() == "true" #Set to False in production: the schema is applied with flask db upgrade and workers boot without touching the database
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))
+    SQLALCHEMY_REPLICA_URIS: list[str] = [uri for uri in os.getenv("SQLALCHEMY_REPLICA_URIS", "").split(",") if uri] #Comma separated read replicas for the account reads, empty to read from the primary
+    REPLICA_STICKY_SECONDS: int = int(os.getenv("REPLICA_STICKY_SECONDS", 5)) #Reads of an account go to the primary for this long after it was written (should exceed the replication lag)
+    REPLICA_RETRY_INTERVAL: int = int(os.getenv("REPLICA_RETRY_INTERVAL", 10)) #A failing replica is skipped for this long, then health checked again
+    REPLICA_STICKINESS_TYPE: str = os.getenv("REPLICA_STICKINESS_TYPE", "sqlite") #sqlite (shared by the workers of one host), redis (shared by all hosts) or local (single process servers only)
+    REPLICA_STICKINESS_SQLITE_PATH: str | None = os.getenv("REPLICA_STICKINESS_SQLITE_PATH") #Defaults to sessions.db in the instance folder
+    REPLICA_STICKINESS_REDIS_URL: str | None = os.getenv("REPLICA_STICKINESS_REDIS_URL")
+    ASYNC_SQLALCHEMY_DATABASE_URI: str | None = os.getenv("ASYNC_SQLALCHEMY_DATABASE_URI") #Derived from SQLALCHEMY_DATABASE_URI when unset
+    SESSION_TYPE: str = os.getenv("SESSION_TYPE", "sqlite") #sqlite (shared by the workers of one host), redis (shared by all hosts) or memory (tests and single process servers only)
+    SESSION_TTL: int = int(os.getenv("SESSION_TTL", 86400))
+    SESSION_SQLITE_PATH: str | None = os.getenv("SESSION_SQLITE_PATH") #Defaults to sessions.db in the instance folder
+    SESSION_REDIS_URL: str | None = os.getenv("SESSION_REDIS_URL")
+    SESSION_MULTIPLE_PER_ACCOUNT: bool = os.getenv("SESSION_MULTIPLE_PER_ACCOUNT", "False").lower() == "true"
     SECRET_KEY: str = os.getenv("SECRET_KEY")
-    LOGIN_DISABLED = False #This should be turned to True during Unit Testing
\ No newline at end of file
+    LOGIN_DISABLED = False #This should be turned to True during Unit Testing
+    HASHING_POOL_SIZE: int = int(os.getenv("HASHING_POOL_SIZE", 2)) #Set to 0 to hash inline on the request thread
+    HASHING_QUEUE_SIZE: int = int(os.getenv("HASHING_QUEUE_SIZE", 16))
+    HASHING_RETRY_AFTER: int = int(os.getenv("HASHING_RETRY_AFTER", 1))
+    HASHING_START_METHOD: str = os.getenv("HASHING_START_METHOD", "forkserver") #fork shares the listening socket and DB connections with the hashing workers
+    BCRYPT_LOG_ROUNDS: int = int(os.getenv("BCRYPT_LOG_ROUNDS", 12))
+    BCRYPT_CALIBRATE: bool = os.getenv("BCRYPT_CALIBRATE", "False").lower() == "true" #Benchmarks the host once and overrides BCRYPT_LOG_ROUNDS
+    BCRYPT_CALIBRATION_PATH: str = os.getenv("BCRYPT_CALIBRATION_PATH", "bcrypt_calibration.json") #Calibration result shared by the workers and kept across restarts, delete it to recalibrate
+    BCRYPT_LATENCY_BUDGET_MS: int = int(os.getenv("BCRYPT_LATENCY_BUDGET_MS", 250))
+    BCRYPT_CALIBRATION_SAMPLES: int = int(os.getenv("BCRYPT_CALIBRATION_SAMPLES", 5))
+    BCRYPT_MIN_LOG_ROUNDS: int = int(os.getenv("BCRYPT_MIN_LOG_ROUNDS", 10))
+    BCRYPT_MAX_LOG_ROUNDS: int = int(os.getenv("BCRYPT_MAX_LOG_ROUNDS", 16))
+    TOKEN_AUTH_ENABLED: bool = os.getenv("TOKEN_AUTH_ENABLED", "False").lower() == "true" #/login also returns signed access and refresh tokens
+    TOKEN_SECRET_KEY: str | None = os.getenv("TOKEN_SECRET_KEY") #Defaults to SECRET_KEY
+    TOKEN_ACCESS_TTL: int = int(os.getenv("TOKEN_ACCESS_TTL", 300))
+    TOKEN_REFRESH_TTL: int = int(os.getenv("TOKEN_REFRESH_TTL", 86400))
+    TOKEN_DENYLIST_TYPE: str = os.getenv("TOKEN_DENYLIST_TYPE", "sqlite") #sqlite (shared by the workers of one host), redis (shared by all hosts) or local (single process servers only: a revocation is unknown to the other workers)
+    TOKEN_DENYLIST_SQLITE_PATH: str | None = os.getenv("TOKEN_DENYLIST_SQLITE_PATH") #Defaults to sessions.db in the instance folder
+    TOKEN_DENYLIST_REDIS_URL: str | None = os.getenv("TOKEN_DENYLIST_REDIS_URL")
+    PASSWORD_MIN_LENGTH: int = int(os.getenv("PASSWORD_MIN_LENGTH", 6))
+    PASSWORD_REQUIRE_SPECIAL: bool = os.getenv("PASSWORD_REQUIRE_SPECIAL", "True").lower() == "true"
+    PASSWORD_REQUIRE_UPPER_CASE: bool = os.getenv("PASSWORD_REQUIRE_UPPER_CASE", "True").lower() == "true"
+    PASSWORD_REQUIRE_LOWER_CASE: bool = os.getenv("PASSWORD_REQUIRE_LOWER_CASE", "True").lower() == "true"
+    PASSWORD_REQUIRE_DIGIT: bool = os.getenv("PASSWORD_REQUIRE_DIGIT", "True").lower() == "true"
+    PASSWORD_DENYLIST_PATH: str | None = os.getenv("PASSWORD_DENYLIST_PATH") #Text file, one common or breached password per line
+    PASSWORD_DENYLIST_FALSE_POSITIVE_RATE: float = float(os.getenv("PASSWORD_DENYLIST_FALSE_POSITIVE_RATE", 0.001))
+    LOGIN_THROTTLE_TYPE: str = os.getenv("LOGIN_THROTTLE_TYPE", "local") #local (per process), redis (shared by all workers) or null
+    LOGIN_THROTTLE_WINDOW: int = int(os.getenv("LOGIN_THROTTLE_WINDOW", 60)) #Sliding window in seconds
+    LOGIN_THROTTLE_BUCKETS: int = int(os.getenv("LOGIN_THROTTLE_BUCKETS", 6)) #Sub-windows the sliding window moves by
+    LOGIN_THROTTLE_MAX_PER_USERNAME: int = int(os.getenv("LOGIN_THROTTLE_MAX_PER_USERNAME", 10))
+    LOGIN_THROTTLE_MAX_PER_IP: int = int(os.getenv("LOGIN_THROTTLE_MAX_PER_IP", 50))
+    LOGIN_THROTTLE_SKETCH_WIDTH: int = int(os.getenv("LOGIN_THROTTLE_SKETCH_WIDTH", 4096))
+    LOGIN_THROTTLE_SKETCH_DEPTH: int = int(os.getenv("LOGIN_THROTTLE_SKETCH_DEPTH", 4))
+    LOGIN_THROTTLE_REDIS_URL: str | None = os.getenv("LOGIN_THROTTLE_REDIS_URL")
+    ERROR_LOG_STREAM: str = os.getenv("ERROR_LOG_STREAM", "stdout") #JSON error records are written by a background thread to stdout or stderr
+    ERROR_LOG_QUEUE_SIZE: int = int(os.getenv("ERROR_LOG_QUEUE_SIZE", 1000)) #Records waiting for the writer thread, further ones are dropped and counted
+    ERROR_LOG_DEDUP_WINDOW: int = int(os.getenv("ERROR_LOG_DEDUP_WINDOW", 10)) #Identical errors (route, class, message) are logged at most ERROR_LOG_DEDUP_MAX times per window
+    ERROR_LOG_DEDUP_MAX: int = int(os.getenv("ERROR_LOG_DEDUP_MAX", 1))
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "True").lower() == "true" #Per-route latency, bcrypt and SQL metrics at /metrics
+    ACCOUNT_CACHE_TYPE: str = os.getenv("ACCOUNT_CACHE_TYPE", "sqlite") #sqlite (shared by the workers of one host), redis (shared by all hosts), local (single process only) or null
+    ACCOUNT_CACHE_SQLITE_PATH: str | None = os.getenv("ACCOUNT_CACHE_SQLITE_PATH") #Defaults to cache.db in the instance folder
+    ACCOUNT_CACHE_SIZE: int = int(os.getenv("ACCOUNT_CACHE_SIZE", 10000))
+    ACCOUNT_CACHE_TTL: int = int(os.getenv("ACCOUNT_CACHE_TTL", 60))
+    ACCOUNT_CACHE_REDIS_URL: str | None = os.getenv("ACCOUNT_CACHE_REDIS_URL")
+    ACCOUNT_ETAG_CACHE_TYPE: str = os.getenv("ACCOUNT_ETAG_CACHE_TYPE", "sqlite") #ETags of GET /accounts/<id>, answers If-None-Match with 304 without a query. Same types as ACCOUNT_CACHE_TYPE
+    ACCOUNT_ETAG_CACHE_SQLITE_PATH: str | None = os.getenv("ACCOUNT_ETAG_CACHE_SQLITE_PATH") #Defaults to cache.db in the instance folder
+    ACCOUNT_ETAG_CACHE_SIZE: int = int(os.getenv("ACCOUNT_ETAG_CACHE_SIZE", 10000))
+    ACCOUNT_ETAG_CACHE_TTL: int = int(os.getenv("ACCOUNT_ETAG_CACHE_TTL", 60))
+    ACCOUNT_ETAG_CACHE_REDIS_URL: str | None = os.getenv("ACCOUNT_ETAG_CACHE_REDIS_URL")
+    DB_CONTENT_MAX_LIMIT: int = int(os.getenv("DB_CONTENT_MAX_LIMIT", 1000)) #Page size cap for /db-content?limit=
+    DB_CONTENT_YIELD_PER: int = int(os.getenv("DB_CONTENT_YIELD_PER", 1000)) #Rows fetched per round trip when streaming /db-content
+    ACCOUNT_PURGE_RETENTION: int = int(os.getenv("ACCOUNT_PURGE_RETENTION", 86400)) #Seconds a deleted account is kept as a tombstone (and can be restored) before being purged
+    ACCOUNT_PURGE_WORKER: bool = os.getenv("ACCOUNT_PURGE_WORKER", "False").lower() == "true" #Purges from a background thread of each worker, otherwise run flask accounts purge from cron
+    ACCOUNT_PURGE_INTERVAL: int = int(os.getenv("ACCOUNT_PURGE_INTERVAL", 300)) #Seconds between two runs of the purge thread
+    ACCOUNT_PURGE_HOURS: str = os.getenv("ACCOUNT_PURGE_HOURS", "") #UTC hours the purge thread may run in, e.g. 1-5 (22-4 wraps around midnight), empty for any hour
+    ACCOUNT_PURGE_BATCH_SIZE: int = int(os.getenv("ACCOUNT_PURGE_BATCH_SIZE", 500)) #Tombstones deleted per transaction
+    ACCOUNT_PURGE_MAX_ROWS_PER_SECOND: int = int(os.getenv("ACCOUNT_PURGE_MAX_ROWS_PER_SECOND", 1000)) #The purge pauses between batches to stay under this rate, 0 for no limit
+    ACCOUNT_BATCH_MAX_SIZE: int = int(os.getenv("ACCOUNT_BATCH_MAX_SIZE", 1000))
+    REQUEST_MAX_BODY_SIZE: int = int(os.getenv("REQUEST_MAX_BODY_SIZE", 16384)) #Bytes, larger JSON bodies are rejected with 413 before being parsed
+    REQUEST_MAX_BATCH_BODY_SIZE: int = int(os.getenv("REQUEST_MAX_BATCH_BODY_SIZE", 2097152)) #Same for /accounts/batch
\ No newline at end of file
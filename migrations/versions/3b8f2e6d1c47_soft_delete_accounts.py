@@ -0,0 +1,61 @@
+"""soft delete accounts
+
+Revision ID: 3b8f2e6d1c47
+Revises: 5e1d7a0c93b4
+Create Date: 2026-10-18 21:05:12.604318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8f2e6d1c47'
+down_revision = '5e1d7a0c93b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('account', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+    if op.get_context().dialect.name == 'postgresql':
+        # The partial indexes are built next to the old ones, without blocking writes, then swapped in: email and username
+        # stay unique during the whole migration.
+        with op.get_context().autocommit_block():
+            for column in ('email', 'username'):
+                op.create_index(f'ix_account_{column}_live', 'account', [column], unique=True,
+                                postgresql_where=sa.text('deleted_at IS NULL'), postgresql_concurrently=True)
+                op.drop_index(f'ix_account_{column}', table_name='account', postgresql_concurrently=True)
+                op.execute(f'ALTER INDEX ix_account_{column}_live RENAME TO ix_account_{column}')
+            op.create_index('ix_account_deleted_at', 'account', ['deleted_at'], unique=False,
+                            postgresql_where=sa.text('deleted_at IS NOT NULL'), postgresql_concurrently=True)
+        return
+
+    op.drop_index('ix_account_username', table_name='account')
+    op.drop_index('ix_account_email', table_name='account')
+    op.create_index('ix_account_email', 'account', ['email'], unique=True, sqlite_where=sa.text('deleted_at IS NULL'))
+    op.create_index('ix_account_username', 'account', ['username'], unique=True, sqlite_where=sa.text('deleted_at IS NULL'))
+    op.create_index('ix_account_deleted_at', 'account', ['deleted_at'], unique=False,
+                    sqlite_where=sa.text('deleted_at IS NOT NULL'))
+
+
+def downgrade():
+    op.execute("DELETE FROM account WHERE deleted_at IS NOT NULL")
+    if op.get_context().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index('ix_account_deleted_at', table_name='account', postgresql_concurrently=True)
+            for column in ('email', 'username'):
+                op.create_index(f'ix_account_{column}_all', 'account', [column], unique=True, postgresql_concurrently=True)
+                op.drop_index(f'ix_account_{column}', table_name='account', postgresql_concurrently=True)
+                op.execute(f'ALTER INDEX ix_account_{column}_all RENAME TO ix_account_{column}')
+    else:
+        op.drop_index('ix_account_deleted_at', table_name='account')
+        op.drop_index('ix_account_username', table_name='account')
+        op.drop_index('ix_account_email', table_name='account')
+        op.create_index('ix_account_email', 'account', ['email'], unique=True)
+        op.create_index('ix_account_username', 'account', ['username'], unique=True)
+
+    with op.batch_alter_table('account', schema=None) as batch_op:
+        batch_op.drop_column('deleted_at')
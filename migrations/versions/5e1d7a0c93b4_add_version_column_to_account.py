@@ -0,0 +1,26 @@
+"""add version column to account
+
+Revision ID: 5e1d7a0c93b4
+Revises: cfbb97da2a5c
+Create Date: 2026-10-18 19:20:41.218305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1d7a0c93b4'
+down_revision = 'cfbb97da2a5c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('account', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('account', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,50 @@
+"""add unique indexes on email and username
+
+Revision ID: cfbb97da2a5c
+Revises: aa70f333a987
+Create Date: 2026-10-18 18:24:15.451116
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cfbb97da2a5c'
+down_revision = 'aa70f333a987'
+branch_labels = None
+depends_on = None
+
+
+def find_duplicates(column):
+    return op.get_bind().execute(sa.text(f"SELECT {column}, COUNT(*) FROM account WHERE {column} IS NOT NULL "
+                                         f"GROUP BY {column} HAVING COUNT(*) > 1 ORDER BY COUNT(*) DESC LIMIT 20")).all()
+
+
+def upgrade():
+    # A unique index cannot be built over duplicates: report them all up front instead of failing on the first index.
+    duplicates = {} if context.is_offline_mode() else {column: find_duplicates(column) for column in ('email', 'username')}
+    if any(duplicates.values()):
+        report = "; ".join(f"{column}: " + ", ".join(f"{value!r} x{count}" for value, count in rows)
+                           for column, rows in duplicates.items() if rows)
+        raise RuntimeError("duplicate accounts must be merged or removed before the unique indexes can be created "
+                           f"(at most 20 values shown per column) - {report}")
+
+    # On PostgreSQL the indexes are built without locking the table against writes, outside of the migration transaction.
+    if op.get_context().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.create_index(op.f('ix_account_email'), 'account', ['email'], unique=True, postgresql_concurrently=True)
+            op.create_index(op.f('ix_account_username'), 'account', ['username'], unique=True, postgresql_concurrently=True)
+    else:
+        op.create_index(op.f('ix_account_email'), 'account', ['email'], unique=True)
+        op.create_index(op.f('ix_account_username'), 'account', ['username'], unique=True)
+
+
+def downgrade():
+    if op.get_context().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index(op.f('ix_account_username'), table_name='account', postgresql_concurrently=True)
+            op.drop_index(op.f('ix_account_email'), table_name='account', postgresql_concurrently=True)
+    else:
+        op.drop_index(op.f('ix_account_username'), table_name='account')
+        op.drop_index(op.f('ix_account_email'), table_name='account')
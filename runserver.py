@@ -1,12 +1,16 @@
+import click
 from flask import Flask
 from api import create_app, db
 from config import Config
-from flask_migrate import Migrate
 
 app: Flask = create_app(Config)
-migrate: Migrate = Migrate(app, db)
+
+# Only the flask CLI (flask --app runserver db ...) needs Flask-Migrate, server workers skip importing alembic.
+if click.get_current_context(silent=True) is not None:
+    from flask_migrate import Migrate
+    migrate: Migrate = Migrate(app, db)
+
+gunicorn_app: Flask = app
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5555)
-else:
-    gunicorn_app = create_app(Config)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=5555)
\ No newline at end of file
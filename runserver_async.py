@@ -0,0 +1,8 @@
+from quart import Quart
+from api.asgi import create_async_app
+from config import Config
+
+asgi_app: Quart = create_async_app(Config)
+
+if __name__ == "__main__":
+    asgi_app.run(host="0.0.0.0", port=5556)
@@ -13,6 +13,12 @@ request_body: dict[str, str] = {
 }
 
 
+def get_login_state(account_email: str) -> bool:
+    endpoint: str = base_endpoint + "/accounts/" + str(get_account_specifics(account_email, "id"))
+    response: Response = requests.get(endpoint, params={"fields": "is_logged_in"})
+    return response.json()["message"]["is_logged_in"]
+
+
 def test_endpoint_is_accessible() -> None:
     endpoint: str = base_endpoint + "/"
     response: Response = requests.get(endpoint)
@@ -27,6 +33,20 @@ def test_database_is_accessible() -> None:
 
 
 
+def test_database_content_can_be_paginated() -> None:
+    endpoint: str = base_endpoint + "/db-content"
+    response: Response = requests.get(endpoint, params={"limit": 1, "fields": "email"})
+    assert response.status_code == 200
+    assert all(set(account.keys()) == {"id", "email"} for account in response.json()["message"])
+
+    response: Response = requests.get(endpoint, params={"fields": "random_field"})
+    assert response.status_code == 400
+
+    response: Response = requests.get(endpoint, params={"format": "jsonl"})
+    assert response.status_code == 200 and response.headers["Content-Type"] == "application/x-ndjson"
+
+
+
 def test_signup_works() -> None:
     endpoint: str = base_endpoint + "/signup"
 
@@ -48,7 +68,7 @@ def test_signup_works() -> None:
     response: Response = requests.post(endpoint, json=valid_body)
     assert response.status_code == 200
 
-    account_status: bool = get_account_specifics(request_body["email"], "is_logged_in")
+    account_status: bool = get_login_state(request_body["email"])
     assert account_status == True
 
     not_unique_email_body: dict[str, str] = {
@@ -72,14 +92,14 @@ def test_signup_works() -> None:
         "address": None,
         "gender": None,
         "phone_number": None,
-        "is_logged_in": True,
+        "version": 1,
         "id": posted_data["id"]
     }
     request_body.update(additionnal_body)
     assert flask_bcrypt.check_password_hash(posted_data["password"], request_body["password"])
 
-    posted_data_without_password: dict[str, str] = {k:v for k,v in posted_data.items() if k not in ("password")}
-    request_body_witout_password: dict[str, str] = {k:v for k,v in request_body.items() if k not in ("password")}
+    posted_data_without_password: dict[str, str] = {k:v for k,v in posted_data.items() if k not in ("password", "is_logged_in")}
+    request_body_witout_password: dict[str, str] = {k:v for k,v in request_body.items() if k not in ("password", "is_logged_in")}
     assert posted_data_without_password == request_body_witout_password
 
 
@@ -103,7 +123,7 @@ def test_logout_works() -> None:
     response: Response = requests.post(endpoint)
     assert response.status_code == 200
 
-    account_status: bool = get_account_specifics(request_body["email"], "is_logged_in")
+    account_status: bool = get_login_state(request_body["email"])
     assert account_status == False
 
     already_logged_out_endpoint: str = endpoint
@@ -148,7 +168,7 @@ def test_login_works() -> None:
     response: Response = requests.post(endpoint, json=valid_login_body)
     assert response.status_code == 200
 
-    account_status: bool = get_account_specifics(request_body["email"], "is_logged_in")
+    account_status: bool = get_login_state(request_body["email"])
     assert account_status == True
 
     already_logged_in_body: dict[str, str] = valid_login_body
@@ -156,6 +176,14 @@ def test_login_works() -> None:
     assert response.status_code == 400
 
 
+def test_malformed_bodies_are_rejected() -> None:
+    response: Response = requests.post(base_endpoint + "/login", json={"password": request_body["password"]})
+    assert response.status_code == 400 and response.json()["message"] == "missing field: username"
+
+    response: Response = requests.post(base_endpoint + "/signup", json={**request_body, "address": "x" * 100000})
+    assert response.status_code == 413 and response.json()["code"] == "413"
+
+
 def test_welcome_page_requires_login() -> None:
     endpoint: str = base_endpoint + "/home"
     response: Response = requests.get(endpoint)
@@ -195,6 +223,38 @@ def test_content_modification() -> None:
     assert response.status_code == 404
 
 
+def test_concurrent_modification_is_rejected() -> None:
+    id_to_patch: int = get_account_specifics(request_body["email"], "id")
+    endpoint: str = base_endpoint + "/accounts/" + str(id_to_patch)
+    version: int = get_account_specifics(request_body["email"], "version")
+
+    response: Response = requests.patch(endpoint, json={"address": "1 rue de Paris"}, headers={"If-Match": f'"{version}"'})
+    assert response.status_code == 200 and response.headers["ETag"] == f'"{version + 1}"'
+
+    response: Response = requests.patch(endpoint, json={"address": "2 rue de Paris"}, headers={"If-Match": f'"{version}"'})
+    assert response.status_code == 412
+    assert get_account_specifics(request_body["email"], "address") == "1 rue de Paris"
+
+    response: Response = requests.patch(endpoint, json={"version": 1})
+    assert response.status_code == 400
+
+
+def test_conditional_get_answers_not_modified() -> None:
+    endpoint: str = base_endpoint + "/accounts/" + str(get_account_specifics(request_body["email"], "id"))
+    response: Response = requests.get(endpoint)
+    etag: str = response.headers["ETag"]
+    assert response.status_code == 200
+
+    response: Response = requests.get(endpoint, headers={"If-None-Match": etag})
+    assert response.status_code == 304 and response.headers["ETag"] == etag
+
+    response: Response = requests.patch(endpoint, json={"gender": "X"})
+    assert response.status_code == 200
+
+    response: Response = requests.get(endpoint, headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["ETag"] != etag and response.json()["message"]["gender"] == "X"
+
+
 def test_password_modification() -> None:
     id_to_patch: int = get_account_specifics(request_body["email"], "id")
     endpoint: str = base_endpoint + "/accounts/" + str(id_to_patch)
@@ -252,4 +312,40 @@ def test_delete_works() -> None:
 
     already_deleted_endpoint: str = endpoint
     response: Response = requests.get(already_deleted_endpoint)
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+def test_hashing_metrics_are_exposed() -> None:
+    endpoint: str = base_endpoint + "/metrics"
+    response: Response = requests.get(endpoint)
+    assert response.status_code == 200
+    samples: dict[str, str] = dict(line.rsplit(" ", 1) for line in response.text.splitlines() if not line.startswith("#"))
+    assert float(samples["flask_auth_hashing_completed_total"]) >= 1
+
+
+def test_pool_metrics_are_exposed() -> None:
+    endpoint: str = base_endpoint + "/metrics"
+    response: Response = requests.get(endpoint)
+    assert response.status_code == 200 and 'flask_auth_pool_checked_out{bind="default"}' in response.text
+
+
+def test_batch_endpoints_work() -> None:
+    accounts: list[dict[str, str]] = [{"email": f"batch{i}@test.com", "username": f"batch{i}", "password": "Batch-pw0"}
+                                      for i in range(3)]
+    response: Response = requests.post(base_endpoint + "/accounts/batch", json=accounts + [accounts[0]])
+    assert response.status_code == 200
+    results: list[dict] = response.json()["message"]
+    assert [result["status"] for result in results] == ["success", "success", "success", "failure"]
+
+    ids: list[int] = [result["id"] for result in results[:3]]
+    response: Response = requests.get(base_endpoint + "/accounts", params={"ids": ",".join(map(str, ids)), "fields": "username"})
+    assert [account["username"] for account in response.json()["message"]] == ["batch0", "batch1", "batch2"]
+
+    response: Response = requests.delete(base_endpoint + "/accounts/batch", json={"ids": ids})
+    assert response.json()["message"]["deleted_ids"] == ids
+
+
+def test_request_metrics_are_exposed() -> None:
+    response: Response = requests.get(base_endpoint + "/metrics")
+    assert response.status_code == 200
+    assert 'flask_auth_request_duration_seconds_count{endpoint="signup",method="POST"}' in response.text
+    assert 'flask_auth_requests_total{endpoint="signup",method="POST",status="200"}' in response.text
@@ -0,0 +1,42 @@
+import os
+import tempfile
+from flask import Flask
+from sqlalchemy import inspect
+from api import db
+from .test_helper import create_test_app
+
+
+def test_production_startup_skips_create_all() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        app: Flask = create_test_app(directory, DB_CREATE_ALL=False)
+        with app.app_context():
+            assert not os.path.exists(os.path.join(directory, "app.db"))
+            assert not inspect(db.engine).has_table("account")
+            db.engine.dispose()
+
+
+
+def test_repeated_gets_only_write_changed_etags(monkeypatch) -> None:
+    from api.cache import account_etag_cache
+    with tempfile.TemporaryDirectory() as directory:
+        app: Flask = create_test_app(directory, ACCOUNT_ETAG_CACHE_TYPE="local")
+        client = app.test_client()
+        assert client.post("/signup", json={"email": "etag@test.com", "username": "etag", "password": "Etag-pw00"}).status_code == 200
+        written_etags: list[dict[str, str]] = []
+        etag_cache_set = account_etag_cache.set
+
+        def record_set(key: int, value: dict[str, str]) -> None:
+            written_etags.append(value)
+            etag_cache_set(key, value)
+
+        monkeypatch.setattr(account_etag_cache, "set", record_set)
+
+        for _ in range(3):
+            assert client.get("/accounts/1").status_code == 200
+        assert client.get("/accounts/1?fields=username").status_code == 200
+        assert client.patch("/accounts/1", json={"address": "1 etag street"}).status_code == 200
+        assert client.get("/accounts/1").status_code == 200
+        assert len(written_etags) == 3
+
+        with app.app_context():
+            db.engine.dispose()
@@ -0,0 +1,170 @@
+import asyncio
+import tempfile
+import threading
+from typing import Any, Callable
+import pytest
+
+# The async app is optional (requirements-async.txt): without its packages these tests are skipped.
+pytest.importorskip("quart")
+pytest.importorskip("aiosqlite")
+
+from quart import Quart
+from api.asgi import create_async_app
+from .test_helper import build_test_config, create_test_app
+
+
+def build_async_app(directory: str, **settings: Any) -> Quart:
+    return create_async_app(build_test_config(directory, ACCOUNT_CACHE_TYPE="local", ACCOUNT_ETAG_CACHE_TYPE="local", **settings))
+
+
+accounts: list[dict[str, str]] = [{"email": f"async{i}@test.com", "username": f"async{i}", "password": "Async-pw0"}
+                                  for i in range(2)]
+
+
+
+def test_async_signup_login_patch_and_delete() -> None:
+    async def run(app: Quart) -> None:
+        async with app.test_app() as test_app:
+            client = test_app.test_client()
+            assert (await client.post("/signup", json=accounts[1])).status_code == 200
+            assert (await client.post("/logout/1", json={})).status_code == 200
+
+            response = await client.post("/signup", json=accounts[0])
+            assert response.status_code == 200
+            response = await client.post("/signup", json={**accounts[0], "username": "other"})
+            assert response.status_code == 400
+            assert (await response.get_json())["message"] == "an account is already registered with this email"
+
+            assert await (await client.get("/home")).get_data(as_text=True) == "Welcome async0!"
+            assert (await client.post("/logout/2")).status_code == 200
+            assert (await client.get("/home")).status_code == 401
+            response = await client.post("/login", json={"username": "async0", "password": "wrong"})
+            assert response.status_code == 400 and (await response.get_json())["message"] == "wrong password"
+            assert (await client.post("/login", json={"username": "async0", "password": "Async-pw0"})).status_code == 200
+            account = await (await client.get("/accounts/2")).get_json()
+            assert account["message"]["username"] == "async0" and account["message"]["is_logged_in"] is True
+
+            assert (await client.patch("/accounts/2", json={"address": "1 async street"})).status_code == 200
+            assert (await (await client.get("/accounts/2?fields=address")).get_json())["message"]["address"] == "1 async street"
+            response = await client.patch("/accounts/2", json={"email": accounts[1]["email"]})
+            assert response.status_code == 400
+            assert (await response.get_json())["message"] == "an account is already registered with this email"
+            response = await client.patch("/accounts/2", json={"id": 5})
+            assert response.status_code == 400 and (await response.get_json())["message"] == "field cannot be modified: id"
+
+            assert (await client.delete("/accounts/2")).status_code == 200
+            assert (await client.get("/accounts/2")).status_code == 404
+            assert (await client.get("/home")).status_code == 401
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(build_async_app(directory)))
+
+
+
+def test_async_request_bodies_are_validated_and_logins_throttled() -> None:
+    async def run(app: Quart) -> None:
+        async with app.test_app() as test_app:
+            client = test_app.test_client()
+            response = await client.post("/signup", json={"email": "async@test.com", "password": "Async-pw0"})
+            assert response.status_code == 400 and (await response.get_json())["message"] == "missing field: username"
+            response = await client.post("/signup", data=b"[]", headers={"Content-Type": "application/json"})
+            assert response.status_code == 400 and (await response.get_json())["message"] == "the body must be a JSON object"
+            response = await client.post("/signup", json={**accounts[0], "address": "x" * 20000})
+            assert response.status_code == 413
+
+            for _ in range(2):
+                assert (await client.post("/login", json={"username": "nobody", "password": "Async-pw0"})).status_code == 400
+            response = await client.post("/login", json={"username": "nobody", "password": "Async-pw0"})
+            assert response.status_code == 429 and "Retry-After" in response.headers
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(build_async_app(directory, LOGIN_THROTTLE_MAX_PER_USERNAME=2)))
+
+
+
+def test_async_batch_endpoints_and_tokens() -> None:
+    async def run(app: Quart) -> None:
+        async with app.test_app() as test_app:
+            client = test_app.test_client()
+            response = await client.post("/accounts/batch", json=accounts + [accounts[0]])
+            results: list[dict[str, Any]] = (await response.get_json())["message"]
+            assert [result["status"] for result in results] == ["success", "success", "failure"]
+            assert results[2]["message"] == "an account is already registered with this email"
+
+            response = await client.post("/login", json={"username": "async0", "password": "Async-pw0"})
+            tokens: dict[str, Any] = await response.get_json()
+            token_client = test_app.test_client()
+            headers: dict[str, str] = {"Authorization": "Bearer " + tokens["access_token"]}
+            assert await (await token_client.get("/home", headers=headers)).get_data(as_text=True) == "Welcome async0!"
+            response = await token_client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+            assert response.status_code == 200 and "access_token" in await response.get_json()
+
+            response = await client.delete("/accounts/batch", json={"ids": [results[0]["id"], 99]})
+            assert (await response.get_json())["message"] == {"deleted_ids": [results[0]["id"]], "missing_ids": [99]}
+            assert (await token_client.get("/home", headers=headers)).status_code == 401
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(build_async_app(directory, TOKEN_AUTH_ENABLED=True)))
+
+
+
+def test_async_patch_and_put_honor_if_match() -> None:
+    async def run(app: Quart) -> None:
+        async with app.test_app() as test_app:
+            client = test_app.test_client()
+            assert (await client.post("/signup", json=accounts[0])).status_code == 200
+            etag: str = (await client.get("/accounts/1?fields=address")).headers["ETag"]
+
+            response = await client.patch("/accounts/1", json={"address": "1 async street"}, headers={"If-Match": etag})
+            assert response.status_code == 200 and response.headers["ETag"] == '"2"'
+            response = await client.patch("/accounts/1", json={"address": "2 async street"}, headers={"If-Match": etag})
+            assert response.status_code == 412
+            assert (await client.put("/accounts/1", headers={"If-Match": etag})).status_code == 412
+            assert (await client.patch("/accounts/1", json={"address": "x"}, headers={"If-Match": "2"})).status_code == 400
+
+            response = await client.put("/accounts/1", headers={"If-Match": '"2"'})
+            assert response.status_code == 200 and response.headers["ETag"] == '"3"'
+            assert (await (await client.get("/accounts/1?fields=address")).get_json())["message"]["address"] is None
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(build_async_app(directory)))
+
+
+
+def test_async_routes_call_the_stores_off_the_event_loop(monkeypatch) -> None:
+    from api.cache import account_cache
+    from api.sessions import session_store
+    calling_threads: list[threading.Thread] = []
+
+    def record_thread(function: Callable[..., Any]) -> Callable[..., Any]:
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            calling_threads.append(threading.current_thread())
+            return function(*args, **kwargs)
+        return wrapper
+
+    async def run(app: Quart) -> None:
+        monkeypatch.setattr(session_store, "get_account_id", record_thread(session_store.get_account_id))
+        monkeypatch.setattr(account_cache, "get", record_thread(account_cache.get))
+        async with app.test_app() as test_app:
+            client = test_app.test_client()
+            assert (await client.post("/signup", json=accounts[0])).status_code == 200
+            assert (await client.get("/home")).status_code == 200
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(build_async_app(directory)))
+    assert len(calling_threads) >= 2 and threading.main_thread() not in calling_threads
+
+
+
+def test_async_and_wsgi_apps_answer_the_same_bodies() -> None:
+    paths: list[str] = ["/accounts/1?fields=nope", "/accounts/1", "/accounts?ids=x"]
+    with tempfile.TemporaryDirectory() as directory:
+        wsgi_client = create_test_app(directory, ACCOUNT_CACHE_TYPE="local", ACCOUNT_ETAG_CACHE_TYPE="local").test_client()
+        wsgi_bodies: list[bytes] = [wsgi_client.get(path).get_data() for path in paths]
+
+        async def run(app: Quart) -> list[bytes]:
+            async with app.test_app() as test_app:
+                client = test_app.test_client()
+                return [await (await client.get(path)).get_data() for path in paths]
+
+        assert asyncio.run(run(build_async_app(directory))) == wsgi_bodies
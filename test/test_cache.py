@@ -0,0 +1,69 @@
+import os
+import tempfile
+import time
+from flask import Flask
+from api.cache import AccountCache, LocalCacheBackend, SqliteCacheBackend
+
+
+def test_local_cache_evicts_least_recently_used() -> None:
+    cache: LocalCacheBackend = LocalCacheBackend(max_size=2, ttl=60)
+    cache.set("1", {"id": 1})
+    cache.set("2", {"id": 2})
+    assert cache.get("1") == {"id": 1}
+
+    cache.set("3", {"id": 3})
+    assert cache.get("2") is None
+    assert cache.get("1") == {"id": 1} and cache.get("3") == {"id": 3}
+
+
+
+def test_local_cache_expires_and_invalidates() -> None:
+    cache: LocalCacheBackend = LocalCacheBackend(max_size=10, ttl=0.01)
+    cache.set("1", {"id": 1})
+    time.sleep(0.02)
+    assert cache.get("1") is None
+
+    cache.ttl = 60
+    cache.set("1", {"id": 1})
+    cache.delete("1")
+    assert cache.get("1") is None
+
+
+
+def test_sqlite_cache_is_shared_between_processes() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path: str = os.path.join(directory, "cache.db")
+        cache: SqliteCacheBackend = SqliteCacheBackend(path, "account_cache", max_size=2, ttl=60)
+        other_worker_cache: SqliteCacheBackend = SqliteCacheBackend(path, "account_cache", max_size=2, ttl=60)
+        cache.set("1", {"id": 1, "username": "shared"})
+        assert other_worker_cache.get("1") == {"id": 1, "username": "shared"}
+
+        other_worker_cache.delete("1")
+        assert cache.get("1") is None
+
+        cache._next_sweep = 0
+        for key in ("1", "2", "3"):
+            cache.set(key, {"id": int(key)})
+            cache._next_sweep = 0
+        assert cache.get("1") is None and cache.get("3") == {"id": 3}
+
+        cache.ttl = 0
+        cache.set("4", {"id": 4})
+        time.sleep(0.01)
+        assert cache.get("4") is None
+        cache.close()
+        assert other_worker_cache.get("3") == {"id": 3}
+
+
+
+def test_sqlite_caches_default_to_the_instance_folder() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        app: Flask = Flask(__name__, instance_path=os.path.join(directory, "instance"))
+        app.config.update(ACCOUNT_ETAG_CACHE_TYPE="sqlite")
+        cache: AccountCache = AccountCache(config_prefix="ACCOUNT_ETAG_CACHE", app=app)
+        assert cache.backend.path == os.path.join(directory, "instance", "cache.db")
+
+        app.config["ACCOUNT_ETAG_CACHE_SQLITE_PATH"] = os.path.join(directory, "etags.db")
+        cache.init_app(app)
+        assert cache.backend.path == os.path.join(directory, "etags.db")
+        cache._close()
@@ -0,0 +1,36 @@
+import json
+import os
+import tempfile
+from click.testing import Result
+from flask import Flask
+from flask.testing import FlaskCliRunner
+from api import db
+from api.models import Account, flask_bcrypt
+from .test_helper import create_test_app
+
+
+def test_accounts_can_be_imported_and_exported() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        app: Flask = create_test_app(directory)
+        runner: FlaskCliRunner = app.test_cli_runner()
+        input_path: str = os.path.join(directory, "accounts.csv")
+        with open(input_path, "w") as input_file:
+            input_file.write("email,username,password,gender\n"
+                             "a@test.com,a,Import-pw0,F\n"
+                             "b@test.com,b,weak,\n"
+                             "c@test.com,a,Import-pw0,\n"
+                             "d@test.com,d,Import-pw1,\n")
+
+        result: Result = runner.invoke(args=["accounts", "import", input_path, "--workers", "2", "--log-rounds", "4",
+                                             "--batch-size", "2"])
+        assert result.exit_code == 0, result.output
+        assert "imported 2 accounts, rejected 2" in result.output
+
+        result: Result = runner.invoke(args=["accounts", "export", "--format", "jsonl", "--fields", "username,password,gender"])
+        assert result.exit_code == 0, result.output
+        exported: list[dict] = [json.loads(line) for line in result.output.splitlines() if line.startswith("{")]
+        assert [(account["username"], account["gender"]) for account in exported] == [("a", "F"), ("d", None)]
+        assert flask_bcrypt.check_password_hash(exported[0]["password"], "Import-pw0")
+
+        with app.app_context():
+            db.engine.dispose()
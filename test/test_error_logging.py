@@ -0,0 +1,64 @@
+import io
+import json
+import logging
+import threading
+import time
+from sqlalchemy.exc import OperationalError
+from api.error_logging import BoundedQueueHandler, DeduplicationFilter, JsonFormatter
+
+
+class BlockedHandler(logging.Handler):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.released: threading.Event = threading.Event()
+
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.released.wait()
+
+
+def build_logger(name: str, handler: logging.Handler) -> logging.Logger:
+    logger: logging.Logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.handlers = [handler]
+    return logger
+
+
+def test_records_are_written_as_json_by_the_listener() -> None:
+    stream: io.StringIO = io.StringIO()
+    stream_handler: logging.StreamHandler = logging.StreamHandler(stream)
+    stream_handler.setFormatter(JsonFormatter())
+    handler: BoundedQueueHandler = BoundedQueueHandler(10, stream_handler)
+    logger: logging.Logger = build_logger("test.error_logging.json", handler)
+
+    error: OperationalError = OperationalError("SELECT 1", {}, Exception("connection refused"))
+    logger.error("database unavailable", exc_info=error, extra={"context": {"route": "login", "sql_error_class": "Exception"}})
+    handler.stop()
+
+    record: dict = json.loads(stream.getvalue())
+    assert record["message"] == "database unavailable" and record["route"] == "login"
+    assert record["sql_error_class"] == "Exception" and "OperationalError" in record["traceback"]
+
+
+def test_identical_errors_are_deduplicated() -> None:
+    deduplication: DeduplicationFilter = DeduplicationFilter(60, 1)
+    records: list[logging.LogRecord] = [logging.LogRecord("test", logging.ERROR, __file__, 0, message, None, None)
+                                        for message in ["same"] * 100 + ["other"]]
+    assert [deduplication.filter(record) for record in records].count(True) == 2
+    assert deduplication.suppressed == 99
+
+
+def test_a_stalled_writer_drops_records_without_blocking() -> None:
+    blocked_handler: BlockedHandler = BlockedHandler()
+    handler: BoundedQueueHandler = BoundedQueueHandler(5, blocked_handler)
+    logger: logging.Logger = build_logger("test.error_logging.bounded", handler)
+
+    start: float = time.perf_counter()
+    for index in range(100):
+        logger.error("error %s", index)
+    assert time.perf_counter() - start < 0.5
+    assert handler.dropped >= 94
+
+    blocked_handler.released.set()
+    handler.stop()
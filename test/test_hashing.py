@@ -0,0 +1,102 @@
+import json
+import os
+import signal
+import tempfile
+from flask import Flask
+from api.hashing import HashingQueueFull, PasswordHasher, calibrate_log_rounds, get_log_rounds, load_or_calibrate_log_rounds
+from api.models import flask_bcrypt
+
+
+def create_test_hasher(**config: int) -> PasswordHasher:
+    app: Flask = Flask(__name__)
+    app.config.update({"BCRYPT_LOG_ROUNDS": 4, **config})
+    return PasswordHasher(app)
+
+
+def test_inline_hash_is_compatible_with_flask_bcrypt() -> None:
+    hasher: PasswordHasher = create_test_hasher(HASHING_POOL_SIZE=0)
+    password_hash: str = hasher.generate_password_hash("Testpw0-")
+
+    assert flask_bcrypt.check_password_hash(password_hash, "Testpw0-")
+    assert hasher.check_password_hash(password_hash, "Testpw0-")
+    assert not hasher.check_password_hash(password_hash, "wrong_password")
+    assert hasher.get_metrics()["completed"] == 3
+
+
+
+def test_pooled_hash_works() -> None:
+    hasher: PasswordHasher = create_test_hasher(HASHING_POOL_SIZE=1, HASHING_QUEUE_SIZE=1)
+    password_hash: str = hasher.generate_password_hash("Testpw0-")
+    assert hasher.check_password_hash(password_hash, "Testpw0-")
+
+    metrics: dict[str, int | float] = hasher.get_metrics()
+    assert metrics["completed"] == 2 and metrics["in_flight"] == 0 and metrics["rejected"] == 0
+
+
+
+def test_pool_is_replaced_after_a_child_is_killed() -> None:
+    hasher: PasswordHasher = create_test_hasher(HASHING_POOL_SIZE=1, HASHING_QUEUE_SIZE=1)
+    password_hash: str = hasher.generate_password_hash("Testpw0-")
+    for process in list(hasher._executor._processes.values()):
+        os.kill(process.pid, signal.SIGKILL)
+        process.join()
+
+    assert hasher.check_password_hash(password_hash, "Testpw0-")
+    assert hasher.generate_password_hashes(["Testpw0-", "Testpw1-"])[1].startswith("$2b$04$")
+    assert hasher.get_metrics()["in_flight"] == 0
+    hasher.shutdown()
+
+
+
+def test_full_queue_is_rejected() -> None:
+    hasher: PasswordHasher = create_test_hasher(HASHING_POOL_SIZE=1, HASHING_QUEUE_SIZE=0)
+    hasher._slots.acquire()
+    try:
+        hasher.generate_password_hash("Testpw0-")
+        assert False
+    except HashingQueueFull:
+        assert hasher.get_metrics()["rejected"] == 1
+    finally:
+        hasher._slots.release()
+
+
+
+def test_rehash_is_needed_when_cost_changes() -> None:
+    hasher: PasswordHasher = create_test_hasher(HASHING_POOL_SIZE=0)
+    password_hash: str = hasher.generate_password_hash("Testpw0-")
+    assert get_log_rounds(password_hash) == 4
+    assert not hasher.needs_rehash(password_hash)
+
+    stronger_hasher: PasswordHasher = create_test_hasher(HASHING_POOL_SIZE=0, BCRYPT_LOG_ROUNDS=5)
+    assert stronger_hasher.needs_rehash(password_hash)
+    assert not hasher.needs_rehash(stronger_hasher.generate_password_hash("Testpw0-"))
+
+
+
+def test_calibration_stays_within_bounds() -> None:
+    assert calibrate_log_rounds(10.0, 1, 4, 5) == 5
+    assert calibrate_log_rounds(0.0, 1, 4, 5) == 4
+
+    with tempfile.TemporaryDirectory() as directory:
+        calibration_path: str = os.path.join(directory, "calibration.json")
+        hasher: PasswordHasher = create_test_hasher(HASHING_POOL_SIZE=0, BCRYPT_CALIBRATE=True, BCRYPT_LATENCY_BUDGET_MS=10000,
+                                                    BCRYPT_CALIBRATION_SAMPLES=1, BCRYPT_MIN_LOG_ROUNDS=4, BCRYPT_MAX_LOG_ROUNDS=5,
+                                                    BCRYPT_CALIBRATION_PATH=calibration_path)
+        assert hasher.log_rounds == 5
+
+        # Later boots reuse the stored cost instead of benchmarking again.
+        with open(calibration_path) as calibration_file:
+            calibration: dict = json.load(calibration_file)
+        with open(calibration_path, "w") as calibration_file:
+            json.dump({**calibration, "log_rounds": 4}, calibration_file)
+        assert load_or_calibrate_log_rounds(calibration_path, 10.0, 1, 4, 5) == 4
+        assert load_or_calibrate_log_rounds(calibration_path, 10.0, 1, 4, 6) == 6
+
+
+
+def test_batch_hash_works() -> None:
+    hasher: PasswordHasher = create_test_hasher(HASHING_POOL_SIZE=2, HASHING_QUEUE_SIZE=1)
+    password_hashes: list[str] = hasher.generate_password_hashes(["Testpw0-", "Testpw1-", "Testpw2-"])
+    assert len(password_hashes) == 3
+    assert hasher.check_password_hash(password_hashes[1], "Testpw1-")
+    assert hasher.generate_password_hashes([]) == []
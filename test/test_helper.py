@@ -1,4 +1,8 @@
+import os
+from typing import Any
+from flask import Flask
 from config import Config
+from api import create_app
 from api.models import Account
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -23,7 +27,7 @@ def close_test_db_session(session, rollback=False) -> None:
 
 def get_account_data(account_email: str) -> dict[str, str]:
     session = create_test_db_session()
-    data: Account | None = session.query(Account).filter(Account.email == account_email).first()
+    data: Account | None = session.query(Account).filter(Account.email == account_email, Account.deleted_at.is_(None)).first()
     data: dict[str, str] = data.convert_to_dict()
     close_test_db_session(session)
     return data
@@ -32,4 +36,21 @@ def get_account_data(account_email: str) -> dict[str, str]:
 def get_account_specifics(account_email: str, key: str) -> str | int | bool:
     data: dict[str, str] = get_account_data(account_email)
     account_specifics: str | int | bool = data[key]
-    return account_specifics
\ No newline at end of file
+    return account_specifics
+
+
+def build_test_config(directory: str, **settings: Any) -> type:
+    # Everything a test app writes (the database and the SQLite store files) goes to the given temporary directory;
+    # sessions stay in memory and passwords are hashed inline with cheap rounds.
+    return type("TestConfig", (Config,), {"SQLALCHEMY_DATABASE_URI": "sqlite:///" + os.path.join(directory, "app.db"),
+                                          "SQLALCHEMY_ENGINE_OPTIONS": {}, "SECRET_KEY": "test", "SESSION_TYPE": "memory",
+                                          "SESSION_SQLITE_PATH": os.path.join(directory, "sessions.db"),
+                                          "TOKEN_DENYLIST_SQLITE_PATH": os.path.join(directory, "sessions.db"),
+                                          "REPLICA_STICKINESS_SQLITE_PATH": os.path.join(directory, "sessions.db"),
+                                          "ACCOUNT_CACHE_SQLITE_PATH": os.path.join(directory, "cache.db"),
+                                          "ACCOUNT_ETAG_CACHE_SQLITE_PATH": os.path.join(directory, "cache.db"),
+                                          "HASHING_POOL_SIZE": 0, "BCRYPT_LOG_ROUNDS": 4, **settings})
+
+
+def create_test_app(directory: str, **settings: Any) -> Flask:
+    return create_app(build_test_config(directory, **settings))
@@ -0,0 +1,32 @@
+from api.metrics import Counter, Histogram, render_component_metrics
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    histogram: Histogram = Histogram("latency_seconds", "Latency.", ("endpoint",), (0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(("login",), value)
+
+    lines: list[str] = histogram.render()
+    assert lines[:2] == ["# HELP latency_seconds Latency.", "# TYPE latency_seconds histogram"]
+    assert lines[2:] == ['latency_seconds_bucket{endpoint="login",le="0.1"} 2',
+                         'latency_seconds_bucket{endpoint="login",le="1.0"} 3',
+                         'latency_seconds_bucket{endpoint="login",le="+Inf"} 4',
+                         'latency_seconds_sum{endpoint="login"} 2.65',
+                         'latency_seconds_count{endpoint="login"} 4']
+
+
+
+def test_counter_escapes_label_values() -> None:
+    counter: Counter = Counter("requests_total", "Requests.", ("endpoint",))
+    counter.inc(('say "hi"',))
+    counter.inc(('say "hi"',))
+    assert counter.render()[2] == 'requests_total{endpoint="say \\"hi\\""} 2'
+
+
+
+def test_component_metrics_render_counters_and_gauges() -> None:
+    lines: list[str] = render_component_metrics("pool", ("bind",), {("default",): {"pool_class": "QueuePool", "size": 5,
+                                                                                  "checkouts": 3}})
+    assert lines == ["# TYPE pool_checkouts_total counter", 'pool_checkouts_total{bind="default"} 3',
+                     "# TYPE pool_size gauge", 'pool_size{bind="default"} 5']
+    assert render_component_metrics("purge", (), {(): {"enabled": True}}) == ["# TYPE purge_enabled gauge", "purge_enabled 1"]
@@ -0,0 +1,38 @@
+import os
+import tempfile
+from flask import Flask
+from api.password_policy import BloomFilter, PasswordPolicy
+
+
+def test_policy_rules_come_from_the_config() -> None:
+    app: Flask = Flask(__name__)
+    app.config.update(PASSWORD_MIN_LENGTH=10, PASSWORD_REQUIRE_SPECIAL=False, PASSWORD_REQUIRE_DIGIT=False)
+    policy: PasswordPolicy = PasswordPolicy(app)
+    assert policy.check("Testpassword") == []
+    assert policy.check("testpw") == ["password must contain at least 10 characters",
+                                      "password must contain at least 1 upper case letter"]
+    assert policy.check("Pässwörter ß") == []
+
+
+
+def test_denylist_rejects_common_passwords() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        denylist_path: str = os.path.join(directory, "denylist.txt")
+        with open(denylist_path, "w") as denylist_file:
+            denylist_file.write("Password1!\nQwerty-123\n")
+
+        app: Flask = Flask(__name__)
+        app.config.update(PASSWORD_DENYLIST_PATH=denylist_path)
+        policy: PasswordPolicy = PasswordPolicy(app)
+
+    assert policy.check("Password1!") == ["password is too common"]
+    assert policy.check("Testpw0-") == []
+
+
+
+def test_bloom_filter_has_no_false_negatives() -> None:
+    bloom_filter: BloomFilter = BloomFilter(capacity=1000, false_positive_rate=0.01)
+    for i in range(1000):
+        bloom_filter.add(f"password{i}")
+    assert all(f"password{i}" in bloom_filter for i in range(1000))
+    assert sum(f"other{i}" in bloom_filter for i in range(1000)) < 50
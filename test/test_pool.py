@@ -0,0 +1,16 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine.base import Engine
+from api.pool import InstrumentedQueuePool, get_pool_metrics
+
+
+def test_pool_metrics_report_checkouts() -> None:
+    engine: Engine = create_engine("sqlite://", poolclass=InstrumentedQueuePool, pool_size=2, max_overflow=1)
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        metrics: dict[str, str | int | float] = get_pool_metrics(engine)
+        assert metrics["checked_out"] == 1 and metrics["checkouts"] == 1
+
+    metrics: dict[str, str | int | float] = get_pool_metrics(engine)
+    assert metrics["checked_out"] == 0 and metrics["checked_in"] == 1
+    assert metrics["checkout_wait_max_seconds"] >= 0
+    engine.dispose()
@@ -0,0 +1,58 @@
+import os
+import tempfile
+from click.testing import Result
+from flask import Flask
+from flask.testing import FlaskClient, FlaskCliRunner
+from werkzeug.test import TestResponse
+from api import db
+from api.models import Account
+from api.purge import is_within_hours, parse_hours, tombstone_purger
+from .test_helper import create_test_app
+
+
+def test_purge_hours_wrap_around_midnight() -> None:
+    assert parse_hours("") is None and is_within_hours(None, 12)
+    assert is_within_hours(parse_hours("1-5"), 1) and not is_within_hours(parse_hours("1-5"), 5)
+    assert is_within_hours(parse_hours("22-4"), 23) and is_within_hours(parse_hours("22-4"), 3)
+    assert not is_within_hours(parse_hours("22-4"), 12)
+
+
+def test_deleted_accounts_are_hidden_then_purged() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        app: Flask = create_test_app(directory, ACCOUNT_PURGE_BATCH_SIZE=2)
+        client: FlaskClient = app.test_client()
+        runner: FlaskCliRunner = app.test_cli_runner()
+        accounts: list[dict[str, str]] = [{"email": f"purge{i}@test.com", "username": f"purge{i}", "password": "Purge-pw0"}
+                                          for i in range(3)]
+        ids: list[int] = [entry["id"] for entry in client.post("/accounts/batch", json=accounts).get_json()["message"]]
+
+        assert client.delete(f"/accounts/{ids[0]}").status_code == 200
+        assert client.delete(f"/accounts/{ids[0]}").status_code == 404
+        assert client.get(f"/accounts/{ids[0]}").status_code == 404
+        assert client.delete("/accounts/batch", json={"ids": ids}).get_json()["message"] == {"deleted_ids": ids[1:],
+                                                                                           "missing_ids": ids[:1]}
+        assert client.get("/db-content").get_json() == []
+        response: TestResponse = client.post("/login", json={"username": "purge0", "password": "Purge-pw0"})
+        assert response.get_json()["message"] == "wrong username"
+
+        # The email and username of a tombstone are free again, so the tombstone can no longer be restored.
+        assert client.post("/signup", json=accounts[0]).status_code == 200
+        result: Result = runner.invoke(args=["accounts", "restore", str(ids[0])])
+        assert result.exit_code != 0 and "an account is already registered with this email" in result.output
+        assert client.patch(f"/accounts/{ids[2] + 1}", json={"email": "other@test.com"}).status_code == 200
+        result: Result = runner.invoke(args=["accounts", "restore", str(ids[0])])
+        assert result.exit_code != 0 and "the username is already taken" in result.output
+        result: Result = runner.invoke(args=["accounts", "restore", str(ids[1])])
+        assert result.exit_code == 0, result.output
+        assert client.get(f"/accounts/{ids[1]}").status_code == 200
+
+        # Tombstones younger than the retention are kept.
+        result: Result = runner.invoke(args=["accounts", "purge"])
+        assert result.exit_code == 0 and "purged 0 deleted accounts" in result.output
+        result: Result = runner.invoke(args=["accounts", "purge", "--retention", "0"])
+        assert result.exit_code == 0 and "purged 2 deleted accounts" in result.output
+        assert tombstone_purger.get_metrics()["purged"] >= 2
+
+        with app.app_context():
+            assert sorted(db.session.query(Account.username)) == [("purge0",), ("purge1",)]
+            db.engine.dispose()
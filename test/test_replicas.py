@@ -0,0 +1,86 @@
+import os
+import tempfile
+import time
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlalchemy import insert, select
+from api import db
+from api.models import Account
+from api.replicas import SqliteStickinessBackend, replica_router
+from .test_helper import create_test_app
+
+
+def build_app(directory: str, replica_uris: list[str]) -> Flask:
+    return create_test_app(directory, SQLALCHEMY_REPLICA_URIS=replica_uris, REPLICA_STICKY_SECONDS=60, DB_CREATE_ALL=True)
+
+
+def insert_account(bind_key: str | None, username: str) -> None:
+    with db.engines[bind_key].begin() as connection:
+        Account.__table__.create(connection, checkfirst=True)
+        connection.execute(insert(Account).values(id=1, email=username + "@test.com", username=username, password="x",
+                                                  is_logged_in=False))
+
+
+def test_reads_go_to_replicas_until_the_account_is_written() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        app: Flask = build_app(directory, ["sqlite:///" + os.path.join(directory, f"replica_{index}.db") for index in range(2)])
+        client: FlaskClient = app.test_client()
+        with app.app_context():
+            insert_account(None, "primary")
+            insert_account("replica_0", "replica")
+            insert_account("replica_1", "replica")
+
+            assert client.get("/accounts/1?fields=username").json["message"]["username"] == "replica"
+            assert client.get("/accounts?ids=1&fields=username").json["message"][0]["username"] == "replica"
+
+            replica_router.mark_written(1)
+            assert client.get("/accounts/1?fields=username").json["message"]["username"] == "primary"
+            assert client.get("/db-content?fields=username").json[0]["username"] == "replica"
+
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+def test_unreachable_replica_falls_back_to_the_primary() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        app: Flask = build_app(directory, ["sqlite:///" + os.path.join(directory, "missing", "replica.db")])
+        client: FlaskClient = app.test_client()
+        with app.app_context():
+            insert_account(None, "primary")
+
+            # The failed read is rolled back in the replica session only, the pending writes of the request are kept.
+            pending_account: Account = Account(email="pending@test.com", username="pending", password="x", is_logged_in=False,
+                                               gender=None, phone_number=None, address=None)
+            db.session.add(pending_account)
+            assert replica_router.execute(select(Account.username).where(Account.id == 1)).scalar() == "primary"
+            assert pending_account in db.session
+            db.session.rollback()
+
+            assert client.get("/accounts/1?fields=username").json["message"]["username"] == "primary"
+            assert replica_router.get_replica() is None
+
+            # The replica comes back once the background health check reaches it.
+            os.mkdir(os.path.join(directory, "missing"))
+            insert_account("replica_0", "replica")
+            replica_router.check_down_replicas()
+            assert client.get("/accounts/1?fields=username").json["message"]["username"] == "replica"
+
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+
+def test_sqlite_stickiness_is_shared_between_workers() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        stickiness: SqliteStickinessBackend = SqliteStickinessBackend(os.path.join(directory, "sessions.db"), ttl=60)
+        other_worker_stickiness: SqliteStickinessBackend = SqliteStickinessBackend(os.path.join(directory, "sessions.db"), ttl=60)
+        stickiness.mark([1, 2])
+        assert other_worker_stickiness.is_any_marked([3, 2]) and not other_worker_stickiness.is_any_marked([3])
+        assert not other_worker_stickiness.is_any_marked([])
+
+        stickiness.ttl = 0
+        stickiness.mark([4])
+        time.sleep(0.01)
+        assert not other_worker_stickiness.is_any_marked([4])
+        stickiness.close()
+        other_worker_stickiness.close()
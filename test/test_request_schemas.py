@@ -0,0 +1,24 @@
+from typing import Any, Callable
+from api.request_schemas import ROUTE_SCHEMAS, Field, RequestSchema
+
+
+def test_object_schema_reports_the_first_invalid_field() -> None:
+    validate: Callable[[bytes], tuple[Any, str | None]] = ROUTE_SCHEMAS["authentication.signup"].compile({})
+    assert validate(b'{"email": "a@test.com", "username": "a", "password": "Test-pw0", "extra": 1}')[1] is None
+    assert validate(b'{"email": "a@test.com"}') == (None, "missing field: username, password")
+    assert validate(b'{"email": "a@test.com", "username": 1, "password": "p"}')[1] == "field must be a string: username"
+    assert validate(b'{"email": null, "username": "a", "password": "p"}')[1] == "field cannot be null: email"
+    assert validate(b'{"email": "a", "username": "a", "password": "p", "gender": null}')[1] is None
+    assert "too long: username" in validate(b'{"email": "a", "username": "' + b"a" * 65 + b'", "password": "p"}')[1]
+    assert validate(b'["email"]')[1] == "the body must be a JSON object"
+    assert validate(b'{"email": ')[1] == "the body must be valid JSON"
+
+
+def test_nesting_is_rejected_before_parsing() -> None:
+    validate: Callable[[bytes], tuple[Any, str | None]] = RequestSchema({"password": Field()}, max_containers=4).compile({})
+    assert validate(b'{"password": "{[{[{[{["}')[1] is None
+    assert validate(b"[" * 100000 + b"]" * 100000)[1] == "the body is too deeply nested"
+
+    validate_batch: Callable[[bytes], tuple[Any, str | None]] = ROUTE_SCHEMAS["authentication.batch_signup"].compile({"ACCOUNT_BATCH_MAX_SIZE": 2})
+    assert validate_batch(b'[{}, {}]')[1] is None
+    assert validate_batch(b'[{}, {}, {}, {}]')[1] == "the body is too deeply nested"
@@ -0,0 +1,29 @@
+from sqlalchemy import inspect
+from sqlalchemy.orm.session import Session
+from api.models import Account
+from api.serializers import ACCOUNT_FIELDS, dumps, serialize_account
+from .test_helper import create_test_db_session, close_test_db_session
+
+
+def test_serializer_uses_column_order_and_projection() -> None:
+    account: Account = Account("test_email@email.test", "test_user", "test_pw", True, None, None, None)
+    assert tuple(serialize_account(account).keys()) == ACCOUNT_FIELDS
+    assert serialize_account(account, ["id", "email"]) == {"id": None, "email": "test_email@email.test"}
+    assert dumps(serialize_account(account, ["email"])) == b'{"email":"test_email@email.test"}'
+
+
+
+def test_instance_is_usable_after_serialization() -> None:
+    session: Session = create_test_db_session()
+    account: Account = Account("test_email@email.test", "test_user", "test_pw", True, None, None, None)
+    session.add(account)
+    session.flush()
+
+    serialize_account(account)
+    account.convert_to_dict()
+    assert "_sa_instance_state" in account.__dict__ and inspect(account).persistent
+
+    account.gender = "F"
+    session.flush()
+    assert session.query(Account.gender).filter(Account.id == account.id).scalar() == "F"
+    close_test_db_session(session, rollback=True)
@@ -1,3 +1,5 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.session import Session
 from api.services import *
 from .test_helper import create_test_db_session, close_test_db_session
@@ -87,4 +89,56 @@ def test_optional_field_has_value() -> None:
     assert handle_optional_field_for_signup(params) == valid_result
 
     params: dict[str, str] = {"gender": "F", "phone_number": "0101010101", "address": "random_address"}
-    assert handle_optional_field_for_signup(params) == params
\ No newline at end of file
+    assert handle_optional_field_for_signup(params) == params
+
+
+def test_unicity_error_is_translated() -> None:
+    session: Session = create_test_db_session()
+    session.add(Account("test_email@email.test", "test_user", "test_pw", True, None, None, None))
+    session.flush()
+
+    session.add(Account("test_email@email.test", "other_user", "test_pw", True, None, None, None))
+    try:
+        session.flush()
+        assert False
+    except IntegrityError as e:
+        assert get_unicity_error_message(e) == "an account is already registered with this email"
+    close_test_db_session(session, rollback=True)
+
+    session: Session = create_test_db_session()
+    session.add(Account("test_email@email.test", "test_user", "test_pw", True, None, None, None))
+    session.add(Account("other_email@email.test", "test_user", "test_pw", True, None, None, None))
+    try:
+        session.flush()
+        assert False
+    except IntegrityError as e:
+        assert get_unicity_error_message(e) == "the username is already taken"
+    close_test_db_session(session, rollback=True)
+
+
+def test_etags_are_parsed_and_matched() -> None:
+    assert format_etag(3) == '"3"' and format_etag(3, True) == '"3-1"'
+    assert parse_if_match('"3"') == 3 and parse_if_match('W/"3-0"') == 3 and parse_if_match("*") is None
+    with pytest.raises(ValueError):
+        parse_if_match("3")
+
+    assert etag_matches('"2-1", "3-1"', '"3-1"') and etag_matches("*", '"3"')
+    assert not etag_matches('"3-0"', '"3-1"') and not etag_matches(None, '"3"')
+
+
+def test_schema_metadata_matches_the_model() -> None:
+    assert account_schema.columns == tuple(column for column in Account.__table__.columns.keys() if column != "deleted_at")
+    assert "deleted_at" not in MUTABLE_COLUMNS | IMMUTABLE_COLUMNS and get_requested_columns("deleted_at") is None
+    assert MUTABLE_COLUMNS == set(Account.get_model_fields("required") + Account.get_model_fields("optional"))
+    assert account_schema.optional_defaults == {"gender": None, "phone_number": None, "address": None}
+    assert get_requested_columns("username,id") == ["id", "username"] and get_requested_columns("unknown") is None
+
+
+def test_batch_items_are_checked_like_signup_bodies() -> None:
+    account: dict[str, str] = {"email": "batch@test.com", "username": "batch", "password": "Batch-pw0"}
+    errors: list[str | list[str] | None] = check_signup_batch_fields([account, {**account, "password": 123}, {**account, "email": ["a"]},
+                                                                      {**account, "username": "x" * 5000}, {"email": "batch@test.com"},
+                                                                      "account"])
+    assert errors == [None, "field must be a string: password", "field must be a string: email",
+                      "field is too long: username (at most 64 characters)", "missing field: username, password",
+                      "each account must be a JSON object"]
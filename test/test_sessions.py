@@ -0,0 +1,66 @@
+import os
+import tempfile
+import time
+from flask import Flask
+from flask.testing import FlaskClient
+from api import db
+from api.sessions import MemorySessionBackend, SqliteSessionBackend
+from .test_helper import create_test_app
+
+
+def check_backend(backend: MemorySessionBackend | SqliteSessionBackend) -> None:
+    backend.add("first", 1)
+    backend.add("second", 1)
+    backend.add("third", 2)
+    assert backend.get("first") == 1 and backend.get("unknown") is None
+    assert backend.get_logged_in_account_ids([1, 2, 3]) == {1, 2}
+
+    backend.delete("first")
+    assert backend.get("first") is None and backend.get_logged_in_account_ids([1]) == {1}
+
+    assert backend.delete_account(1) == 1
+    assert backend.get("second") is None and backend.get_logged_in_account_ids([1, 2]) == {2}
+
+    backend.ttl = 0.01
+    backend.add("expired", 3)
+    time.sleep(0.02)
+    assert backend.get("expired") is None and backend.get_logged_in_account_ids([3]) == set()
+
+    # Connections are closed at the end of every request and reopened on the next one.
+    backend.ttl = 60
+    backend.add("reopened", 4)
+    backend.close()
+    assert backend.get("reopened") == 4
+
+
+
+def test_memory_session_backend() -> None:
+    check_backend(MemorySessionBackend(ttl=60))
+
+
+
+def test_sqlite_session_backend() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        check_backend(SqliteSessionBackend(os.path.join(directory, "sessions.db"), ttl=60))
+
+
+
+def test_logging_out_another_account_keeps_the_caller_logged_in() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        app: Flask = create_test_app(directory, SESSION_TYPE="sqlite")
+        first_client: FlaskClient = app.test_client()
+        second_client: FlaskClient = app.test_client()
+        accounts: list[dict[str, str]] = [{"email": f"session{i}@test.com", "username": f"session{i}", "password": "Session-pw0"}
+                                          for i in range(2)]
+        assert first_client.post("/signup", json=accounts[0]).status_code == 200
+        assert second_client.post("/signup", json=accounts[1]).status_code == 200
+
+        assert first_client.post("/logout/2").status_code == 200
+        assert second_client.get("/home").status_code == 401
+        assert first_client.get("/home").status_code == 200
+        assert first_client.post("/logout/1").status_code == 200
+        assert first_client.get("/home").status_code == 401
+        assert first_client.post("/login", json={"username": "session0", "password": "Session-pw0"}).status_code == 200
+
+        with app.app_context():
+            db.engine.dispose()
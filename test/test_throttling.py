@@ -0,0 +1,23 @@
+from api.throttling import LocalThrottleBackend, LoginThrottle, SlidingWindowSketch
+
+
+def test_sketch_counts_within_the_sliding_window() -> None:
+    sketch: SlidingWindowSketch = SlidingWindowSketch(width=64, depth=4, window=10, buckets=5)
+    for second in range(5):
+        sketch.add("username:test", now=1000 + second)
+    sketch.add("username:other", now=1004)
+    assert sketch.count("username:test", now=1005) == 5
+    assert sketch.count("username:test", now=1010) == 3
+    assert sketch.count("username:test", now=1020) == 0
+    assert sketch.count("username:unknown", now=1005) == 0
+
+
+
+def test_login_throttle_rejects_excess_attempts() -> None:
+    throttle: LoginThrottle = LoginThrottle()
+    throttle.max_per_username, throttle.max_per_ip = 2, 3
+    throttle.backend = LocalThrottleBackend(width=64, depth=4, window=60, buckets=6)
+    assert throttle.hit("first", "10.0.0.1") is None and throttle.hit("first", "10.0.0.1") is None
+    assert 0 < throttle.hit("first", "10.0.0.1") <= 10
+    assert throttle.hit("second", "10.0.0.2") is None
+    assert throttle.hit("third", "10.0.0.1") is not None
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import time
+from typing import Any
+import pytest
+from flask import Flask
+from api.tokens import InvalidToken, TokenManager
+
+
+def create_token_manager(**settings: Any) -> TokenManager:
+    app: Flask = Flask(__name__)
+    app.config.update(SECRET_KEY="test", TOKEN_AUTH_ENABLED=True, TOKEN_ACCESS_TTL=60, TOKEN_REFRESH_TTL=600,
+                      **{"TOKEN_DENYLIST_TYPE": "local", **settings})
+    return TokenManager(app)
+
+
+
+def test_access_token_is_verified_without_storage() -> None:
+    token_manager: TokenManager = create_token_manager()
+    tokens: dict[str, str | int] = token_manager.issue(1, "test_name", "session")
+    user = token_manager.load_user(tokens["access_token"])
+    assert user.id == 1 and user.username == "test_name" and user.session_id == "session"
+
+    header, payload, signature = tokens["access_token"].split(".")
+    assert token_manager.load_user(".".join((header, payload, signature[:-2] + "AA"))) is None
+    with pytest.raises(InvalidToken):
+        token_manager.verify(tokens["refresh_token"])
+
+    token_manager.revoke_session("session")
+    assert token_manager.load_user(tokens["access_token"]) is None
+
+
+
+def test_refresh_token_is_rotated() -> None:
+    token_manager: TokenManager = create_token_manager()
+    tokens: dict[str, str | int] = token_manager.issue(1, "test_name", "session")
+    claims, new_tokens = token_manager.refresh(tokens["refresh_token"])
+    assert claims["sub"] == "1" and token_manager.load_user(new_tokens["access_token"]) is not None
+
+    with pytest.raises(InvalidToken):
+        token_manager.refresh(tokens["refresh_token"])
+    assert token_manager.load_user(new_tokens["access_token"]) is None
+
+
+
+def test_sqlite_denylist_is_shared_between_workers() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        settings: dict[str, str] = {"TOKEN_DENYLIST_TYPE": "sqlite", "TOKEN_DENYLIST_SQLITE_PATH": os.path.join(directory, "sessions.db")}
+        token_manager: TokenManager = create_token_manager(**settings)
+        other_worker_token_manager: TokenManager = create_token_manager(**settings)
+        tokens: dict[str, str | int] = token_manager.issue(1, "test_name", "session")
+        assert other_worker_token_manager.load_user(tokens["access_token"]) is not None
+
+        token_manager.revoke_session("session")
+        assert other_worker_token_manager.load_user(tokens["access_token"]) is None
+        other_tokens: dict[str, str | int] = token_manager.issue(2, "other_name", "other")
+        time.sleep(0.01)
+        other_worker_token_manager.revoke_account(2)
+        assert token_manager.load_user(other_tokens["access_token"]) is None
+        token_manager._close()
+        other_worker_token_manager._close()